@@ -0,0 +1,171 @@
+# alerts.py — background alert dispatch: pooled webhook session, persistent SMTP, retries, digests
+from __future__ import annotations
+
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from email.mime.text import MIMEText
+from typing import List, Optional, Tuple
+
+import requests
+
+from metrics import timer
+
+
+def _smtp_config() -> Optional[Tuple[str, int, str, str, str]]:
+    host = os.getenv("SMTP_HOST","").strip()
+    port = int(os.getenv("SMTP_PORT","0") or 0)
+    user = os.getenv("SMTP_USER","").strip()
+    pwd  = os.getenv("SMTP_PASS","").strip()
+    to   = os.getenv("ALERT_EMAIL_TO","").strip()
+    return (host, port, user, pwd, to) if (host and port and user and pwd and to) else None
+
+
+class AlertDispatcher:
+    """
+    send_webhook / send_email without blocking the caller.
+    - webhooks: `webhook_workers` threads sharing one keep-alive requests.Session
+    - email: one thread owning a persistent STARTTLS connection (re-dialled on failure
+      or after `smtp_idle` seconds without traffic)
+    - every job retries up to `max_attempts` with exponential backoff + jitter
+    - digest(): emails queued inside the block go out as a single message
+    """
+
+    def __init__(self, webhook_workers: int = 2, max_attempts: int = 4, backoff: float = 0.5,
+                 smtp_idle: float = 60.0):
+        self.max_attempts, self.backoff, self.smtp_idle = max_attempts, backoff, smtp_idle
+        self._hooks: queue.Queue = queue.Queue()
+        self._mail: queue.Queue = queue.Queue()
+        self._http = requests.Session()
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._smtp_key: Optional[tuple] = None
+        self._smtp_used = 0.0
+        self._local = threading.local()
+        self._mlock = threading.Lock()
+        self._latency: deque = deque(maxlen=500)
+        self._stats = {"sent": 0, "failed": 0, "retries": 0}
+        self.last_error = ""
+        self._threads = [threading.Thread(target=self._worker, args=(self._hooks, self._post), daemon=True,
+                                          name=f"alert-webhook-{i}") for i in range(webhook_workers)]
+        self._threads.append(threading.Thread(target=self._worker, args=(self._mail, self._mail_one), daemon=True,
+                                              name="alert-email"))
+        for t in self._threads: t.start()
+
+    # ---- producers ----
+    def webhook(self, payload: dict):
+        url = os.getenv("ALERT_WEBHOOK_URL", "").strip()
+        if url: self._hooks.put((time.monotonic(), (url, payload)))
+
+    def email(self, subject: str, body: str):
+        buf = getattr(self._local, "digest", None)
+        if buf is not None:
+            buf.append((subject, body)); return
+        if _smtp_config(): self._mail.put((time.monotonic(), (subject, body)))
+
+    @contextmanager
+    def digest(self, subject: str):
+        """Collect email() calls made by this thread inside the block into one message."""
+        outer = getattr(self._local, "digest", None)
+        self._local.digest = buf = []
+        try:
+            yield
+        finally:
+            self._local.digest = outer
+            if buf:
+                if len(buf) == 1: self.email(*buf[0])
+                else:
+                    body = "\n\n".join(f"== {s} ==\n{b}" for s, b in buf)
+                    self.email(f"{subject} ({len(buf)} alerts)", body)
+
+    # ---- consumers ----
+    def _worker(self, q: queue.Queue, send):
+        while True:
+            enq, job = q.get()
+            try:
+                for attempt in range(self.max_attempts):
+                    try:
+                        send(*job)
+                        self._record(enq, ok=True)
+                        break
+                    except Exception as e:
+                        self.last_error = f"{type(e).__name__}: {e}"
+                        if attempt + 1 == self.max_attempts:
+                            self._record(enq, ok=False)
+                            break
+                        with self._mlock: self._stats["retries"] += 1
+                        time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+            finally:
+                q.task_done()
+
+    def _record(self, enq: float, ok: bool):
+        with self._mlock:
+            self._stats["sent" if ok else "failed"] += 1
+            self._latency.append(time.monotonic() - enq)
+
+    def _post(self, url: str, payload: dict):
+        with timer("alert.webhook"):
+            r = self._http.post(url, json=payload, timeout=10)
+            if r.status_code >= 500 or r.status_code == 429: r.raise_for_status()
+
+    def _smtp_conn(self, cfg) -> smtplib.SMTP:
+        host, port, user, pwd, _ = cfg
+        key = (host, port, user)
+        stale = self._smtp is not None and (self._smtp_key != key or time.monotonic() - self._smtp_used > self.smtp_idle)
+        if stale: self._drop_smtp()
+        if self._smtp is None:
+            s = smtplib.SMTP(host, port, timeout=10)
+            s.starttls()
+            s.login(user, pwd)
+            self._smtp, self._smtp_key = s, key
+        return self._smtp
+
+    def _drop_smtp(self):
+        if self._smtp is not None:
+            try: self._smtp.quit()
+            except Exception: pass
+        self._smtp = None
+
+    def _mail_one(self, subject: str, body: str):
+        cfg = _smtp_config()
+        if not cfg: return
+        user, to = cfg[2], cfg[4]
+        msg = MIMEText(body, "plain")
+        msg["Subject"] = subject
+        msg["From"] = user
+        msg["To"] = to
+        try:
+            with timer("alert.smtp"):
+                self._smtp_conn(cfg).sendmail(user, [to], msg.as_string())
+            self._smtp_used = time.monotonic()
+        except Exception:
+            self._drop_smtp()  # next attempt re-dials
+            raise
+
+    # ---- introspection ----
+    def metrics(self) -> dict:
+        with self._mlock:
+            lat: List[float] = sorted(self._latency)
+            stats = dict(self._stats)
+        pct = lambda p: round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1e3, 1) if lat else None
+        return {
+            "queued_webhooks": self._hooks.qsize(),
+            "queued_emails": self._mail.qsize(),
+            **stats,
+            "latency_ms_p50": pct(0.50),
+            "latency_ms_p95": pct(0.95),
+            "latency_ms_max": round(lat[-1] * 1e3, 1) if lat else None,
+            "last_error": self.last_error,
+        }
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Block until both queues drain (or timeout). For shutdown paths, not the UI thread."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._hooks.unfinished_tasks == 0 and self._mail.unfinished_tasks == 0: return True
+            time.sleep(0.05)
+        return False
@@ -1,17 +1,32 @@
 # app.py — Step 3: signals + paper trading + alerts + (optional) live orders
 from __future__ import annotations
 
-import os, json, math, smtplib
+import os, json
 import datetime as dt
-from email.mime.text import MIMEText
-from io import StringIO
-from typing import Optional, Tuple, List
+from typing import Optional
 
 import pandas as pd
-import requests
 import streamlit as st
 from SmartApi.smartConnect import SmartConnect
 
+import orders
+from alerts import AlertDispatcher
+from broker import BrokerClient
+from candles import CandleStore, empty_candles, series_key
+from chain import leg_greeks, option_chain
+from engine import read_state
+from feed import LiveFeed, ReplayFeed, TickCache, load_ticks
+from gsheet import SheetLogger
+from instruments import InstrumentIndex, atm_step_for_index, load_scrip_master, scrip_master_version, strike_for_mode
+from journal import TradeJournal
+from mdcache import MarketDataCache, backend_from_env
+from metrics import REGISTRY, serve, timed, timer
+from positions import PositionManager
+from quotes import QuoteCache
+from scanner import scan
+from strategy import IndicatorEngine, confirm_with_htf, htf_trend
+from timeframes import INTERVAL_MINUTES, TIMEFRAMES, Resampler, minutes_of
+
 
 # --------------------- Page & session ---------------------
 st.set_page_config(page_title="Options Buy Strategy", layout="centered")
@@ -19,7 +34,11 @@ st.title("📈 Options Buy Strategy - NIFTY / BANKNIFTY / SENSEX")
 st.caption("Build: Step 3 — signals, paper trading, alerts, optional live orders")
 
 API_KEY = os.getenv("ANGEL_API_KEY", "").strip()
-st.caption(f"ANGEL_API_KEY present: {'✅' if bool(API_KEY) else '❌'}")
+REPLAY = bool(os.getenv("REPLAY_CANDLES", "").strip())  # offline: a recorded session behind a fake SmartConnect
+st.caption(f"ANGEL_API_KEY present: {'✅' if bool(API_KEY) else '❌'}" + (" · 🔁 REPLAY mode" if REPLAY else ""))
+# quotes, signal, positions and trade log rerun on their own every N seconds (0 = only on interaction)
+REFRESH_CHOICES = [0, 2, 5, 10, 30, 60]
+REFRESH_SECONDS = int(os.getenv("UI_REFRESH_SECONDS", "0") or 0)
 
 def _init_state():
     defaults = {
@@ -32,9 +51,9 @@ def _init_state():
         "feed_token": "",
         "profile": None,
         "index_choice": "NIFTY",
-        "scrips": None,
-        "positions": [],     # list of dicts for paper/live orders
-        "trade_log": [],     # append-only for display
+        "use_feed": False,
+        "refresh_every": min(REFRESH_CHOICES, key=lambda s: abs(s - REFRESH_SECONDS)),
+        "chain_df": None,    # last chain shown; its Greeks map spot levels onto the option
         "last_refresh": 0,
     }
     for k,v in defaults.items():
@@ -43,242 +62,187 @@ _init_state()
 
 
 # --------------------- Data helpers ---------------------
-@st.cache_data(ttl=3600)
-def load_scrip_master() -> pd.DataFrame:
-    url = "https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.csv"
-    r = requests.get(url, timeout=30)
-    r.raise_for_status()
-    df = pd.read_csv(StringIO(r.text))
-    return df
-
-def col_upper(df: pd.DataFrame, col: str) -> pd.Series:
-    return df[col].astype(str).str.upper() if col in df.columns else pd.Series([""]*len(df), index=df.index)
-
-def atm_step_for_index(index: str) -> int:
-    return {"NIFTY": 50, "BANKNIFTY": 100, "SENSEX": 100}.get(index.upper(), 50)
-
-def pick_nearest_future_row(scrips: pd.DataFrame, index: str) -> Optional[pd.Series]:
-    if scrips is None or scrips.empty: return None
-    df = scrips.copy()
-    if "expiry" not in df.columns: return None
-    df["expiry"] = pd.to_datetime(df["expiry"], errors="coerce").dt.date
-    name_u = col_upper(df, "name")
-    instr_u = col_upper(df, "instrumenttype")
-    today = dt.date.today()
-    sub = df[(name_u==index.upper()) & (instr_u=="FUTIDX") & df["expiry"].notna() & (df["expiry"]>=today)].copy()
-    if sub.empty: return None
-    sub.sort_values(["expiry","token"], inplace=True, kind="mergesort")
-    return sub.iloc[0]
-
-def nearest_options_expiry(scrips: pd.DataFrame, index: str) -> Optional[dt.date]:
-    if scrips is None or scrips.empty: return None
-    df = scrips.copy()
-    if "expiry" not in df.columns: return None
-    df["expiry"] = pd.to_datetime(df["expiry"], errors="coerce").dt.date
-    name_u = col_upper(df, "name")
-    instr_u = col_upper(df, "instrumenttype")
-    today = dt.date.today()
-    sub = df[(name_u==index.upper()) & (instr_u=="OPTIDX") & df["expiry"].notna() & (df["expiry"]>=today)].copy()
-    if sub.empty: return None
-    sub.sort_values("expiry", inplace=True, kind="mergesort")
-    return sub.iloc[0]["expiry"]
-
-def pick_nearest_expiry_row_for_strike(scrips: pd.DataFrame, index: str, strike: int, kind: str) -> Optional[pd.Series]:
-    if scrips is None or scrips.empty: return None
-    df = scrips.copy()
-    if "expiry" not in df.columns: return None
-    df["expiry"] = pd.to_datetime(df["expiry"], errors="coerce").dt.date
-    name_u = col_upper(df, "name")
-    instr_u = col_upper(df, "instrumenttype")
-    opt_u  = col_upper(df, "optiontype")
-    strikes = pd.to_numeric(df["strike"], errors="coerce") if "strike" in df.columns else pd.Series([float("nan")]*len(df), index=df.index)
-    today = dt.date.today()
-    sub = df[
-        (name_u==index.upper()) & (instr_u=="OPTIDX") & (opt_u==kind.upper()) &
-        (strikes == float(strike)) & df["expiry"].notna() & (df["expiry"]>=today)
-    ].copy()
-    if sub.empty: return None
-    sub.sort_values(["expiry","token"], inplace=True, kind="mergesort")
-    return sub.iloc[0]
+def market_now() -> dt.datetime:
+    # the replay client carries its own clock; everything date-relative follows it
+    clock = getattr(st.session_state.smart, "replay_clock", None)
+    return clock.now() if clock is not None else dt.datetime.now()
+
+@st.cache_resource(max_entries=1)
+def load_instrument_index(version: float) -> InstrumentIndex:
+    # one index per on-disk master version, shared by every session
+    return InstrumentIndex(load_scrip_master())
+
+CANDLE_TTL = float(os.getenv("MD_CANDLE_TTL", "5") or 5)
+# the one series fetched from the API; every other timeframe is resampled from it
+BASE_INTERVAL = os.getenv("CANDLE_BASE_INTERVAL", "FIVE_MINUTE").strip().upper() or "FIVE_MINUTE"
+BASE_MINUTES = INTERVAL_MINUTES[BASE_INTERVAL]
+
+@st.cache_resource
+def market_cache() -> MarketDataCache:
+    # shared by every session (MD_CACHE_URL=redis://... to share across processes too)
+    return MarketDataCache(backend_from_env())
+
+@st.cache_resource
+def quote_cache() -> QuoteCache:
+    # process-wide, short TTL: every LTP needed in a rerun is fetched in one batch
+    return QuoteCache(ttl=1.5, cache=market_cache())
+
+@st.cache_resource
+def tick_cache() -> TickCache:
+    return TickCache(bar_minutes=BASE_MINUTES)
+
+@st.cache_resource
+def tick_feed(client_code: str):
+    """
+    One socket per client code per process (cached on client_code); every session writes to and reads
+    the one shared TickCache. TICK_REPLAY_FILE replays offline.
+    """
+    replay = os.getenv("TICK_REPLAY_FILE", "").strip()
+    if replay:
+        speed = float(os.getenv("TICK_REPLAY_SPEED", "1") or 1)
+        return ReplayFeed(tick_cache(), load_ticks(replay), speed=speed).start()
+    jwt = (st.session_state.auth or {}).get("jwtToken", "")
+    return LiveFeed(tick_cache(), jwt, API_KEY, client_code, st.session_state.feed_token).start()
+
+def active_feed():
+    if not st.session_state.get("use_feed"): return None
+    return tick_feed(st.session_state.user_id)
+
+def get_ltps(smart: SmartConnect, instruments) -> dict:
+    """{(exchange, token): ltp} for [(exchange, tradingsymbol, token), ...]; live ticks first."""
+    instruments = list(instruments)
+    out = {}
+    if active_feed() is not None:
+        ticks = tick_cache()
+        for exch, _, tok in instruments:
+            v = ticks.ltp(exch, tok)
+            if v is not None: out[(exch, str(tok))] = v
+    rest = [i for i in instruments if (i[0], str(i[2])) not in out]
+    if rest:
+        quotes, errors = quote_cache().get_many(smart, rest)
+        for e in errors: st.warning(e)
+        out.update(quotes)
+    return out
 
 def get_ltp(smart: SmartConnect, exch: str, tsym: str, token: str) -> Optional[float]:
-    try:
-        r = smart.ltpData(exch, tsym, str(token))
-        if r and r.get("status") and r.get("data") and "ltp" in r["data"]:
-            return float(r["data"]["ltp"])
-    except Exception as e:
-        st.warning(f"LTP failed for {tsym} ({exch}:{token}) → {e}")
-    return None
+    return get_ltps(smart, [(exch, tsym, str(token))]).get((exch, str(token)))
+
+@st.cache_resource
+def candle_store() -> CandleStore:
+    # process-wide; candles are market data, not per-user state
+    return CandleStore()
+
+@st.cache_resource(max_entries=64)
+def indicator_engine(token: str, timeframe: str, ema_fast: int, ema_slow: int, breakout_lookback: int, atr_len: int) -> IndicatorEngine:
+    return IndicatorEngine(ema_fast, ema_slow, breakout_lookback, atr_len)
+
+@st.cache_resource(max_entries=64)
+def resampler(token: str, timeframe: str) -> Resampler:
+    # shared like the engines: a new base bar only rebuilds the open bucket
+    return Resampler(timeframe)
+
+def timeframe_bars(token: str, timeframe: str, candles: pd.DataFrame) -> pd.DataFrame:
+    if minutes_of(timeframe) == BASE_MINUTES: return candles
+    rs = resampler(token, timeframe)
+    with rs.lock:
+        return rs.update(candles)
+
+SIGNAL_TTL = 900.0  # keys carry every input; the TTL only bounds memory
+
+def signal_params() -> tuple:
+    """Signal Settings as set by the signal fragment's widgets; every other fragment reads them here."""
+    s = st.session_state
+    return (int(s.ema_fast), int(s.ema_slow), int(s.breakout_lookback), int(s.atr_len),
+            s.session_start, s.session_end, s.signal_tf, s.confirm_tf)
+
+def _signal(token: str, df: pd.DataFrame, params: tuple):
+    ema_fast, ema_slow, breakout_lookback, atr_len, session_start, session_end, signal_tf, confirm_tf = params
+    # streaming twin of generate_signal(): only bars it hasn't seen are applied
+    eng = indicator_engine(token, signal_tf, ema_fast, ema_slow, breakout_lookback, atr_len)
+    with eng.lock:
+        side, ctx = eng.sync(timeframe_bars(token, signal_tf, df)).signal(session_start, session_end)
+    if confirm_tf != "off":
+        side, ctx = confirm_with_htf(side, ctx, htf_trend(timeframe_bars(token, confirm_tf, df), ema_fast, ema_slow))
+    return side, ctx
+
+@timed("app.signal")
+def cached_signal(token: str, df: pd.DataFrame, params: tuple):
+    """
+    _signal() memoized on its true inputs (the series up to its last bar, and the settings):
+    reruns, fragments and sessions only evaluate a bar nobody has seen yet.
+    """
+    key = ("signal", str(token), BASE_INTERVAL, series_key(df), params)
+    side, ctx = market_cache().get_or_fetch(key, SIGNAL_TTL, lambda: _signal(str(token), df, params))
+    return side, {**ctx, "reason": list(ctx["reason"])}  # shared entry: callers get their own copy
 
-# Historical 5m candles for FUTIDX (SmartAPI)
+# Historical base-interval candles for FUTIDX (SmartAPI), fetched incrementally
+@timed("app.candles")
 def get_futidx_candles(smart: SmartConnect, token: str, from_dt: dt.datetime, to_dt: dt.datetime) -> pd.DataFrame:
-    payload = {
-        "exchange": "NFO",
-        "symboltoken": str(token),
-        "interval": "FIVE_MINUTE",
-        "fromdate": from_dt.strftime("%Y-%m-%d %H:%M"),
-        "todate":   to_dt.strftime("%Y-%m-%d %H:%M"),
-    }
+    feed = active_feed()
+    if feed is not None and feed.connected:
+        # live bars built from ticks extend the stored series without a REST call
+        store = candle_store()
+        if store.merge_live(token, tick_cache().bars("NFO", token), BASE_MINUTES, interval=BASE_INTERVAL):
+            return store.get(token, interval=BASE_INTERVAL)
     try:
-        r = smart.getCandleData(payload)
-        data = (r or {}).get("data") or []
-        # format: [time, open, high, low, close, volume]
-        rows = []
-        for row in data:
-            rows.append({
-                "time": pd.to_datetime(row[0]),
-                "open": float(row[1]),
-                "high": float(row[2]),
-                "low":  float(row[3]),
-                "close":float(row[4]),
-                "volume": float(row[5]),
-            })
-        return pd.DataFrame(rows)
+        return cached_candles(smart, token, from_dt, to_dt)
     except Exception as e:
         st.warning(f"Candles fetch failed: {e}")
-        return pd.DataFrame(columns=["time","open","high","low","close","volume"])
-
-# --------------------- Strategy engine (buy-only) ---------------------
-def ema(series: pd.Series, length: int) -> pd.Series:
-    return series.ewm(span=length, adjust=False).mean()
-
-def vwap(df: pd.DataFrame) -> pd.Series:
-    # simple intraday VWAP proxy using hlc3 and volume
-    hlc3 = (df["high"] + df["low"] + df["close"]) / 3.0
-    cum_pv = (hlc3 * df["volume"]).cumsum()
-    cum_v  = df["volume"].cumsum().replace(0, pd.NA)
-    return cum_pv / cum_v
-
-def atr(df: pd.DataFrame, length: int = 14) -> pd.Series:
-    high, low, close = df["high"], df["low"], df["close"]
-    prev_close = close.shift(1)
-    tr = pd.concat([
-        (high - low).abs(),
-        (high - prev_close).abs(),
-        (low - prev_close).abs()
-    ], axis=1).max(axis=1)
-    return tr.rolling(length).mean()
-
-def generate_signal(df: pd.DataFrame,
-                    ema_fast=5, ema_slow=13,
-                    breakout_lookback=10,
-                    atr_len=14,
-                    session_start="09:15", session_end="15:25") -> Tuple[Optional[str], dict]:
-    """
-    Returns ('CE' or 'PE' or None, context)
-    - Trend filter: close > VWAP and EMA(5) > EMA(13)  => bullish
-                    close < VWAP and EMA(5) < EMA(13)  => bearish
-    - Breakout: bullish close > highest high of last N bars
-                bearish close < lowest low of last N bars
-    - ATR floor: recent ATR >= 0.6% of close to avoid dead markets
-    - Time filter: only inside session window
-    """
-    ctx = {"reason": [], "entry_price": None, "stop": None, "target": None}
-
-    if df.empty or len(df) < max(ema_slow, breakout_lookback, atr_len) + 2:
-        ctx["reason"].append("Not enough candles")
-        return None, ctx
-
-    df = df.copy().reset_index(drop=True)
-    df["ema_fast"] = ema(df["close"], ema_fast)
-    df["ema_slow"] = ema(df["close"], ema_slow)
-    df["vwap"] = vwap(df)
-    df["atr"] = atr(df, atr_len)
-
-    last = df.iloc[-1]
-    time_last = last["time"]
-    if isinstance(time_last, pd.Timestamp):
-        tm = time_last.time()
-        start_h, start_m = map(int, session_start.split(":"))
-        end_h, end_m = map(int, session_end.split(":"))
-        inside = (tm >= dt.time(start_h,start_m)) and (tm <= dt.time(end_h,end_m))
-    else:
-        inside = True
-    if not inside:
-        ctx["reason"].append("Outside trading window")
-        return None, ctx
-
-    # momentum floor
-    if last["atr"] <= 0.006 * last["close"]:
-        ctx["reason"].append("ATR too small (sideways)")
-        return None, ctx
-
-    hh = df["high"].shift(1).rolling(breakout_lookback).max().iloc[-1]
-    ll = df["low"].shift(1).rolling(breakout_lookback).min().iloc[-1]
-
-    bullish = (last["close"] > last["vwap"]) and (last["ema_fast"] > last["ema_slow"]) and (last["close"] > hh)
-    bearish = (last["close"] < last["vwap"]) and (last["ema_fast"] < last["ema_slow"]) and (last["close"] < ll)
-
-    if bullish:
-        ctx["reason"].append("Trend up + breakout")
-        ctx["entry_price"] = float(last["close"])
-        ctx["stop"] = float(df["low"].tail(3).min())  # last swing area
-        ctx["target"] = float(last["close"] + 1.5 * last["atr"])
-        return "CE", ctx
-
-    if bearish:
-        ctx["reason"].append("Trend down + breakdown")
-        ctx["entry_price"] = float(last["close"])
-        ctx["stop"] = float(df["high"].tail(3).max())
-        ctx["target"] = float(last["close"] - 1.5 * last["atr"])
-        return "PE", ctx
-
-    ctx["reason"].append("No setup")
-    return None, ctx
+        return empty_candles()
+
+def cached_candles(smart: SmartConnect, token: str, from_dt: dt.datetime, to_dt: dt.datetime) -> pd.DataFrame:
+    """Concurrent sessions asking for the same series within CANDLE_TTL share one fetch."""
+    key = ("candles", "NFO", str(token), BASE_INTERVAL, from_dt.date().isoformat())
+    return market_cache().get_or_fetch(key, CANDLE_TTL,
+                                       lambda: candle_store().update(smart, token, from_dt, to_dt, interval=BASE_INTERVAL))
 
 # --------------------- Alerts ---------------------
+@st.cache_resource
+def alert_dispatcher() -> AlertDispatcher:
+    # background queue: SMTP / webhook latency never blocks a rerun
+    return AlertDispatcher()
+
 def send_webhook(payload: dict):
-    url = os.getenv("ALERT_WEBHOOK_URL", "").strip()
-    if not url: return
-    try:
-        requests.post(url, json=payload, timeout=10)
-    except Exception as e:
-        st.warning(f"Webhook failed: {e}")
+    alert_dispatcher().webhook(payload)
 
 def send_email(subject: str, body: str):
-    host = os.getenv("SMTP_HOST","").strip()
-    port = int(os.getenv("SMTP_PORT","0") or 0)
-    user = os.getenv("SMTP_USER","").strip()
-    pwd  = os.getenv("SMTP_PASS","").strip()
-    to   = os.getenv("ALERT_EMAIL_TO","").strip()
-    if not (host and port and user and pwd and to): return
-    try:
-        msg = MIMEText(body, "plain")
-        msg["Subject"] = subject
-        msg["From"] = user
-        msg["To"] = to
-        with smtplib.SMTP(host, port, timeout=10) as s:
-            s.starttls()
-            s.login(user, pwd)
-            s.sendmail(user, [to], msg.as_string())
-    except Exception as e:
-        st.warning(f"Email failed: {e}")
+    alert_dispatcher().email(subject, body)
 
 # --------------------- Logging ---------------------
+@st.cache_resource
+def trade_journal() -> TradeJournal:
+    # durable, append-only; attach a Render Disk at TRADE_JOURNAL_PATH to keep it across deploys
+    return TradeJournal()
+
 def append_trade_log(entry: dict):
-    st.session_state.trade_log.append(entry)
-    # CSV (ephemeral). For persistence, attach a Render Disk or Google Sheets.
     try:
-        df = pd.DataFrame(st.session_state.trade_log)
-        df.to_csv("/tmp/trades.csv", index=False)
+        trade_journal().append(entry, user=st.session_state.user_id)
     except Exception as e:
-        st.warning(f"CSV write failed: {e}")
+        st.warning(f"Journal write failed: {e}")
+
+@st.cache_resource
+def sheet_logger() -> SheetLogger:
+    # one authorized worksheet handle per process; rows flushed in batches off-thread
+    return SheetLogger()
 
 def log_to_gsheet(entry: dict):
-    js = os.getenv("GSPREAD_SERVICE_ACCOUNT_JSON","").strip()
-    if not js: return
-    try:
-        import gspread
-        from google.oauth2.service_account import Credentials
-        info = json.loads(js)
-        scopes = ["https://www.googleapis.com/auth/spreadsheets"]
-        creds = Credentials.from_service_account_info(info, scopes=scopes)
-        gc = gspread.authorize(creds)
-        sh = gc.open_by_key(os.getenv("GSHEET_ID","").strip())  # set GSHEET_ID in env if you prefer
-        ws = sh.sheet1
-        ws.append_row([entry.get(k,"") for k in sorted(entry.keys())], value_input_option="USER_ENTERED")
-    except Exception as e:
-        st.warning(f"GSheet log failed: {e}")
+    sheet_logger().log(entry)
+
+@st.cache_resource
+def position_manager(user: str) -> PositionManager:
+    # one book per client code, outliving reruns and sessions; exits fire from its own threads
+    return PositionManager(quote_cache(), tick_cache=tick_cache(), journal=trade_journal(), sheet=sheet_logger(),
+                           alerts=alert_dispatcher(), user=user).start()
+
+@st.cache_resource
+def metrics_exporter():
+    # one /metrics listener per process (METRICS_PORT); the registry itself is module-global
+    REGISTRY.gauge("alerts_queued", lambda: sum(v for k, v in alert_dispatcher().metrics().items() if k.startswith("queued_")))
+    REGISTRY.gauge("gsheet_pending", sheet_logger().pending)
+    REGISTRY.gauge("market_data_hit_rate", lambda: market_cache().stats()["hit_rate"])
+    port = os.getenv("METRICS_PORT", "").strip()
+    return serve(int(port)) if port else None
+metrics_exporter()
 
 # --------------------- Login UI ---------------------
 if not st.session_state.logged_in:
@@ -290,14 +254,21 @@ if not st.session_state.logged_in:
         submitted = st.form_submit_button("Login")
 
     if submitted:
-        if not API_KEY:
+        if not (API_KEY or REPLAY):
             st.error("ANGEL_API_KEY missing in environment.")
         elif not (st.session_state.user_id and st.session_state.mpin and st.session_state.totp):
             st.error("Fill all fields.")
         else:
             try:
-                smart = SmartConnect(api_key=API_KEY)
-                auth = smart.generateSession(st.session_state.user_id, st.session_state.mpin, st.session_state.totp)
+                if REPLAY:
+                    from replay import from_env
+                    smart = from_env()
+                else:
+                    smart = SmartConnect(api_key=API_KEY)
+                # throttled per endpoint, orders first; retries and JWT refresh happen inside
+                smart = BrokerClient(smart)
+                with timer("api.generateSession"):
+                    auth = smart.generateSession(st.session_state.user_id, st.session_state.mpin, st.session_state.totp)
                 if not auth or not auth.get("status"): raise RuntimeError(auth.get("message","Login failed"))
                 st.session_state.smart = smart
                 st.session_state.auth = auth.get("data", {})
@@ -313,9 +284,15 @@ if not st.session_state.logged_in:
                 st.error(f"Login failed: {e}")
 
 # --------------------- Post-login UI ---------------------
+# The page is a set of fragments: a widget inside one reruns only that fragment, and
+# quotes / signal / positions / trade log also rerun on their own every `refresh_every`
+# seconds. Each fragment reads through the process-wide caches, so a full rerun
+# (index / strike controls) is cheap too.
 else:
     uid = st.session_state.user_id or ""
     st.success(f"Welcome, **{uid}**!")
+    pm = position_manager(uid)
+    pm.bind(st.session_state.smart)
 
     # Index & strike controls
     st.subheader("📊 Index & Strike")
@@ -323,222 +300,287 @@ else:
     with left:
         st.session_state.index_choice = st.selectbox("Index", ["NIFTY","BANKNIFTY","SENSEX"],
                                                      index=["NIFTY","BANKNIFTY","SENSEX"].index(st.session_state.index_choice))
+    with right:
+        st.select_slider("Auto-refresh", REFRESH_CHOICES, key="refresh_every",
+                         format_func=lambda s: f"{s}s" if s else "off",
+                         help="Quotes, signal, positions and trade log refresh on their own at this interval.")
+    every = st.session_state.refresh_every or None
     index = st.session_state.index_choice
+    st.toggle("Live tick feed (WebSocket)", key="use_feed",
+              help="Stream ticks for the future, chosen strikes and open positions instead of polling.")
+    feed = active_feed()
     step = atm_step_for_index(index)
     strike_mode = st.radio("Strike Mode", ["ATM","ITM","OTM"], horizontal=True)
     offset_steps = st.number_input("Offset Steps (x strike step)", min_value=0, max_value=20, value=0)
 
     # load scrip master
-    if st.session_state.scrips is None:
-        with st.spinner("Loading instruments…"):
-            st.session_state.scrips = load_scrip_master()
-    scrips = st.session_state.scrips
+    # shared index (not copied into session_state); rebuilt only when the disk cache changes
+    with st.spinner("Loading instruments…"):
+        scrips = getattr(st.session_state.smart, "replay_instruments", None) or load_instrument_index(scrip_master_version())
 
-    # pick FUTIDX & candles
-    fut_row = pick_nearest_future_row(scrips, index)
+    # pick FUTIDX
+    fut_row = scrips.nearest_future(index, market_now().date())
     if fut_row is None:
         st.error("No FUTIDX found for this index.")
         st.stop()
 
-    # fetch recent 5m candles (today - yesterday)
-    now = dt.datetime.now()
-    start = (now - dt.timedelta(days=5)).replace(hour=9, minute=15, second=0, microsecond=0)
-    candles = get_futidx_candles(st.session_state.smart, str(fut_row.get("token","")), start, now)
-
-    if candles.empty:
-        st.error("No candles received. Try again later.")
-        st.stop()
-
-    # compute live proxy spot and ATM
-    last_close = float(candles["close"].iloc[-1])
-    atm_base = int(round(last_close / step) * step)
-    if strike_mode == "ITM":
-        atm_strike = atm_base + (offset_steps * step) if index in ["NIFTY","SENSEX"] else atm_base + (offset_steps * step)
-    elif strike_mode == "OTM":
-        atm_strike = atm_base - (offset_steps * step) if index in ["NIFTY","SENSEX"] else atm_base - (offset_steps * step)
-    else:
-        atm_strike = atm_base
-
-    # nearest expiry + CE/PE rows
-    ce_row = pick_nearest_expiry_row_for_strike(scrips, index, atm_strike, "CE")
-    pe_row = pick_nearest_expiry_row_for_strike(scrips, index, atm_strike, "PE")
-
-    # show levels
-    a,b,c = st.columns(3)
-    a.metric("FUTIDX Last", f"{last_close:.2f}")
-    b.metric("Step", step)
-    c.metric("Chosen Strike", atm_strike)
-
-    # LTPs for chosen CE/PE
-    ce_ltp = pe_ltp = None
-    if ce_row is not None:
-        ce_ltp = get_ltp(st.session_state.smart, ce_row.get("exch_seg","NFO"), ce_row.get("tradingsymbol",""), str(ce_row.get("token","")))
-    if pe_row is not None:
-        pe_ltp = get_ltp(st.session_state.smart, pe_row.get("exch_seg","NFO"), pe_row.get("tradingsymbol",""), str(pe_row.get("token","")))
-
-    st.markdown("### 🎯 Selected Options")
-    c1,c2 = st.columns(2)
-    with c1:
-        st.write("**CALL (CE)**")
-        st.json({
-            "symbol": ce_row.get("tradingsymbol","") if ce_row is not None else "",
-            "expiry": str(ce_row.get("expiry","")) if ce_row is not None else "",
-            "token":  str(ce_row.get("token",""))  if ce_row is not None else "",
-            "ltp": None if ce_ltp is None else round(ce_ltp,2)
-        })
-    with c2:
-        st.write("**PUT (PE)**")
-        st.json({
-            "symbol": pe_row.get("tradingsymbol","") if pe_row is not None else "",
-            "expiry": str(pe_row.get("expiry","")) if pe_row is not None else "",
-            "token":  str(pe_row.get("token",""))  if pe_row is not None else "",
-            "ltp": None if pe_ltp is None else round(pe_ltp,2)
-        })
+    if feed is not None: feed.subscribe([("NFO", str(fut_row.get("token","")))])
+
+    def market_view() -> Optional[dict]:
+        """Recent FUTIDX candles, the chosen strike and its CE/PE rows, as of now. None if no candles."""
+        now = market_now()
+        token = str(fut_row.get("token",""))
+        # recent base-interval candles (today - yesterday); cached for CANDLE_TTL across sessions
+        start = (now - dt.timedelta(days=5)).replace(hour=9, minute=15, second=0, microsecond=0)
+        candles = get_futidx_candles(st.session_state.smart, token, start, now)
+        if candles.empty:
+            st.error("No candles received. Try again later.")
+            return None
+        # live proxy spot and ATM
+        last_close = float(candles["close"].iloc[-1])
+        atm_strike = strike_for_mode(last_close, step, strike_mode, int(offset_steps))
+        return {"now": now, "token": token, "candles": candles, "last_close": last_close, "atm_strike": atm_strike,
+                "ce": scrips.option_for_strike(index, atm_strike, "CE", now.date()),
+                "pe": scrips.option_for_strike(index, atm_strike, "PE", now.date())}
+
+    if market_view() is None: st.stop()
+
+    def _inst(row):
+        return (row.get("exch_seg","NFO"), row.get("tradingsymbol",""), str(row.get("token","")))
+
+    @st.fragment(run_every=every)
+    def quotes_panel():
+        view = market_view()
+        if view is None: return
+        ce_row, pe_row = view["ce"], view["pe"]
+
+        # show levels
+        a,b,c = st.columns(3)
+        a.metric("FUTIDX Last", f"{view['last_close']:.2f}")
+        b.metric("Step", step)
+        c.metric("Chosen Strike", view["atm_strike"])
+
+        # LTPs for chosen CE/PE + every open position, one batch (the positions panel then reads them cached)
+        wanted = [_inst(r) for r in (ce_row, pe_row) if r is not None]
+        wanted += pm.book.keys()
+        if feed is not None: feed.subscribe([(w[0], w[2]) for w in wanted])
+        quotes = get_ltps(st.session_state.smart, wanted)
+        ce_ltp = quotes.get((_inst(ce_row)[0], _inst(ce_row)[2])) if ce_row is not None else None
+        pe_ltp = quotes.get((_inst(pe_row)[0], _inst(pe_row)[2])) if pe_row is not None else None
+
+        st.markdown("### 🎯 Selected Options")
+        c1,c2 = st.columns(2)
+        with c1:
+            st.write("**CALL (CE)**")
+            st.json({
+                "symbol": ce_row.get("tradingsymbol","") if ce_row is not None else "",
+                "expiry": str(ce_row.get("expiry","")) if ce_row is not None else "",
+                "token":  str(ce_row.get("token",""))  if ce_row is not None else "",
+                "ltp": None if ce_ltp is None else round(ce_ltp,2)
+            })
+        with c2:
+            st.write("**PUT (PE)**")
+            st.json({
+                "symbol": pe_row.get("tradingsymbol","") if pe_row is not None else "",
+                "expiry": str(pe_row.get("expiry","")) if pe_row is not None else "",
+                "token":  str(pe_row.get("token",""))  if pe_row is not None else "",
+                "ltp": None if pe_ltp is None else round(pe_ltp,2)
+            })
 
-    st.divider()
+    @st.fragment
+    def chain_panel():
+        # nearest-expiry chain around ATM: one batched quote call, IV/Greeks for every leg at once
+        st.session_state.chain_df = None
+        with st.expander("🧮 Option chain (IV & Greeks)"):
+            chain_width = st.slider("Strikes each side of ATM", 2, 20, 8)
+            if st.toggle("Show chain", key="show_chain"):
+                view = market_view()
+                if view is None: return
+                last_close = view["last_close"]
+                chain_df = option_chain(st.session_state.smart, scrips, quote_cache(), index, last_close, int(chain_width), now=view["now"])
+                st.session_state.chain_df = chain_df
+                for e in chain_df.attrs.get("errors", []): st.warning(e)
+                st.caption(f"Expiry {chain_df.attrs.get('expiry')} · ATM {chain_df.attrs.get('atm')} · "
+                           f"{chain_df.attrs.get('chain_ms')} ms · Greeks on FUTIDX {last_close:.2f} (Black-76)")
+                st.dataframe(chain_df.round({c: 4 for c in chain_df.columns if c.endswith(("_iv","_delta","_gamma","_theta","_vega"))}),
+                             use_container_width=True, hide_index=True)
 
     # --------------------- Signals (buy-only) ---------------------
-    with st.expander("⚙️ Signal Settings", expanded=True):
-        ema_fast = st.number_input("EMA Fast", 1, 50, 5)
-        ema_slow = st.number_input("EMA Slow", 2, 100, 13)
-        breakout_lookback = st.number_input("Breakout lookback (bars)", 3, 50, 10)
-        atr_len = st.number_input("ATR length", 5, 30, 14)
-        session_start = st.text_input("Session start (HH:MM)", "09:15")
-        session_end   = st.text_input("Session end (HH:MM)", "15:25")
-        _ = st.text("Signals run on FUTIDX 5m candles.")
-
-    side, ctx = generate_signal(
-        candles, ema_fast=int(ema_fast), ema_slow=int(ema_slow),
-        breakout_lookback=int(breakout_lookback), atr_len=int(atr_len),
-        session_start=session_start, session_end=session_end
-    )
-    st.write("**Signal:**", side or "No setup")
-    st.write("Context:", ctx)
-
-    # Suggested instrument to buy
-    chosen_opt = None
-    if side == "CE" and ce_row is not None:
-        chosen_opt = ("NFO", ce_row.get("tradingsymbol",""), str(ce_row.get("token","")), ce_ltp)
-    elif side == "PE" and pe_row is not None:
-        chosen_opt = ("NFO", pe_row.get("tradingsymbol",""), str(pe_row.get("token","")), pe_ltp)
+    @st.fragment(run_every=every)
+    def signal_panel():
+        with st.expander("⚙️ Signal Settings", expanded=True):
+            st.number_input("EMA Fast", 1, 50, 5, key="ema_fast")
+            st.number_input("EMA Slow", 2, 100, 13, key="ema_slow")
+            st.number_input("Breakout lookback (bars)", 3, 50, 10, key="breakout_lookback")
+            st.number_input("ATR length", 5, 30, 14, key="atr_len")
+            st.text_input("Session start (HH:MM)", "09:15", key="session_start")
+            st.text_input("Session end (HH:MM)", "15:25", key="session_end")
+            # every timeframe is resampled from the one base series: no extra API calls
+            tf_choices = [k for k, m in TIMEFRAMES.items() if m >= BASE_MINUTES and m % BASE_MINUTES == 0]
+            signal_tf = st.selectbox("Signal timeframe", tf_choices[:-1], key="signal_tf")
+            st.selectbox("Confirm on higher timeframe (EMA trend)",
+                         ["off"] + [k for k in tf_choices if TIMEFRAMES[k] > TIMEFRAMES[signal_tf]], key="confirm_tf")
+            _ = st.text(f"Signals run on FUTIDX {signal_tf} bars built from {BASE_INTERVAL} candles.")
+        view = market_view()
+        if view is None: return
+        side, ctx = cached_signal(view["token"], view["candles"], signal_params())
+        st.write("**Signal:**", side or "No setup")
+        st.write("Context:", ctx)
+
+    @st.fragment
+    def scanner_panel():
+        # all indices at once, sharing this process's candle store, engines, signal memo and quote cache
+        with st.expander("🔭 Scanner — all indices"):
+            scan_offsets = st.multiselect("Strike offsets (x step, + = ITM as above)", list(range(-5, 6)), default=[0])
+            if st.toggle("Run scanner", key="run_scanner"):
+                params = signal_params()
+                board = scan(st.session_state.smart, scrips, candle_store(), quote_cache(),
+                             offsets=scan_offsets or [0], signal_fn=lambda tok, df: cached_signal(tok, df, params),
+                             candles_fn=lambda tok, a, b: cached_candles(st.session_state.smart, tok, a, b), now=market_now())
+                for e in board.attrs.get("errors", []): st.warning(e)
+                st.caption(f"Scan took {board.attrs.get('scan_ms')} ms")
+                st.dataframe(board, use_container_width=True)
 
     # --------------------- Orders (paper by default) ---------------------
-    st.subheader("🧾 Order Settings")
-    col1,col2,col3 = st.columns(3)
-    with col1:
-        qty = st.number_input("Quantity (lots * lot-size or absolute)", 1, 10000, 25)
-    with col2:
-        rr_target = st.number_input("Target RR (x ATR spot proxy)", 0.5, 5.0, 1.5, step=0.1)
-    with col3:
-        rr_stop   = st.number_input("Stop RR (x ATR spot proxy)", 0.2, 5.0, 1.0, step=0.1)
-
-    enable_live_orders = st.toggle("✅ Place LIVE orders (danger)", value=False,
-                                   help="If OFF: paper trade only. If ON: placeOrder() on Angel.")
-
     def place_live_order(exchange: str, tradingsymbol: str, token: str, txn_type: str, qty: int, product="MIS", ordertype="MARKET"):
-        try:
-            orderparams = {
-                "variety": "NORMAL",
-                "tradingsymbol": tradingsymbol,
-                "symboltoken": str(token),
-                "transactiontype": txn_type,  # BUY / SELL
-                "exchange": exchange,         # NFO
-                "ordertype": ordertype,       # MARKET/LIMIT
-                "producttype": product,       # MIS/NRML/CNC
-                "duration": "DAY",
-                "quantity": int(qty),
-            }
-            r = st.session_state.smart.placeOrder(orderparams)
-            return r
-        except Exception as e:
-            return {"status": False, "message": str(e)}
-
-    st.markdown("### 🚦 Actions")
-
-    if st.button("Evaluate & (Paper) Execute"):
-        if chosen_opt is None:
-            st.warning("No eligible option for the current signal.")
-        else:
-            exch, tsym, tok, ltp0 = chosen_opt
-            side_txn = "BUY"  # buy-only
-            entry_ltp = get_ltp(st.session_state.smart, exch, tsym, tok) or ltp0 or 0.0
-
-            # Derive simple option targets using spot ATR context:
-            # We use ctx['target'] and ctx['stop'] (spot), map to option >= proportional %
-            if ctx.get("entry_price") and ctx.get("target") and ctx.get("stop"):
-                spot_entry = ctx["entry_price"]; spot_tgt = ctx["target"]; spot_stp = ctx["stop"]
-                # percentage move on spot
-                pct_up = (spot_tgt/spot_entry - 1.0)
-                pct_dn = (1.0 - spot_stp/spot_entry)
-                opt_tgt = entry_ltp * (1.0 + max(0.15, pct_up*1.5))  # conservative uplift
-                opt_sl  = max(0.05, min(0.35, pct_dn*1.2)) * entry_ltp
-                target_price = round(opt_tgt, 2)
-                stop_price   = round(entry_ltp - opt_sl, 2)
+        return orders.place_live_order(st.session_state.smart, exchange, tradingsymbol, token, txn_type, qty, product, ordertype)
+
+    @st.fragment
+    def orders_panel():
+        st.subheader("🧾 Order Settings")
+        col1,col2,col3 = st.columns(3)
+        with col1:
+            qty = st.number_input("Quantity (lots * lot-size or absolute)", 1, 10000, 25)
+        with col2:
+            rr_target = st.number_input("Target RR (x ATR spot proxy)", 0.5, 5.0, 1.5, step=0.1)
+        with col3:
+            rr_stop   = st.number_input("Stop RR (x ATR spot proxy)", 0.2, 5.0, 1.0, step=0.1)
+
+        enable_live_orders = st.toggle("✅ Place LIVE orders (danger)", value=False,
+                                       help="If OFF: paper trade only. If ON: placeOrder() on Angel.")
+
+        st.markdown("### 🚦 Actions")
+        done = st.session_state.pop("order_result", None)  # set just before the full rerun below
+        if done:
+            msg, resp = done
+            if resp is not None: st.write("Live order response:", resp)
+            st.success(msg)
+
+        if st.button("Evaluate & (Paper) Execute"):
+            # evaluated at click time on the latest bar; the memo makes this a lookup
+            view = market_view()
+            side, ctx = cached_signal(view["token"], view["candles"], signal_params()) if view else (None, {})
+            row = {"CE": view["ce"], "PE": view["pe"]}.get(side) if view else None
+            if row is None:
+                st.warning("No eligible option for the current signal.")
             else:
-                target_price = round(entry_ltp * 1.25, 2)
-                stop_price   = round(entry_ltp * 0.90, 2)
+                exch, tsym, tok = "NFO", row.get("tradingsymbol",""), str(row.get("token",""))
+                side_txn = "BUY"  # buy-only
+                entry_ltp = get_ltp(st.session_state.smart, exch, tsym, tok)
+                if not entry_ltp:
+                    # no quote: no order and no position opened at 0.0 (the engine skips these too)
+                    st.warning(f"No quote for {tsym}; entry skipped.")
+                    return
+
+                resp = None
+                if enable_live_orders:
+                    resp = place_live_order(exch, tsym, tok, side_txn, qty)
+                    status = "LIVE-PLACED" if (resp or {}).get("status") else "LIVE-FAIL"
+                else:
+                    status = "PAPER"
+
+                # option target/stop from the spot ATR context (strategy.option_levels);
+                # with the chain open, the leg's delta/gamma do the spot -> option mapping
+                entry = orders.make_entry(index, side, exch, tsym, tok, qty, entry_ltp, ctx, status,
+                                          greeks=leg_greeks(st.session_state.chain_df, tok))
+                pm.enter(entry)
+                if status == "LIVE-PLACED": pm.auto = False  # unattended SELLs need re-arming by hand
+                append_trade_log({**entry, "event": "ENTER"})
+                log_to_gsheet({**entry, "event": "ENTER"})
+
+                # Alerts
+                send_webhook({"type":"enter", **entry})
+                send_email(
+                    subject=f"[ENTER-{status}] {index} {side} {tsym}",
+                    body=json.dumps(entry, indent=2)
+                )
+                # positions and trade log show the entry now, not on their next tick
+                st.session_state.order_result = (f"Order logged → {status}"
+                                                 + (" · auto-exit is now off" if status == "LIVE-PLACED" else ""), resp)
+                st.rerun()
 
-            if enable_live_orders:
-                resp = place_live_order(exch, tsym, tok, side_txn, qty)
-                st.write("Live order response:", resp)
-                status = "LIVE-PLACED" if (resp or {}).get("status") else "LIVE-FAIL"
-            else:
-                status = "PAPER"
-
-            entry = {
-                "ts": dt.datetime.now().isoformat(timespec="seconds"),
-                "index": index,
-                "signal": side,
-                "exchange": exch,
-                "symbol": tsym,
-                "token": tok,
-                "qty": int(qty),
-                "entry_ltp": round(entry_ltp,2),
-                "target_price": target_price,
-                "stop_price": stop_price,
-                "status": status,
-            }
-            st.session_state.positions.append(entry)
-            append_trade_log({**entry, "event": "ENTER"})
-            log_to_gsheet({**entry, "event": "ENTER"})
-
-            # Alerts
-            send_webhook({"type":"enter", **entry})
-            send_email(
-                subject=f"[ENTER-{status}] {index} {side} {tsym}",
-                body=json.dumps(entry, indent=2)
-            )
-            st.success(f"Order logged → {status}")
-
-    # Manage open paper positions: simple MTM & exit buttons
-    if st.session_state.positions:
-        st.markdown("### 📒 Open Positions (paper/live view)")
-        rows = []
-        for pos in st.session_state.positions:
-            # get current LTP
-            ltp_now = get_ltp(st.session_state.smart, pos["exchange"], pos["symbol"], pos["token"]) or pos["entry_ltp"]
-            mtm = (ltp_now - pos["entry_ltp"]) * pos["qty"]
-            rows.append({**pos, "ltp_now": round(ltp_now,2), "mtm": round(mtm,2)})
-        dfp = pd.DataFrame(rows)
-        st.dataframe(dfp, use_container_width=True)
-
-        # Exit all (paper)
-        if st.button("Exit All (Paper)"):
-            new_positions = []
-            for pos in st.session_state.positions:
-                ltp_now = get_ltp(st.session_state.smart, pos["exchange"], pos["symbol"], pos["token"]) or pos["entry_ltp"]
-                exit_entry = {**pos, "exit_ltp": round(ltp_now,2), "event":"EXIT", "ts": dt.datetime.now().isoformat(timespec="seconds")}
-                append_trade_log(exit_entry); log_to_gsheet(exit_entry)
-                send_webhook({"type":"exit", **exit_entry})
-                send_email(subject=f"[EXIT] {pos['index']} {pos['signal']} {pos['symbol']}",
-                           body=json.dumps(exit_entry, indent=2))
-            st.session_state.positions = new_positions
-            st.success("All paper positions exited.")
-
-    # Trade log viewer
-    if st.session_state.trade_log:
-        st.markdown("### 🧾 Trade Log (latest 50)")
-        st.dataframe(pd.DataFrame(st.session_state.trade_log).tail(50), use_container_width=True)
+    @st.fragment(run_every=every)
+    def positions_panel():
+        # Open positions: the position manager checks target/stop on every tick / quote poll.
+        # Auto-exit belongs to that shared manager (one per client code), so the toggle mirrors
+        # it — another tab may have changed it — and writes it back only when flipped here.
+        live = any(str(p.get("status", "")).startswith("LIVE-PLACED") for p in pm.positions())
+        st.session_state.auto_exit = pm.auto
+        st.toggle("🛡️ Auto-exit at target / stop (all your sessions)", key="auto_exit",
+                  on_change=lambda: setattr(pm, "auto", st.session_state.auto_exit),
+                  help="Shared by every open session of this account. Exits fire from the server within ms of a "
+                       "trigger (SELL for live positions), no rerun needed. Booking a LIVE entry switches it off.")
+        if len(pm.book):
+            st.markdown("### 📒 Open Positions (paper/live view)")
+            pm.apply(get_ltps(st.session_state.smart, pm.book.keys()))
+            st.dataframe(pd.DataFrame(pm.positions()), use_container_width=True)
+
+            confirm = not live or st.checkbox("Confirm: Exit All places market SELLs for the LIVE positions")
+            if st.button("Exit All", disabled=not confirm):
+                keys = pm.book.keys()
+                with alert_dispatcher().digest(f"[EXIT-ALL] {len(keys)} positions"):
+                    done = pm.exit_all(get_ltps(st.session_state.smart, keys))
+                left = len(pm.book)
+                st.success(f"{len(done)} positions exited (live ones with a SELL)."
+                           + (f" {left} SELL(s) failed and will be retried." if left else ""))
+        if pm.exits:
+            with st.expander(f"↩️ Recent exits ({len(pm.exits)})"):
+                st.dataframe(pd.DataFrame(list(pm.exits)[::-1]), use_container_width=True)
+        if pm.last_error: st.caption(f"Position manager: {pm.last_error}")
+
+    @st.fragment(run_every=every)
+    def trade_log_panel():
+        # Trade log viewer (journal: survives the session, indexed by symbol/day)
+        journal = trade_journal()
+        if journal.count(st.session_state.user_id):
+            st.markdown("### 🧾 Trade Log (latest 50)")
+            f1,f2 = st.columns(2)
+            with f1:
+                sym = st.selectbox("Symbol", ["All"] + journal.symbols(st.session_state.user_id))
+            with f2:
+                days = st.date_input("Days", value=(), help="Leave empty for all days")
+            d_from, d_to = (tuple(days) + (None, None))[:2] if days else (None, None)
+            log_df = journal.query(st.session_state.user_id, symbol=None if sym == "All" else sym,
+                                   day_from=d_from, day_to=d_to or d_from, limit=50)
+            st.dataframe(log_df, use_container_width=True)
+
+    quotes_panel()
+    chain_panel()
+    st.divider()
+    signal_panel()
+
+    # headless engine (engine.py) snapshot, if one is running
+    eng_state = read_state()
+    if eng_state:
+        with st.expander("🛰️ Headless engine"):
+            st.caption(f"Heartbeat {eng_state.get('heartbeat')} · execute={eng_state.get('execute')}")
+            st.json((eng_state.get("indices") or {}).get(index) or {})
+
+    scanner_panel()
+    orders_panel()
+    positions_panel()
+    trade_log_panel()
+
+    with st.expander("📮 Queues & caches"):
+        st.json({"alerts": alert_dispatcher().metrics(), "gsheet": sheet_logger().metrics(),
+                 "market_data": market_cache().stats()})
+
+    # per-operation latency / call counts / error rates since process start (all sessions)
+    if st.toggle("⏱️ Latency diagnostics", key="show_metrics"):
+        st.dataframe(pd.DataFrame(REGISTRY.snapshot()), use_container_width=True, hide_index=True)
+        m1, m2 = st.columns(2)
+        m1.download_button("Prometheus snapshot", REGISTRY.prometheus_text(), "metrics.prom", "text/plain")
+        if m2.button("Reset timings"): REGISTRY.reset()
 
     st.divider()
     if st.button("Logout"):
@@ -0,0 +1,210 @@
+# backtest.py — vectorized backtest of the buy-only generate_signal rules
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from strategy import atr, ema, option_level_fracs, vwap
+from timeframes import DAY, SESSION_OPEN, bucket_starts, minutes_of
+
+VWAP_WINDOW_DAYS = 5  # app.py / engine.py fetch candles from (now - 5 days) at the open; live VWAP spans that
+
+
+def _seconds_of_day(times: pd.Series) -> np.ndarray:
+    return (times.dt.hour * 3600 + times.dt.minute * 60 + times.dt.second).to_numpy()
+
+def _hhmm_seconds(hhmm: str) -> int:
+    h, m = map(int, hhmm.split(":"))
+    return h * 3600 + m * 60
+
+def _cached(cache: Optional[dict], key: tuple, fn):
+    if cache is None: return fn()
+    if key not in cache: cache[key] = fn()
+    return cache[key]
+
+def live_window_starts(times: pd.Series, days: int = VWAP_WINDOW_DAYS, session_open: str = SESSION_OPEN) -> np.ndarray:
+    """Row where each bar's live candle window starts: (the bar's day - `days`) at the session open."""
+    minute = bucket_starts(times, 1)  # the anchor is a whole minute: flooring moves no bar across it
+    day_open = bucket_starts(times, DAY, session_open)
+    return np.searchsorted(minute, day_open - days * DAY * 60 * 10**9, side="left")
+
+def vwap_windowed(df: pd.DataFrame, days: int = VWAP_WINDOW_DAYS) -> np.ndarray:
+    """strategy.vwap() of every bar's live window (live_window_starts), all bars at once."""
+    pv = ((df["high"] + df["low"] + df["close"]) / 3.0 * df["volume"]).to_numpy(float)
+    cum_pv, cum_v = np.r_[0.0, np.cumsum(pv)], np.r_[0.0, np.cumsum(df["volume"].to_numpy(float))]
+    lo, hi = live_window_starts(df["time"], days), np.arange(1, len(df) + 1)
+    v = cum_v[hi] - cum_v[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(v != 0, (cum_pv[hi] - cum_pv[lo]) / v, np.nan)
+
+def htf_trend_per_bar(df: pd.DataFrame, tf, ema_fast=5, ema_slow=13) -> np.ndarray:
+    """
+    strategy.htf_trend(resample(df[:i+1], tf)) for every i at once. The open bucket's
+    close is bar i's close, so each EMA is one adjust=False step from the EMA of the
+    finished buckets before it.
+    """
+    close = df["close"].to_numpy(float)
+    key = bucket_starts(df["time"], minutes_of(tf))
+    new = np.r_[True, key[1:] != key[:-1]]
+    bucket = np.cumsum(new) - 1
+    done = close[np.r_[np.flatnonzero(new)[1:] - 1, len(close) - 1]]  # close of each bucket
+    def at_bar(length):
+        a = 2.0 / (length + 1)
+        prev = np.r_[np.nan, ema(pd.Series(done), length).to_numpy()[:-1]][bucket]
+        return np.where(bucket == 0, close, ((1.0 - a) * prev + a * close) / ((1.0 - a) + a))
+    return np.sign(at_bar(ema_fast) - at_bar(ema_slow)).astype(int)
+
+def signals_vectorized(df: pd.DataFrame,
+                       ema_fast=5, ema_slow=13,
+                       breakout_lookback=10,
+                       atr_len=14,
+                       session_start="09:15", session_end="15:25",
+                       confirm=None, cache: Optional[dict] = None,
+                       vwap_days: Optional[int] = VWAP_WINDOW_DAYS) -> pd.DataFrame:
+    """
+    generate_signal() for every bar in one pass: row i holds what the live call returns at
+    bar i. Columns: side ('CE' / 'PE' / None), entry, stop, target, atr.
+    VWAP is anchored where the live candle window starts — `vwap_days` calendar days
+    before the bar's day, at the open (see live_window_starts) — not at the frame's first
+    bar, so years of history trade the same VWAP filter as the app. vwap_days=None
+    anchors it at the frame's first bar: row i is then exactly generate_signal(df[:i+1]).
+    Pass the same `cache` dict for repeated calls on one frame (parameter sweeps) to
+    reuse indicator columns shared between parameter sets. For a `timeframe` other than
+    the frame's own, pass resample(df, timeframe) — signals then fire on finished bars.
+    """
+    df = df.reset_index(drop=True)
+    close = df["close"].to_numpy(float)
+    ema_f = _cached(cache, ("ema", ema_fast), lambda: ema(df["close"], ema_fast).to_numpy())
+    ema_s = _cached(cache, ("ema", ema_slow), lambda: ema(df["close"], ema_slow).to_numpy())
+    if not (vwap_days and pd.api.types.is_datetime64_any_dtype(df["time"])): vwap_days = None
+    vw = _cached(cache, ("vwap", vwap_days),
+                 lambda: vwap_windowed(df, vwap_days) if vwap_days else vwap(df).astype(float).to_numpy())
+    at = _cached(cache, ("atr", atr_len), lambda: atr(df, atr_len).to_numpy())
+    hh = _cached(cache, ("hh", breakout_lookback), lambda: df["high"].shift(1).rolling(breakout_lookback).max().to_numpy())
+    ll = _cached(cache, ("ll", breakout_lookback), lambda: df["low"].shift(1).rolling(breakout_lookback).min().to_numpy())
+
+    enough = np.arange(1, len(df) + 1) >= max(ema_slow, breakout_lookback, atr_len) + 2
+    if pd.api.types.is_datetime64_any_dtype(df["time"]):
+        sec = _cached(cache, ("sec",), lambda: _seconds_of_day(df["time"]))
+        inside = (sec >= _hhmm_seconds(session_start)) & (sec <= _hhmm_seconds(session_end))
+    else:
+        inside = np.ones(len(df), dtype=bool)
+    live = enough & inside & ~(at <= 0.006 * close)
+
+    bullish = live & (close > vw) & (ema_f > ema_s) & (close > hh)
+    bearish = live & ~bullish & (close < vw) & (ema_f < ema_s) & (close < ll)
+    if confirm:
+        trend = _cached(cache, ("htf", confirm, ema_fast, ema_slow), lambda: htf_trend_per_bar(df, confirm, ema_fast, ema_slow))
+        bullish, bearish = bullish & (trend > 0), bearish & (trend < 0)
+    side = np.where(bullish, "CE", np.where(bearish, "PE", None))
+
+    swing_lo = _cached(cache, ("swing_lo",), lambda: df["low"].rolling(3, min_periods=1).min().to_numpy())
+    swing_hi = _cached(cache, ("swing_hi",), lambda: df["high"].rolling(3, min_periods=1).max().to_numpy())
+    out = pd.DataFrame({"time": df["time"], "side": pd.Series(side, index=df.index, dtype=object)})
+    out["entry"] = np.where(bullish | bearish, close, np.nan)
+    out["stop"] = np.where(bullish, swing_lo, np.where(bearish, swing_hi, np.nan))
+    out["target"] = np.where(bullish, close + 1.5 * at, np.where(bearish, close - 1.5 * at, np.nan))
+    out["atr"] = at
+    return out
+
+
+def _session_last_bar(times: pd.Series) -> np.ndarray:
+    """Index of the last bar of each bar's trading day (MIS positions are flat by then)."""
+    day = times.dt.normalize().to_numpy() if pd.api.types.is_datetime64_any_dtype(times) else np.zeros(len(times))
+    ends = np.flatnonzero(np.r_[day[1:] != day[:-1], True])
+    return ends[np.searchsorted(ends, np.arange(len(day)))]
+
+
+def backtest(df: pd.DataFrame, qty: int = 1, one_at_a_time: bool = True,
+             signals: Optional[pd.DataFrame] = None, cache: Optional[dict] = None, **params) -> Tuple[pd.DataFrame, dict]:
+    """
+    Simulate every signal the way "Evaluate & (Paper) Execute" would trade it: enter at the
+    signal bar's close, exit on the first later bar whose range reaches the spot target or
+    stop (stop wins a same-bar tie), else at the session's last close.
+
+    Option leg: the same option_level_fracs() mapping as the button — a target hit earns
+    `up`, a stop hit loses `dn`; a session-end exit earns the fraction of the way price got
+    to the target (or stop), scaled the same way.
+
+    Returns (trades, summary). P&L is in spot points x qty and in option-return terms.
+    """
+    df = df.reset_index(drop=True)
+    sig = signals if signals is not None else signals_vectorized(df, cache=cache, **params)
+    entries = np.flatnonzero(sig["side"].notna().to_numpy())
+    cols = ["entry_time", "exit_time", "side", "entry", "target", "stop", "exit", "exit_reason", "pnl_points", "option_ret"]
+    if len(entries) == 0:
+        return pd.DataFrame(columns=cols), summarize(pd.DataFrame(columns=cols))
+
+    high, low, close = df["high"].to_numpy(float), df["low"].to_numpy(float), df["close"].to_numpy(float)
+    session_end = _cached(cache, ("session_last",), lambda: _session_last_bar(df["time"]))[entries]
+    is_ce = (sig["side"].to_numpy()[entries] == "CE")
+    entry = sig["entry"].to_numpy()[entries]
+    target = sig["target"].to_numpy()[entries]
+    stop = sig["stop"].to_numpy()[entries]
+
+    # walk forward bar-by-bar for all open trades at once (horizon <= one session)
+    exit_at = session_end.copy()
+    reason = np.full(len(entries), "session", dtype=object)
+    open_ = entries < session_end
+    for h in range(1, int((session_end - entries).max(initial=0)) + 1):
+        j = entries + h
+        active = open_ & (j <= session_end)
+        if not active.any(): break
+        jj = np.minimum(j, len(df) - 1)
+        hit_stop = active & np.where(is_ce, low[jj] <= stop, high[jj] >= stop)
+        hit_tgt = active & ~hit_stop & np.where(is_ce, high[jj] >= target, low[jj] <= target)
+        exit_at = np.where(hit_stop | hit_tgt, jj, exit_at)
+        reason = np.where(hit_stop, "stop", np.where(hit_tgt, "target", reason))
+        open_ &= ~(hit_stop | hit_tgt)
+
+    exit_px = np.where(reason == "stop", stop, np.where(reason == "target", target, close[exit_at]))
+    direction = np.where(is_ce, 1.0, -1.0)
+    pnl = (exit_px - entry) * direction * qty
+
+    up, dn = option_level_fracs(entry, target, stop)
+    progress = np.where(pnl >= 0,
+                        (exit_px - entry) / np.where(target != entry, target - entry, np.nan),
+                        (exit_px - entry) / np.where(stop != entry, stop - entry, np.nan))
+    progress = np.nan_to_num(progress)
+    option_ret = np.where(reason == "target", up, np.where(reason == "stop", -dn,
+                          np.where(pnl >= 0, progress * up, -progress * dn)))
+
+    trades = pd.DataFrame({
+        "entry_time": df["time"].iloc[entries].reset_index(drop=True),
+        "exit_time": df["time"].iloc[exit_at].reset_index(drop=True),
+        "side": np.where(is_ce, "CE", "PE"), "entry": entry, "target": target, "stop": stop,
+        "exit": exit_px, "exit_reason": reason, "pnl_points": pnl, "option_ret": option_ret,
+    })
+    if one_at_a_time:
+        # greedy: skip signals that fire while a previous trade is still open
+        keep, busy_until = np.zeros(len(entries), dtype=bool), -1
+        for k in range(len(entries)):
+            if entries[k] > busy_until:
+                keep[k], busy_until = True, exit_at[k]
+        trades = trades[keep].reset_index(drop=True)
+    return trades, summarize(trades)
+
+
+def _max_drawdown(pnl: np.ndarray) -> float:
+    if len(pnl) == 0: return 0.0
+    equity = np.cumsum(pnl)
+    return float(np.max(np.maximum.accumulate(np.r_[0.0, equity])[1:] - equity))
+
+def summarize(trades: pd.DataFrame) -> dict:
+    n = len(trades)
+    pnl = trades["pnl_points"].to_numpy(float) if n else np.array([])
+    ret = trades["option_ret"].to_numpy(float) if n else np.array([])
+    wins = int((pnl > 0).sum())
+    return {
+        "trades": n,
+        "wins": wins,
+        "losses": int((pnl < 0).sum()),
+        "hit_rate": round(wins / n, 4) if n else 0.0,
+        "pnl_points": round(float(pnl.sum()), 2),
+        "avg_pnl_points": round(float(pnl.mean()), 2) if n else 0.0,
+        "max_drawdown_points": round(_max_drawdown(pnl), 2),
+        "option_ret_total": round(float(ret.sum()), 4),
+        "max_drawdown_option_ret": round(_max_drawdown(ret), 4),
+    }
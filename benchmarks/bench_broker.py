@@ -0,0 +1,117 @@
+# benchmarks/bench_broker.py — BrokerClient vs raw calls against a broker that enforces its rate limits
+# Run from the repo root:  python -m benchmarks.bench_broker [seconds]
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from broker import BrokerClient, RateLimiter
+
+RATE_LIMITED = {"status": False, "message": "Access denied because of exceeding access rate", "errorcode": "AB1004"}
+EXPIRED = {"status": False, "message": "Invalid Token", "errorcode": "AG8001", "data": None}
+ENFORCED = {"placeOrder": 20, "ltpData": 10, "getCandleData": 3}  # requests per rolling second
+
+
+class LimitedBroker:
+    """Rejects anything over ENFORCED per rolling second; the JWT expires every `jwt_calls` calls."""
+
+    def __init__(self, jwt_calls: int = 0):
+        self._lock = threading.Lock()
+        self._seen = {k: deque() for k in ENFORCED}
+        self.ok, self.limited, self.stamps = Counter(), Counter(), []
+        self.jwt_calls, self._since_login, self.refresh_token, self.refreshes = jwt_calls, 0, "r0", 0
+
+    def _admit(self, endpoint: str):
+        now = time.monotonic()
+        with self._lock:
+            q = self._seen[endpoint]
+            while q and q[0] <= now - 1.0: q.popleft()
+            if len(q) >= ENFORCED[endpoint]:
+                self.limited[endpoint] += 1; return dict(RATE_LIMITED)
+            q.append(now)
+            self._since_login += 1
+            if self.jwt_calls and self._since_login > self.jwt_calls: return dict(EXPIRED)
+            self.ok[endpoint] += 1
+            self.stamps.append((now, endpoint))
+        time.sleep(0.005)  # network
+        return {"status": True, "data": {"ltp": 1.0}}
+
+    def generateToken(self, refresh_token):
+        with self._lock:
+            self._since_login, self.refreshes = 0, self.refreshes + 1
+        return {"status": True, "data": {"jwtToken": "x"}}
+
+    def ltpData(self, exch, tsym, token): return self._admit("ltpData")
+    def getCandleData(self, params): return self._admit("getCandleData")
+    def placeOrder(self, params): return self._admit("placeOrder")
+
+
+def _load(client, seconds: float, order_lat: list):
+    t0 = time.monotonic()
+    stop = t0 + seconds
+    def hammer(fn):
+        while time.monotonic() < stop: fn()
+    def orders():
+        while time.monotonic() < stop:
+            t0 = time.perf_counter()
+            client.placeOrder({})
+            order_lat.append((time.perf_counter() - t0) * 1e3)
+            time.sleep(0.2)
+    threads = [threading.Thread(target=hammer, args=(lambda: client.getCandleData({}),)) for _ in range(6)]
+    threads += [threading.Thread(target=hammer, args=(lambda: client.ltpData("NFO", "X", "1"),)) for _ in range(6)]
+    threads += [threading.Thread(target=orders)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return t0, stop
+
+
+def check_priority() -> list:
+    """With the account bucket drained, a queued order is served before earlier-queued candle requests."""
+    lim = RateLimiter(account=(5.0, 1.0))
+    lim.acquire("getCandleData", 2)  # empty the account bucket
+    served, lock = [], threading.Lock()
+    def go(ep, lane):
+        lim.acquire(ep, lane)
+        with lock: served.append(ep)
+    ts = [threading.Thread(target=go, args=("getCandleData", 2)) for _ in range(2)]
+    for t in ts: t.start()
+    time.sleep(0.02)
+    ts.append(threading.Thread(target=go, args=("placeOrder", 0))); ts[-1].start()
+    for t in ts: t.join()
+    assert served[0] == "placeOrder", f"order not served first: {served}"
+    return served
+
+
+def check_refresh(threads: int = 8) -> int:
+    """Many threads seeing the same expired JWT trigger exactly one refresh, and every call then succeeds."""
+    raw = LimitedBroker(jwt_calls=5)
+    client = BrokerClient(raw, RateLimiter(scale=100.0))
+    bad = []
+    def go():
+        r = client.ltpData("NFO", "X", "1")
+        if not r.get("status"): bad.append(r)
+    ts = [threading.Thread(target=go) for _ in range(threads)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    assert not bad, bad[:2]
+    assert raw.refreshes == 1, f"{raw.refreshes} refreshes"
+    return raw.refreshes
+
+
+def main(seconds: float = 3.0):
+    print(f"priority: served {check_priority()}")
+    print(f"session: {check_refresh()} refresh for 8 threads on an expired JWT, all calls succeeded")
+    for name, wrap in (("raw SmartConnect", False), ("BrokerClient", True)):
+        raw, lat = LimitedBroker(), []
+        t0, stop = _load(BrokerClient(raw) if wrap else raw, seconds, lat)
+        lat.sort()
+        ok = Counter(ep for t, ep in raw.stamps if t < stop)  # queued calls still finish after `stop`
+        ok = {k: round(v / (stop - t0), 1) for k, v in sorted(ok.items())}
+        orders = f"order p50 {lat[len(lat)//2]:.1f} ms  max {lat[-1]:.1f} ms" if lat else "no order got through"
+        print(f"{name:17s} served/s {ok}  rejected {dict(raw.limited) or 0}  {orders}")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 3.0)
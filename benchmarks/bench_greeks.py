@@ -0,0 +1,86 @@
+# benchmarks/bench_greeks.py — vectorized IV/Greeks vs a per-strike scalar loop
+# Run from the repo root:  python -m benchmarks.bench_greeks [legs]
+from __future__ import annotations
+
+import math
+import sys
+import time
+
+import numpy as np
+
+from greeks import RISK_FREE, black76_greeks, black76_price, implied_vol
+
+
+def _price_scalar(F, K, T, s, call, r=RISK_FREE):
+    n = lambda x: 0.5 * math.erfc(-x / math.sqrt(2.0))
+    sd = s * math.sqrt(T)
+    d1 = (math.log(F / K) + 0.5 * sd * sd) / sd
+    d2 = d1 - sd
+    disc = math.exp(-r * T)
+    return disc * (F*n(d1) - K*n(d2)) if call else disc * (K*n(-d2) - F*n(-d1))
+
+def _greeks_scalar(F, K, T, s, call, r=RISK_FREE):
+    sd = s * math.sqrt(T)
+    d1 = (math.log(F / K) + 0.5 * sd * sd) / sd
+    disc, pdf = math.exp(-r * T), math.exp(-0.5 * d1 * d1) / math.sqrt(2.0 * math.pi)
+    n1 = 0.5 * math.erfc(-d1 / math.sqrt(2.0))
+    return {"delta": disc * n1 if call else -disc * (1.0 - n1), "gamma": disc * pdf / (F * sd),
+            "vega": disc * F * pdf * math.sqrt(T) / 100.0}
+
+def _iv_scalar(p, F, K, T, call, r=RISK_FREE):
+    lo, hi = 1e-4, 5.0
+    for _ in range(100):  # plain bisection: slow but obviously right
+        mid = 0.5 * (lo + hi)
+        if _price_scalar(F, K, T, mid, call, r) > p: hi = mid
+        else: lo = mid
+    return 0.5 * (lo + hi)
+
+
+def synthetic_chain(legs: int = 42, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    F = 22000.0
+    K = F + 50.0 * rng.integers(-40, 41, legs)
+    T = rng.uniform(0.5, 30, legs) / 365
+    sigma = rng.uniform(0.08, 0.6, legs)
+    call = rng.random(legs) < 0.5
+    return F, K, T, sigma, call
+
+
+def check_equivalence(legs: int = 2000) -> float:
+    F, K, T, sigma, call = synthetic_chain(legs)
+    price = black76_price(F, K, T, sigma, call)
+    for i in range(0, legs, 50):
+        ref = _price_scalar(F, K[i], T[i], sigma[i], call[i])
+        assert math.isclose(price[i], ref, rel_tol=1e-5, abs_tol=1e-5), f"price mismatch @ {i}: {price[i]} vs {ref}"
+    iv = implied_vol(price, F, K, T, call)
+    intrinsic = np.exp(-RISK_FREE*T) * np.where(call, np.maximum(F - K, 0), np.maximum(K - F, 0))
+    solvable = price - intrinsic > 0.01  # under a paisa of time value the price carries no vol information
+    err = np.abs(iv - sigma)[solvable]
+    assert np.isfinite(iv[solvable]).all(), "IV solver left solvable legs unsolved"
+    assert err.max() < 1e-3, f"IV round-trip error {err.max():.2e}"
+    g = black76_greeks(F, K, T, sigma, call)
+    for i in range(0, legs, 50):
+        ref = _greeks_scalar(F, K[i], T[i], sigma[i], call[i])
+        for k, v in ref.items(): assert math.isclose(g[k][i], v, rel_tol=1e-5, abs_tol=1e-7), f"{k} mismatch @ {i}"
+    assert np.isnan(implied_vol(np.array([0.0, 1e9]), F, 22000.0, 0.02, True)).all()
+    return float(err.max())
+
+
+def main(legs: int = 42):
+    err = check_equivalence()
+    print(f"round-trip IV max error {err:.2e} over 2,000 legs; prices and Greeks match the scalar formulas")
+
+    F, K, T, sigma, call = synthetic_chain(legs)
+    price = black76_price(F, K, T, sigma, call)
+    t0 = time.perf_counter()
+    for _ in range(100): implied_vol(price, F, K, T, call); black76_greeks(F, K, T, sigma, call)
+    t_vec = (time.perf_counter() - t0) / 100
+    t0 = time.perf_counter()
+    for i in range(legs): _iv_scalar(price[i], F, K[i], T[i], call[i])
+    t_loop = time.perf_counter() - t0
+    print(f"legs={legs:,}  vectorized IV+Greeks: {t_vec*1e3:.2f} ms   per-strike bisection loop: {t_loop*1e3:.1f} ms"
+          f"  ({t_loop/t_vec:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 42)
@@ -0,0 +1,104 @@
+# benchmarks/bench_indicators.py — IndicatorEngine vs generate_signal: equivalence + per-bar cost
+# Run from the repo root:  python -m benchmarks.bench_indicators [bars]
+from __future__ import annotations
+
+import math
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from strategy import IndicatorEngine, atr, ema, generate_signal, vwap
+
+
+def synthetic_candles(bars: int = 2000, seed: int = 11, vol: float = 0.006) -> pd.DataFrame:
+    """5m bars across sessions (09:15-15:25 IST, 75 bars/day) from a random walk."""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range("2024-01-01", periods=bars // 75 + 2, tz="Asia/Kolkata")
+    bar_ns = (9 * 60 + 15 + 5 * np.arange(75)) * 60 * 10**9
+    utc = (days.as_unit("ns").asi8[:, None] + bar_ns).ravel()[:bars]
+    times = pd.DatetimeIndex(utc.view("M8[ns]"), tz="UTC").tz_convert(days.tz).as_unit(days.unit)
+    close = 22000 * np.exp(np.cumsum(rng.normal(0, vol, bars)))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, vol, bars)) * close
+    return pd.DataFrame({
+        "time": pd.DatetimeIndex(times), "open": open_,
+        "high": np.maximum(open_, close) + spread, "low": np.minimum(open_, close) - spread,
+        "close": close, "volume": rng.integers(1_000, 50_000, bars).astype(float),
+    })
+
+
+def _same(a, b, rel=1e-9) -> bool:
+    if a is None or b is None: return a is b
+    return a == b or math.isclose(a, b, rel_tol=rel)
+
+
+def check_equivalence(df: pd.DataFrame, params=(5, 13, 10, 14)) -> int:
+    fast, slow, lookback, atr_len = params
+    eng = IndicatorEngine(*params)
+    ref_ema_f, ref_ema_s = ema(df["close"], fast).to_numpy(), ema(df["close"], slow).to_numpy()
+    ref_vwap, ref_atr = vwap(df).astype(float).to_numpy(), atr(df, atr_len).to_numpy()
+    signals = 0
+    for i in range(len(df)):
+        row = df.iloc[i]
+        # feed a bogus forming bar first, then correct it, to exercise replace_last
+        eng.push({**row.to_dict(), "close": row["close"] * 1.01})
+        eng.replace_last(row)
+        assert eng.ema_fast == ref_ema_f[i] and eng.ema_slow == ref_ema_s[i], f"ema mismatch @ {i}"
+        assert _same(eng.vwap, ref_vwap[i]), f"vwap mismatch @ {i}"
+        assert (math.isnan(eng.atr) and math.isnan(ref_atr[i])) or _same(eng.atr, ref_atr[i]), f"atr mismatch @ {i}"
+        if i % 7 == 0 or i == len(df) - 1:
+            want = generate_signal(df.iloc[:i+1], fast, slow, lookback, atr_len)
+            got = eng.signal()
+            assert want[0] == got[0] and want[1]["reason"] == got[1]["reason"], f"signal mismatch @ {i}: {want} vs {got}"
+            for k in ("entry_price", "stop", "target"): assert _same(want[1][k], got[1][k]), f"{k} mismatch @ {i}"
+            signals += want[0] is not None
+    # sync(): growing frame, then a moved window (reseed)
+    s = IndicatorEngine(*params).sync(df.iloc[:len(df)//2]).sync(df)
+    assert s.signal() == generate_signal(df, fast, slow, lookback, atr_len)
+    assert s.sync(df.iloc[75:]).signal() == generate_signal(df.iloc[75:], fast, slow, lookback, atr_len)
+    return signals
+
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+def time_indicators(sizes=SIZES, repeats: int = 5) -> dict:
+    """Best-of-`repeats` seconds for ema / vwap / atr at each size: {'ema@1000': s, ...}."""
+    big = synthetic_candles(max(sizes), seed=21)
+    out = {}
+    for n in sizes:
+        df = big.iloc[:n]
+        for name, fn in (("ema", lambda: ema(df["close"], 13)), ("vwap", lambda: vwap(df)), ("atr", lambda: atr(df, 14))):
+            best = math.inf
+            for _ in range(repeats):
+                t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+            out[f"{name}@{n}"] = best
+    return out
+
+
+def main(bars: int = 2000):
+    df = synthetic_candles(bars)
+    for params in [(5, 13, 10, 14), (3, 21, 5, 7), (8, 21, 20, 30)]:
+        n = check_equivalence(df.iloc[:600], params)
+        print(f"equivalent for params={params} ({n} signal bars checked)")
+
+    t0 = time.perf_counter()
+    generate_signal(df)
+    t_pd = time.perf_counter() - t0
+    eng = IndicatorEngine().sync(df.iloc[:-1])
+    last = df.iloc[-1].to_dict()
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        eng.replace_last(last) if eng.last_time == last["time"] else eng.push(last)
+        eng.signal()
+    t_eng = (time.perf_counter() - t0) / 1000
+    print(f"bars={bars:,}  generate_signal: {t_pd*1e3:.2f} ms   engine update+signal: {t_eng*1e3:.4f} ms  ({t_pd/t_eng:,.0f}x)")
+
+    timings = time_indicators()
+    for n in SIZES:
+        print(f"bars={n:>9,}  " + "   ".join(f"{k}: {timings[f'{k}@{n}']*1e3:8.3f} ms" for k in ("ema", "vwap", "atr")))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
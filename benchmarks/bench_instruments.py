@@ -0,0 +1,74 @@
+# benchmarks/bench_instruments.py — InstrumentIndex vs full-frame scrip scans
+# Run from the repo root:  python -m benchmarks.bench_instruments [rows]
+from __future__ import annotations
+
+import datetime as dt
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from instruments import (InstrumentIndex, pick_nearest_future_row, nearest_options_expiry,
+                         pick_nearest_expiry_row_for_strike)
+
+
+def synthetic_scrip_master(rows: int = 150_000, seed: int = 7) -> pd.DataFrame:
+    """Roughly shaped like OpenAPIScripMaster.csv: a few indices + lots of unrelated rows."""
+    rng = np.random.default_rng(seed)
+    today = dt.date.today()
+    expiries = [today + dt.timedelta(days=7*w) for w in range(-2, 12)]
+    names = np.array(["NIFTY","BANKNIFTY","SENSEX"] + [f"STK{i}" for i in range(400)])
+    name = rng.choice(names, rows)
+    instr = rng.choice(np.array(["OPTIDX","FUTIDX","OPTSTK","EQ"]), rows, p=[0.5, 0.01, 0.4, 0.09])
+    opt = np.where(np.char.startswith(instr.astype(str), "OPT"), rng.choice(np.array(["CE","PE"]), rows), "")
+    strike = np.where(opt != "", rng.integers(400, 600, rows) * 50, -1).astype(float)
+    exp = np.array([e.strftime("%d%b%Y").upper() for e in expiries])[rng.integers(0, len(expiries), rows)]
+    return pd.DataFrame({
+        "token": rng.permutation(rows) + 10_000,
+        "symbol": [f"S{i}" for i in range(rows)],
+        "name": name, "expiry": exp, "strike": strike, "lotsize": 25,
+        "instrumenttype": instr, "exch_seg": "NFO", "tick_size": 5.0,
+        "tradingsymbol": [f"T{i}" for i in range(rows)], "optiontype": opt,
+    })
+
+
+def _timeit(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat): fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def main(rows: int = 150_000):
+    warnings.simplefilter("ignore", UserWarning)  # DDMONYYYY expiries: pandas format-inference noise
+    df = synthetic_scrip_master(rows)
+    t0 = time.perf_counter()
+    idx = InstrumentIndex(df)
+    build = time.perf_counter() - t0
+
+    # one rerun = 1 future lookup + CE/PE for the ATM strike
+    def scans():
+        pick_nearest_future_row(df, "NIFTY")
+        pick_nearest_expiry_row_for_strike(df, "NIFTY", 25000, "CE")
+        pick_nearest_expiry_row_for_strike(df, "NIFTY", 25000, "PE")
+
+    def lookups():
+        idx.nearest_future("NIFTY")
+        idx.option_for_strike("NIFTY", 25000, "CE")
+        idx.option_for_strike("NIFTY", 25000, "PE")
+
+    for a, b in [(pick_nearest_future_row(df, "NIFTY"), idx.nearest_future("NIFTY")),
+                 (pick_nearest_expiry_row_for_strike(df, "BANKNIFTY", 25000, "PE"), idx.option_for_strike("BANKNIFTY", 25000, "PE"))]:
+        assert (a is None and b is None) or a.to_dict() == b.to_dict(), "index result differs from scan"
+    assert nearest_options_expiry(df, "SENSEX") == idx.nearest_options_expiry("SENSEX")
+
+    t_scan = _timeit(scans, 5)
+    t_idx = _timeit(lookups, 2000)
+    print(f"rows={rows:,}  index build={build*1e3:.1f} ms (once per master load)")
+    print(f"full-frame scans : {t_scan*1e3:10.2f} ms / rerun")
+    print(f"instrument index : {t_idx*1e3:10.4f} ms / rerun   ({t_scan/t_idx:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 150_000)
@@ -0,0 +1,67 @@
+# benchmarks/bench_rerun.py — what a Streamlit rerun pays for the signal: recomputed vs memoized on series_key
+# Run from the repo root:  python -m benchmarks.bench_rerun [bars]
+from __future__ import annotations
+
+import sys
+import time
+
+from benchmarks.bench_indicators import synthetic_candles
+from candles import series_key
+from mdcache import MarketDataCache
+from strategy import IndicatorEngine, confirm_with_htf, generate_signal, htf_trend
+from timeframes import Resampler
+
+PARAMS = (5, 13, 10, 14, "09:15", "15:25", "15m", "60m")
+
+
+def _signal(df, params=PARAMS):
+    ema_fast, ema_slow, lookback, atr_len, start, end, tf, confirm = params
+    return generate_signal(df, ema_fast, ema_slow, lookback, atr_len, start, end, timeframe=tf, confirm=confirm)
+
+
+def _memo(cache: MarketDataCache, df, params=PARAMS):
+    # same key and copy-out as app.cached_signal()
+    side, ctx = cache.get_or_fetch(("signal", "T", series_key(df), params), 900.0, lambda: _signal(df, params))
+    return side, {**ctx, "reason": list(ctx["reason"])}
+
+
+def check_memo(df) -> int:
+    """A memo hit equals a fresh evaluation, and a forming bar that moves (same stamp) is a miss."""
+    cache, n = MarketDataCache(), 0
+    for i in range(60, len(df), 17):
+        part = df.iloc[:i].copy()
+        for _ in range(2):  # the second read is a hit
+            assert _memo(cache, part) == _signal(part), f"memo differs @ {i}"
+        part.loc[part.index[-1], ["high", "close"]] = part["high"].iat[-1] * 1.01, part["high"].iat[-1] * 1.01
+        assert series_key(part) != series_key(df.iloc[:i]), "moved bar kept its key"
+        assert _memo(cache, part) == _signal(part), f"memo stale after the bar moved @ {i}"
+        n += 1
+    s = cache.stats()
+    assert s["hits"] == n and s["fetches"] == 2 * n, s
+    return n
+
+
+def _per_call(fn, reps: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(reps): fn()
+    return (time.perf_counter() - t0) / reps
+
+
+def main(bars: int = 3000):
+    print(f"memoized signal == generate_signal ({check_memo(synthetic_candles(1200, seed=4))} series, hit and moved bar)")
+    df = synthetic_candles(bars, seed=8)
+    eng, sig_rs, htf_rs, cache = IndicatorEngine(5, 13, 10, 14), Resampler("15m"), Resampler("60m"), MarketDataCache()
+
+    def streaming():  # what every rerun did before: engine sync (nothing new) + both resamplers + HTF trend
+        side, ctx = eng.sync(sig_rs.update(df)).signal("09:15", "15:25")
+        return confirm_with_htf(side, ctx, htf_trend(htf_rs.update(df), 5, 13))
+
+    _memo(cache, df)
+    for name, fn, reps in (("generate_signal (from scratch)", lambda: _signal(df), 20),
+                           ("IndicatorEngine rerun (no new bar)", streaming, 50),
+                           ("memo hit (series_key + cache)", lambda: _memo(cache, df), 2000)):
+        print(f"{bars:,} bars  {name:36s} {_per_call(fn, reps)*1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3000)
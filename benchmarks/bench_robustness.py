@@ -0,0 +1,89 @@
+# benchmarks/bench_robustness.py — walk-forward / Monte Carlo: invariants, serial vs parallel, throughput
+# Run from the repo root:  python -m benchmarks.bench_robustness [years] [workers]
+from __future__ import annotations
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_indicators import synthetic_candles
+from robustness import monte_carlo, walk_forward, walk_forward_splits, walk_forward_summary
+from sweep import param_grid
+
+# small enough that a split's in-sample search takes well under a second
+AXES = {"ema_fast": [3, 5, 8], "ema_slow": [13, 21], "breakout_lookback": [5, 10, 20], "atr_len": [10, 14],
+        "session_start": ["09:15"], "session_end": ["15:25"]}
+TRAIN_DAYS, TEST_DAYS = 60, 20
+
+
+def check_splits(times: pd.Series) -> int:
+    days = times.dt.normalize()
+    rolling = walk_forward_splits(times, TRAIN_DAYS, TEST_DAYS)
+    for (lo, mid, hi), nxt in zip(rolling, rolling[1:] + [None]):
+        assert lo < mid < hi and days.iat[mid] != days.iat[mid - 1], "test window not on a day boundary"
+        assert days.iloc[lo:mid].nunique() == TRAIN_DAYS and days.iloc[mid:hi].nunique() <= TEST_DAYS
+        if nxt: assert nxt[1] == hi, "test windows overlap or leave a gap"
+    assert rolling[-1][2] == len(times)
+    assert all(s[0] == 0 for s in walk_forward_splits(times, TRAIN_DAYS, TEST_DAYS, anchored=True))
+    return len(rolling)
+
+
+def check_walk_forward(df: pd.DataFrame, workers: int) -> pd.DataFrame:
+    """Parallel == serial, and every out-of-sample trade enters inside its split's test window."""
+    combos = param_grid(AXES)
+    rows, trades = walk_forward(df, combos, TRAIN_DAYS, TEST_DAYS, workers=1)
+    rows_p, trades_p = walk_forward(df, combos, TRAIN_DAYS, TEST_DAYS, workers=workers)
+    pd.testing.assert_frame_equal(rows, rows_p)
+    pd.testing.assert_frame_equal(trades, trades_p)
+    win = np.searchsorted(rows["test_from"].to_numpy(), trades["entry_time"].to_numpy(), side="right") - 1
+    assert (win >= 0).all() and (trades["entry_time"].to_numpy() <= rows["test_to"].to_numpy()[win]).all(), \
+        "trade entered outside a test window"
+    return trades
+
+
+def check_monte_carlo(pnl: np.ndarray, workers: int) -> dict:
+    a = monte_carlo(pnl, 5_000, "bootstrap", seed=3, workers=1)
+    assert a == monte_carlo(pnl, 5_000, "bootstrap", seed=3, workers=workers), "worker count changed the result"
+    s = monte_carlo(pnl, 5_000, "shuffle", seed=3, workers=workers)
+    assert s["total_p5"] == s["total_p95"] == s["total"], "shuffle changed the total"
+    assert s["max_drawdown_p95"] >= s["max_drawdown_p50"] > 0
+    assert a["total_p5"] <= a["total"] <= a["total_p95"]
+    return a
+
+
+def evaluate(df: pd.DataFrame, workers: int = None, sims: int = 10_000) -> dict:
+    """Walk-forward + bootstrap Monte Carlo quality figures for one candle history (tracked by regress)."""
+    rows, trades = walk_forward(df, param_grid(AXES), TRAIN_DAYS, TEST_DAYS, workers=workers)
+    wf = walk_forward_summary(rows, trades)
+    mc = monte_carlo(trades["pnl_points"], sims, "bootstrap", seed=0, workers=workers)
+    return {**{k: wf[k] for k in ("splits", "trades", "hit_rate", "pnl_points", "max_drawdown_points",
+                                  "option_ret_total", "profitable_splits", "efficiency")},
+            **{f"mc_{k}": mc[k] for k in ("total_p5", "total_p50", "p_loss", "max_drawdown_p95") if k in mc}}
+
+
+def _took(fn) -> float:
+    t0 = time.perf_counter(); fn()
+    return time.perf_counter() - t0
+
+
+def main(years: float = 1.0, workers: int = 4):
+    df = synthetic_candles(int(years * 250 * 75), seed=5)
+    print(f"splits: {check_splits(df['time'])} rolling {TRAIN_DAYS}d train / {TEST_DAYS}d test windows, day-aligned, no gaps")
+    trades = check_walk_forward(df, workers)
+    print(f"walk-forward: workers={workers} == serial, {len(trades)} out-of-sample trades all inside test windows")
+    print(f"monte carlo: worker-count invariant, shuffle keeps the total: {check_monte_carlo(trades['pnl_points'].to_numpy(), workers)}")
+
+    combos = param_grid(AXES)
+    t_serial = _took(lambda: walk_forward(df, combos, TRAIN_DAYS, TEST_DAYS, workers=1))
+    t_par = _took(lambda: walk_forward(df, combos, TRAIN_DAYS, TEST_DAYS, workers=workers))
+    print(f"walk-forward {len(df):,} bars x {len(combos)} combos: serial {t_serial:.2f} s   {workers} workers {t_par:.2f} s")
+    pnl = trades["pnl_points"].to_numpy()
+    for w in (1, workers):
+        t = _took(lambda: monte_carlo(pnl, 50_000, workers=w))
+        print(f"monte carlo 50,000 x {len(pnl)} trades, {w} worker(s): {t:.2f} s ({50_000 / t:,.0f} sims/s)")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0, int(sys.argv[2]) if len(sys.argv) > 2 else 4)
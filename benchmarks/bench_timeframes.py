@@ -0,0 +1,92 @@
+# benchmarks/bench_timeframes.py — resampled timeframes: equivalence + incremental update cost
+# Run from the repo root:  python -m benchmarks.bench_timeframes [days]
+from __future__ import annotations
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from backtest import htf_trend_per_bar, signals_vectorized
+from benchmarks.bench_indicators import synthetic_candles
+from strategy import generate_signal, htf_trend
+from timeframes import Resampler, bucket_starts, minutes_of, resample
+
+
+def minute_candles(days: int = 20, seed: int = 13, vol: float = 0.0012) -> pd.DataFrame:
+    """1m bars, 09:15-15:29 IST (375 a day)."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2024-01-01", periods=days, tz="Asia/Kolkata")
+    times = pd.DatetimeIndex([d + pd.Timedelta(minutes=9 * 60 + 15 + i) for d in dates for i in range(375)])
+    n = len(times)
+    close = 22000 * np.exp(np.cumsum(rng.normal(0, vol, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, vol, n)) * close
+    return pd.DataFrame({"time": times, "open": open_, "high": np.maximum(open_, close) + spread,
+                         "low": np.minimum(open_, close) - spread, "close": close,
+                         "volume": rng.integers(100, 5_000, n).astype(float)})
+
+
+def _reference(df: pd.DataFrame, tf) -> pd.DataFrame:
+    """Plain pandas groupby on the bucket start: slow but obviously right."""
+    key = pd.to_datetime(bucket_starts(df["time"], minutes_of(tf))).tz_localize(df["time"].dt.tz)
+    g = df.assign(time=key).groupby("time", sort=True)
+    return g.agg(open=("open", "first"), high=("high", "max"), low=("low", "min"),
+                 close=("close", "last"), volume=("volume", "sum")).reset_index()
+
+
+def check_equivalence(base: pd.DataFrame) -> int:
+    checked = 0
+    for tf in ("5m", "15m", "60m", "1d"):
+        ref = _reference(base, tf)
+        got = resample(base, tf)
+        assert (got["time"].to_numpy() == ref["time"].to_numpy()).all(), f"{tf}: bucket stamps differ"
+        assert np.allclose(got.iloc[:, 1:].to_numpy(float), ref.iloc[:, 1:].to_numpy(float)), f"{tf}: OHLCV differ"
+        rs = Resampler(tf)
+        for i in range(1, len(base) + 1, 37):  # grow unevenly so buckets are caught half-filled
+            out = rs.update(base.iloc[:i])
+            pd.testing.assert_frame_equal(out, resample(base.iloc[:i], tf))
+            checked += 1
+        # moved window -> rebuilt from scratch
+        pd.testing.assert_frame_equal(rs.update(base.iloc[375:]), resample(base.iloc[375:], tf))
+    assert (resample(base, "60m")["time"].dt.strftime("%H:%M").unique()[:2] == ["09:15", "10:15"]).all()
+    return checked
+
+
+def check_confirm(df: pd.DataFrame, tf: str = "60m") -> int:
+    trend = htf_trend_per_bar(df, tf)
+    sig = signals_vectorized(df, confirm=tf, vwap_days=None)
+    for i in range(30, len(df), 13):
+        assert trend[i] == htf_trend(resample(df.iloc[:i+1], tf)), f"trend mismatch @ {i}"
+        assert generate_signal(df.iloc[:i+1], confirm=tf)[0] == sig["side"].iat[i], f"signal mismatch @ {i}"
+    return int(sig["side"].notna().sum())
+
+
+def main(days: int = 20):
+    base = minute_candles(days)
+    print(f"resample == pandas groupby, Resampler == full resample ({check_equivalence(base.iloc[:3000])} growth steps)")
+    five = synthetic_candles(1500, seed=3)
+    n = check_confirm(five)
+    print(f"generate_signal(confirm='60m') == signals_vectorized(confirm='60m') ({n} confirmed signals of "
+          f"{int(signals_vectorized(five)['side'].notna().sum())})")
+
+    for n_days in (days, days * 10):  # incremental cost stays flat as history grows; a full resample does not
+        base = minute_candles(n_days)
+        for tf in ("15m", "60m"):
+            rs = Resampler(tf)
+            rs.update(base.iloc[:-200])
+            t0 = time.perf_counter()
+            for i in range(len(base) - 200, len(base)): rs.update(base.iloc[:i + 1])
+            t_inc = (time.perf_counter() - t0) / 200
+            t0 = time.perf_counter()
+            for _ in range(20): resample(base, tf)
+            t_full = (time.perf_counter() - t0) / 20
+            t0 = time.perf_counter()
+            for _ in range(3): _reference(base, tf)
+            t_ref = (time.perf_counter() - t0) / 3
+            print(f"1m bars={len(base):>7,} -> {tf:>3}: incremental {t_inc*1e3:.2f} ms/bar   full resample {t_full*1e3:.2f} ms"
+                  f"   pandas groupby {t_ref*1e3:.1f} ms")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
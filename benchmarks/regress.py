@@ -0,0 +1,152 @@
+# benchmarks/regress.py — tracked strategy-quality + compute numbers, compared with benchmarks/baseline.json
+# Timings are compared in units of a fixed calibration workload timed in the same run, so
+# a baseline recorded on one machine still gates another (CI, the deploy host).
+# Run from the repo root before deploying (exit status 1 on a regression):
+#   python -m benchmarks.regress                                   # synthetic history only
+#   python -m benchmarks.regress --candles nifty_5m.parquet banknifty_5m.parquet
+#   python -m benchmarks.regress --update                          # accept the current numbers as the baseline
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest import backtest, signals_vectorized
+from benchmarks.bench_indicators import synthetic_candles, time_indicators
+from benchmarks.bench_robustness import evaluate
+from candles import load_candles
+from robustness import monte_carlo
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# tracked quality figures, by which direction is worse
+HIGHER_IS_BETTER = ("hit_rate", "pnl_points", "option_ret_total", "profitable_splits", "efficiency",
+                    "mc_total_p5", "mc_total_p50")
+LOWER_IS_BETTER = ("max_drawdown_points", "mc_p_loss", "mc_max_drawdown_p95")
+PERF_FLOOR = 0.002  # seconds; slower by less than this is timer noise, whatever the ratio
+
+
+def host() -> dict:
+    """Where the numbers were taken (informational: timings are compared calibration-normalized)."""
+    return {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(),
+            "processor": platform.processor(), "numpy": np.__version__, "pandas": pd.__version__}
+
+
+def _best(fn, repeats: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def calibrate(repeats: int = 5) -> float:
+    """Seconds for a fixed single-threaded numpy / pandas / interpreter workload, best of `repeats`."""
+    x = np.random.default_rng(0).normal(size=200_000)
+    s = pd.Series(x)
+
+    def work():
+        np.sort(x); np.cumsum(x); np.maximum.accumulate(x)
+        s.ewm(span=21, adjust=False).mean(); s.rolling(20).max(); s.groupby(np.arange(len(x)) // 75).agg(["first", "max", "last"])
+        sum(i * i for i in range(100_000))
+
+    return _best(work, repeats)
+
+
+def collect(candles: List[str], workers: Optional[int] = None) -> dict:
+    """
+    Perf keys run on one worker, so they track compute rather than core count; `workers`
+    only speeds up the quality runs over stored candles (results don't depend on it).
+    """
+    cal = calibrate()
+    perf = time_indicators()
+    five_years = synthetic_candles(5 * 250 * 75, seed=5)
+    perf["signals_vectorized@5y"] = _best(lambda: signals_vectorized(five_years))
+    perf["backtest@5y"] = _best(lambda: backtest(five_years))
+    two_years = synthetic_candles(2 * 250 * 75, seed=5)
+    quality = {}
+    t0 = time.perf_counter()
+    quality["synthetic_2y"] = evaluate(two_years, workers=1)
+    perf["walk_forward+mc@2y"] = time.perf_counter() - t0
+    perf["monte_carlo@50k"] = _best(lambda: monte_carlo(np.random.default_rng(1).normal(10, 100, 500), 50_000, workers=1))
+    for path in candles:
+        quality[os.path.splitext(os.path.basename(path))[0]] = evaluate(load_candles(path), workers)
+    return {"host": host(), "calibration": (cal + calibrate()) / 2, "perf": perf, "quality": quality}
+
+
+def compare(cur: dict, base: dict, perf_tol: float = 2.0, quality_tol: float = 0.05) -> List[str]:
+    """
+    Human-readable regressions of `cur` against `base` (empty = none). Baseline timings
+    are rescaled by the ratio of the two calibration times before comparing; a baseline
+    without one (older format) is only compared on the same host.
+    """
+    out = []
+    if base.get("calibration") and cur.get("calibration"): scale = cur["calibration"] / base["calibration"]
+    elif cur["host"] == base.get("host"): scale = 1.0
+    else: scale = None
+    for k, b in base.get("perf", {}).items() if scale else ():
+        c, want = cur["perf"].get(k), b * scale
+        if c is not None and c > want * perf_tol and c - want > PERF_FLOOR:
+            out.append(f"perf {k}: {c*1e3:.2f} ms vs {want*1e3:.2f} ms expected here ({c/want:.1f}x)")
+    for name, b in base.get("quality", {}).items():
+        c = cur["quality"].get(name)
+        if c is None: continue
+        for k in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            if k not in b or k not in c: continue
+            worse = (b[k] - c[k]) if k in HIGHER_IS_BETTER else (c[k] - b[k])
+            if worse > quality_tol * max(abs(b[k]), 1e-9):
+                out.append(f"quality {name}.{k}: {c[k]} vs {b[k]}")
+    return out
+
+
+def _table(cur: dict, base: dict) -> pd.DataFrame:
+    rows: Dict[str, dict] = {}
+    b = base.get("calibration")
+    rows["calibration"] = {"current": round(cur["calibration"] * 1e3, 3), "baseline": None if b is None else round(b * 1e3, 3), "unit": "ms"}
+    for k, c in cur["perf"].items():
+        b = base.get("perf", {}).get(k)
+        rows[f"perf {k}"] = {"current": round(c * 1e3, 3), "baseline": None if b is None else round(b * 1e3, 3), "unit": "ms"}
+    for name, q in cur["quality"].items():
+        for k, c in q.items():
+            rows[f"{name}.{k}"] = {"current": c, "baseline": base.get("quality", {}).get(name, {}).get(k), "unit": ""}
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Strategy-quality and compute regressions vs the tracked baseline")
+    ap.add_argument("--candles", nargs="*", default=[], help="stored FUTIDX histories to evaluate as well")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--perf-tol", type=float, default=2.0, help="slowdown factor that counts as a regression")
+    ap.add_argument("--quality-tol", type=float, default=0.05, help="relative drop that counts as a regression")
+    ap.add_argument("--update", action="store_true", help="write the current numbers as the new baseline")
+    args = ap.parse_args()
+
+    cur = collect(args.candles, args.workers)
+    base = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f: base = json.load(f)
+    print(_table(cur, base).to_string())
+    if args.update:
+        with open(args.baseline, "w") as f: json.dump(cur, f, indent=1, sort_keys=True, default=str)
+        print(f"baseline written -> {args.baseline}")
+        return
+    if base and cur["host"] != base.get("host"):
+        if base.get("calibration"):
+            print(f"timings scaled x{cur['calibration'] / base['calibration']:.2f} (calibration): baseline is from {base.get('host')}")
+        else:
+            print(f"timings not compared: baseline is from {base.get('host')} and has no calibration (re-run with --update)")
+    bad = compare(cur, base, args.perf_tol, args.quality_tol)
+    for line in bad: print("REGRESSION", line)
+    if not base: print("no baseline yet (run with --update)")
+    elif not bad: print("no regressions")
+    sys.exit(1 if bad else 0)
+
+
+if __name__ == "__main__":
+    main()
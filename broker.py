@@ -0,0 +1,221 @@
+# broker.py — rate-limited SmartConnect wrapper: token buckets, priority lanes, retries, session refresh
+from __future__ import annotations
+
+import bisect
+import functools
+import itertools
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from metrics import REGISTRY
+
+# (requests per second, burst) under Angel One's published per-second limits; rate + burst
+# never exceeds the limit, so no rolling one-second window can go over it
+LIMITS: Dict[str, Tuple[float, float]] = {
+    "placeOrder": (15.0, 5.0), "modifyOrder": (15.0, 5.0), "cancelOrder": (15.0, 5.0),   # 20/s
+    "ltpData": (8.0, 2.0), "getMarketData": (8.0, 2.0),                                  # 10/s
+    "getCandleData": (2.0, 1.0), "getProfile": (2.0, 1.0),                               # 3/s
+    "generateSession": (0.5, 1.0), "generateToken": (0.5, 1.0),                          # 1/s
+}
+DEFAULT_LIMIT = (2.0, 1.0)
+ACCOUNT_LIMIT = (16.0, 4.0)  # every endpoint together; this is where the lanes compete
+
+# lower is served first when callers queue for the same tokens
+LANES = {"placeOrder": 0, "modifyOrder": 0, "cancelOrder": 0, "generateToken": 0, "generateSession": 0,
+         "ltpData": 1, "getMarketData": 1, "getCandleData": 2}
+DEFAULT_LANE = 1
+
+# a raised exception may mean the order reached the exchange: only rejected-before-processing responses are retried
+NOT_IDEMPOTENT = {"placeOrder", "modifyOrder"}
+# SmartConnect methods that never leave the process
+LOCAL = {"getfeedToken", "getrefreshToken", "getUserId", "setAccessToken", "setRefreshToken",
+         "setFeedToken", "setUserId", "setSessionExpiryHook", "login_url", "requestHeaders"}
+RATE_LIMIT_CODES = {"AB1004"}
+SESSION_CODES = {"AG8001", "AG8002", "AG8003"}  # invalid / expired / missing JWT
+
+
+def is_rate_limited(r) -> bool:
+    if not isinstance(r, dict) or r.get("status"): return False
+    return r.get("errorcode") in RATE_LIMIT_CODES or "access rate" in str(r.get("message", "")).lower()
+
+def is_session_expired(r) -> bool:
+    return isinstance(r, dict) and not r.get("status") and r.get("errorcode") in SESSION_CODES
+
+
+class TokenBucket:
+    """Not thread-safe on its own; RateLimiter holds its condition while touching buckets."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate, self.burst = rate, burst or max(1.0, rate)
+        self.tokens, self.t = self.burst, time.monotonic()
+        self.hold_until = 0.0
+
+    def eta(self, now: float) -> float:
+        """Seconds until a token is available (0.0 = now)."""
+        if now < self.hold_until: return self.hold_until - now
+        if now > self.t:
+            self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate); self.t = now
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+
+    def hold(self, now: float, seconds: float):
+        """The broker said slow down: empty the bucket and pause it."""
+        self.hold_until = max(self.hold_until, now + seconds)
+        self.tokens, self.t = 0.0, max(self.t, self.hold_until)  # refills from the end of the pause
+
+
+class RateLimiter:
+    """
+    One bucket per endpoint plus an account-wide bucket. acquire() blocks until both
+    have a token. Waiters are ordered by (lane, arrival): a caller whose endpoint is
+    ready still yields to an earlier-lane caller that is also ready, so a queued order
+    takes the next account token ahead of any quote or candle request.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 account: Tuple[float, float] = ACCOUNT_LIMIT, default: Tuple[float, float] = DEFAULT_LIMIT,
+                 scale: float = 1.0):
+        # scale > 1 multiplies every rate (replays whose clock runs faster than real time)
+        self._limits, self._default, self.scale = {**LIMITS, **(limits or {})}, default, scale
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._account = TokenBucket(account[0] * scale, account[1])
+        self._cond = threading.Condition()
+        self._waiting: list = []  # sorted (lane, seq, endpoint)
+        self._seq = itertools.count()
+
+    def _bucket(self, endpoint: str) -> TokenBucket:
+        b = self._buckets.get(endpoint)
+        if b is None:
+            rate, burst = self._limits.get(endpoint, self._default)
+            b = self._buckets[endpoint] = TokenBucket(rate * self.scale, burst)
+        return b
+
+    def _eta(self, me: tuple, now: float) -> float:
+        mine = self._bucket(me[2]).eta(now)
+        if mine: return mine
+        for w in self._waiting:
+            if w is me: break
+            if not self._bucket(w[2]).eta(now):  # someone ahead can go: let them
+                self._cond.notify_all()
+                return max(self._account.eta(now), 1.0 / self._account.rate)
+        return self._account.eta(now)
+
+    def acquire(self, endpoint: str, lane: int = DEFAULT_LANE) -> float:
+        """Take one token for `endpoint`; returns seconds spent waiting."""
+        t0 = time.monotonic()
+        with self._cond:
+            me = (lane, next(self._seq), endpoint)
+            bisect.insort(self._waiting, me)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._eta(me, now)
+                    if not wait:
+                        self._bucket(endpoint).tokens -= 1.0
+                        self._account.tokens -= 1.0
+                        return now - t0
+                    self._cond.wait(wait)
+            finally:
+                self._waiting.remove(me)
+                self._cond.notify_all()
+
+    def hold(self, endpoint: str, seconds: float):
+        with self._cond:
+            self._bucket(endpoint).hold(time.monotonic(), seconds)
+
+    def queued(self) -> int:
+        return len(self._waiting)
+
+
+def refresh_with_token(smart):
+    """Default session refresh: swap the refresh token for a new JWT (no TOTP needed)."""
+    token = getattr(smart, "refresh_token", None)
+    if not token: raise RuntimeError("no refresh token on the client; log in again")
+    r = smart.generateToken(token)
+    if not (r or {}).get("status"): raise RuntimeError((r or {}).get("message", "token refresh failed"))
+
+
+class BrokerClient:
+    """
+    Drop-in for SmartConnect: any method called on it goes through call(), which
+    throttles to the endpoint's bucket and the account bucket (in its lane), retries
+    transient failures with full-jitter exponential backoff, and on an expired-JWT
+    response refreshes the session once for every thread that saw it, then retries.
+
+    Reads retry on exceptions too; placeOrder / modifyOrder only on rate-limit and
+    expired-session responses, which the broker rejects before any processing. Whatever is still failing after `retries` goes back to the caller
+    unchanged, so existing error handling keeps working. Non-callable attributes
+    (replay_clock, ...) and the client's local getters/setters pass straight through.
+    """
+
+    def __init__(self, smart, limiter: Optional[RateLimiter] = None, retries: int = 3,
+                 backoff: float = 0.25, max_backoff: float = 4.0, cooldown: float = 1.0,
+                 refresh: Optional[Callable[[Any], None]] = refresh_with_token):
+        self.smart = smart
+        self.limiter = limiter or RateLimiter()
+        self.retries, self.backoff, self.max_backoff, self.cooldown = retries, backoff, max_backoff, cooldown
+        self._refresh_fn = refresh
+        self._refresh_lock = threading.Lock()
+        self._session = 0  # bumped by each successful refresh
+        self._stats: Dict[str, Counter] = defaultdict(Counter)
+        self._slock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.smart, name)
+        if not callable(attr) or name.startswith("_") or name in LOCAL: return attr
+        return functools.partial(self.call, name)
+
+    def _count(self, endpoint: str, **kw):
+        with self._slock: self._stats[endpoint].update(kw)
+
+    def _sleep(self, attempt: int):
+        time.sleep(random.uniform(0.0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def refresh_session(self, seen: int) -> bool:
+        """Refresh unless another thread already did since `seen`. True if the session is newer."""
+        with self._refresh_lock:
+            if self._session != seen: return True
+            if self._refresh_fn is None: return False
+            try:
+                self.limiter.acquire("generateToken", 0)
+                self._refresh_fn(self.smart)
+            except Exception:
+                self._count("generateToken", refresh_failed=1)
+                return False
+            self._session += 1
+            self._count("generateToken", refreshes=1)
+            return True
+
+    def call(self, endpoint: str, *args, **kwargs):
+        fn = getattr(self.smart, endpoint)
+        lane, safe = LANES.get(endpoint, DEFAULT_LANE), endpoint not in NOT_IDEMPOTENT
+        for attempt in range(self.retries + 1):
+            session = self._session
+            waited = self.limiter.acquire(endpoint, lane)
+            REGISTRY.observe(f"broker.wait.{endpoint}", waited)
+            self._count(endpoint, calls=1, retries=int(attempt > 0))
+            last = attempt == self.retries
+            try:
+                r = fn(*args, **kwargs)
+            except Exception:
+                self._count(endpoint, errors=1)
+                if last or not safe: raise
+                self._sleep(attempt)
+                continue
+            if is_rate_limited(r):
+                self._count(endpoint, rate_limited=1)
+                self.limiter.hold(endpoint, self.cooldown)
+                if last: return r
+                self._sleep(attempt)
+                continue
+            if is_session_expired(r):
+                self._count(endpoint, expired=1)
+                if last or not self.refresh_session(session): return r
+                continue
+            return r
+
+    def stats(self) -> Dict[str, dict]:
+        with self._slock:
+            return {k: dict(v) for k, v in sorted(self._stats.items())}
@@ -0,0 +1,122 @@
+# candles.py — SmartAPI candle fetch + incremental per-token candle store
+from __future__ import annotations
+
+import datetime as dt
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from metrics import timed
+
+CANDLE_COLS = ["time", "open", "high", "low", "close", "volume"]
+
+
+def empty_candles() -> pd.DataFrame:
+    return pd.DataFrame(columns=CANDLE_COLS)
+
+def candles_from_payload(data: list) -> pd.DataFrame:
+    """getCandleData rows [time, open, high, low, close, volume] -> frame, one column at a time."""
+    if not data: return empty_candles()
+    cols = list(zip(*data))
+    out = {"time": pd.to_datetime(list(cols[0]))}
+    for i, c in enumerate(CANDLE_COLS[1:], start=1):
+        out[c] = np.asarray(cols[i], dtype=float)
+    return pd.DataFrame(out)
+
+def load_candles(path: str) -> pd.DataFrame:
+    """Stored history (CSV / Parquet / Arrow) with CANDLE_COLS, sorted by time."""
+    if path.endswith(".parquet"): df = pd.read_parquet(path)
+    elif path.endswith((".arrow", ".feather")): df = pd.read_feather(path)
+    else: df = pd.read_csv(path)
+    df["time"] = pd.to_datetime(df["time"])
+    return df[CANDLE_COLS].sort_values("time", kind="mergesort").reset_index(drop=True)
+
+def series_key(df: pd.DataFrame) -> tuple:
+    """
+    Cheap identity of a candle series for memo keys: its length, first stamp and the
+    whole last bar (a forming bar keeps its stamp while its OHLCV moves).
+    """
+    if df.empty: return (0,)
+    return (len(df), df["time"].iat[0], *(df[c].iat[-1] for c in CANDLE_COLS))
+
+@timed("api.getCandleData")
+def fetch_candles(smart, token: str, from_dt: dt.datetime, to_dt: dt.datetime,
+                  exchange: str = "NFO", interval: str = "FIVE_MINUTE") -> pd.DataFrame:
+    payload = {
+        "exchange": exchange,
+        "symboltoken": str(token),
+        "interval": interval,
+        "fromdate": from_dt.strftime("%Y-%m-%d %H:%M"),
+        "todate":   to_dt.strftime("%Y-%m-%d %H:%M"),
+    }
+    r = smart.getCandleData(payload)
+    return candles_from_payload((r or {}).get("data") or [])
+
+def _wall_clock(times: pd.Series) -> pd.Series:
+    # API stamps are +05:30; callers pass naive exchange-local datetimes
+    return times.dt.tz_localize(None) if getattr(times.dt, "tz", None) is not None else times
+
+
+class CandleStore:
+    """
+    In-process candle cache keyed by (exchange, token, interval).
+    update() only asks the API for bars from the last stored bar onwards; that
+    last bar is refetched because it may still have been forming, and the fresh
+    copy replaces it. Returned frames are shared — treat them as read-only.
+    """
+
+    def __init__(self):
+        self._frames: Dict[Tuple[str, str, str], pd.DataFrame] = {}
+        self._since: Dict[Tuple[str, str, str], pd.Timestamp] = {}  # window start the frame was fetched for
+        self._locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _lock(self, key: Tuple[str, str, str]) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, token: str, exchange: str = "NFO", interval: str = "FIVE_MINUTE") -> Optional[pd.DataFrame]:
+        return self._frames.get((exchange, str(token), interval))
+
+    def merge_live(self, token: str, bars: pd.DataFrame, minutes: int = 5,
+                   exchange: str = "NFO", interval: str = "FIVE_MINUTE") -> bool:
+        """
+        Splice tick-built bars onto the stored series. The feed's first bar is dropped
+        (the socket opened mid-bar); the rest must join the stored bars without a gap.
+        Returns False when they don't, so the caller falls back to update().
+        """
+        bars = bars.iloc[1:]
+        key = (exchange, str(token), interval)
+        with self._lock(key):
+            old = self._frames.get(key)
+            if old is None or old.empty or bars.empty: return False
+            tz = getattr(old["time"].dt, "tz", None)
+            live_t = bars["time"].dt.tz_convert(tz) if tz is not None else _wall_clock(bars["time"])
+            if live_t.iloc[0] > old["time"].iloc[-1] + pd.Timedelta(minutes=minutes): return False
+            live = bars.assign(time=live_t)
+            self._frames[key] = pd.concat([old[old["time"] < live_t.iloc[0]], live], ignore_index=True)
+            return True
+
+    def update(self, smart, token: str, from_dt: dt.datetime, to_dt: dt.datetime,
+               exchange: str = "NFO", interval: str = "FIVE_MINUTE") -> pd.DataFrame:
+        key = (exchange, str(token), interval)
+        with self._lock(key):
+            old = self._frames.get(key)
+            wall = None if old is None or old.empty else _wall_clock(old["time"])
+            # a window opening on a weekend/holiday starts later than from_dt; that is not a gap
+            if wall is None or self._since.get(key, wall.iloc[0]) > pd.Timestamp(from_dt):
+                df = fetch_candles(smart, token, from_dt, to_dt, exchange, interval)
+                self._since[key] = pd.Timestamp(from_dt)
+            else:
+                new = fetch_candles(smart, token, wall.iloc[-1].to_pydatetime(), to_dt, exchange, interval)
+                if new.empty:
+                    df = old
+                else:
+                    keep = old[old["time"] < new["time"].iloc[0]]
+                    df = pd.concat([keep, new], ignore_index=True)
+                    df = df.drop_duplicates("time", keep="last").reset_index(drop=True)
+                    df = df[_wall_clock(df["time"]) >= pd.Timestamp(from_dt)].reset_index(drop=True)
+            if not df.empty: self._frames[key] = df
+            return df
@@ -0,0 +1,78 @@
+# chain.py — option chain snapshot (nearest expiry, ±N strikes) with IV and Greeks
+from __future__ import annotations
+
+import datetime as dt
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from greeks import RISK_FREE, black76_greeks, implied_vol, year_fraction
+from instruments import InstrumentIndex, atm_step_for_index, col_upper, strike_for_mode
+from metrics import timed
+from quotes import QuoteCache
+
+CHAIN_FIELDS = ("symbol", "token", "ltp", "iv", "delta", "gamma", "theta", "vega")
+
+
+@timed("chain.snapshot")
+def option_chain(smart, instruments: InstrumentIndex, quotes: QuoteCache, index: str, forward: float,
+                 width: int = 10, now: Optional[dt.datetime] = None, r: float = RISK_FREE) -> pd.DataFrame:
+    """
+    One row per strike within ±`width` steps of ATM on the nearest options expiry:
+    ce_*/pe_* symbol, token, ltp, iv, delta, gamma, theta (per day), vega (per vol pt).
+
+    All legs are quoted in one QuoteCache.get_many call and IV/Greeks are solved for the
+    whole chain in one vectorized pass. `forward` is the FUTIDX price (Black-76), so no
+    dividend / carry assumption is needed. attrs: expiry, T (years), chain_ms, errors.
+    """
+    t0 = time.perf_counter()
+    now = now or dt.datetime.now()
+    step = atm_step_for_index(index)
+    atm = strike_for_mode(forward, step)
+    expiry = instruments.nearest_options_expiry(index, now.date())
+    opts = instruments.options_for_expiry(index, expiry)
+    wanted = [float(atm + i * step) for i in range(-width, width + 1)]
+    if "strike" not in opts.columns: opts = opts.assign(strike=np.nan)
+    strikes = pd.to_numeric(opts["strike"], errors="coerce")
+    opts = opts[strikes.isin(wanted).to_numpy()]
+
+    legs = pd.DataFrame({
+        "strike": pd.to_numeric(opts["strike"], errors="coerce").to_numpy(dtype=float),
+        "kind": col_upper(opts, "optiontype").to_numpy(dtype=object),
+        "symbol": opts.get("tradingsymbol", pd.Series("", index=opts.index)).astype(str).to_numpy(),
+        "token": opts.get("token", pd.Series("", index=opts.index)).astype(str).to_numpy(),
+        "exch": opts.get("exch_seg", pd.Series("NFO", index=opts.index)).astype(str).to_numpy(),
+    })
+    legs = legs[legs["kind"].isin(["CE", "PE"])].drop_duplicates(["strike", "kind"]).reset_index(drop=True)
+
+    ltps, errors = (quotes.get_many(smart, legs[["exch", "symbol", "token"]].itertuples(index=False, name=None))
+                    if len(legs) else ({}, []))
+    T = year_fraction(expiry, now) if expiry is not None else float("nan")
+    price = np.array([ltps.get(k, np.nan) for k in zip(legs["exch"], legs["token"])], dtype=float)
+    is_call = (legs["kind"] == "CE").to_numpy()
+    iv = implied_vol(price, forward, legs["strike"].to_numpy(), T, is_call, r)
+    g = black76_greeks(forward, legs["strike"].to_numpy(), T, iv, is_call, r)
+    legs = legs.assign(ltp=price, iv=iv, **g)
+
+    board = pd.DataFrame({"strike": wanted})
+    for kind in ("CE", "PE"):
+        side = legs[legs["kind"] == kind].set_index("strike")[list(CHAIN_FIELDS)]
+        board = board.join(side.add_prefix(f"{kind.lower()}_"), on="strike")
+    board = board.dropna(subset=["ce_token", "pe_token"], how="all").reset_index(drop=True)
+    board.attrs.update({"expiry": expiry, "T": T, "atm": atm,
+                        "chain_ms": round((time.perf_counter() - t0) * 1e3, 1), "errors": errors})
+    return board
+
+
+def leg_greeks(board: Optional[pd.DataFrame], token: str) -> Optional[dict]:
+    """{'delta', 'gamma', 'iv'} of the chain leg with this token, if it is on the board."""
+    if board is None or board.empty: return None
+    for kind in ("ce", "pe"):
+        hit = board[board[f"{kind}_token"] == str(token)]
+        if not hit.empty:
+            row = hit.iloc[0]
+            g = {k: float(row[f"{kind}_{k}"]) for k in ("delta", "gamma", "iv")}
+            return g if np.isfinite(g["delta"]) else None
+    return None
@@ -0,0 +1,269 @@
+# engine.py — headless signal/execution daemon, decoupled from Streamlit reruns
+#
+#   ANGEL_API_KEY=... ANGEL_CLIENT_ID=... ANGEL_MPIN=... ANGEL_TOTP_SECRET=... python engine.py
+#
+# Evaluates generate_signal's rules on every 5-minute bar close for ENGINE_INDICES and
+# writes the result to ENGINE_STATE_PATH, which app.py shows as a read-only panel.
+# ENGINE_EXECUTE=paper|live also enters trades (journal, sheet and alerts as in the UI).
+# Entered positions exit at target / stop on their own in paper mode; with live orders that
+# means unattended SELLs, so it needs ENGINE_AUTO_EXIT=1 as well (ENGINE_AUTO_EXIT=0 turns it off in paper).
+# ENGINE_TIMEFRAME=15m evaluates on bars resampled from the 5m series; ENGINE_CONFIRM=60m|1d
+# also requires that timeframe's EMA trend to agree. Neither costs an extra API call.
+# METRICS_PORT=9108 serves Prometheus metrics on /metrics.
+from __future__ import annotations
+
+import datetime as dt
+import json
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import orders
+from alerts import AlertDispatcher
+from broker import BrokerClient, refresh_with_token
+from candles import CandleStore
+from feed import IST
+from gsheet import SheetLogger
+from instruments import InstrumentIndex, atm_step_for_index, load_scrip_master, scrip_master_version, strike_for_mode
+from journal import JOURNAL_PATH, TradeJournal
+from metrics import REGISTRY, serve, timed, timer
+from positions import PositionManager
+from quotes import QuoteCache
+from strategy import IndicatorEngine, confirm_with_htf, htf_trend
+from timeframes import Resampler, minutes_of
+
+ENGINE_STATE_PATH = os.getenv("ENGINE_STATE_PATH", "/tmp/engine_state.json")
+BAR_MINUTES = 5
+
+
+# --------------------- State file (engine -> UI) ---------------------
+def write_state(state: dict, path: str = ENGINE_STATE_PATH):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f: json.dump(state, f, default=str)
+    os.replace(tmp, path)
+
+def read_state(path: str = ENGINE_STATE_PATH, max_age: float = 15 * 60) -> Optional[dict]:
+    """Last engine snapshot, or None when there is none / the engine stopped heart-beating."""
+    try:
+        if time.time() - os.path.getmtime(path) > max_age: return None
+        with open(path) as f: return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# --------------------- Scheduling ---------------------
+def now_ist() -> dt.datetime:
+    # naive exchange wall clock, whatever the host timezone (SmartAPI takes IST strings)
+    return dt.datetime.now(IST).replace(tzinfo=None)
+
+def bar_start(t: dt.datetime, minutes: int = BAR_MINUTES) -> dt.datetime:
+    return t.replace(minute=t.minute - t.minute % minutes, second=0, microsecond=0)
+
+def next_bar_close(t: dt.datetime, minutes: int = BAR_MINUTES) -> dt.datetime:
+    return bar_start(t, minutes) + dt.timedelta(minutes=minutes)
+
+def sleep_until(target: dt.datetime, stop: threading.Event) -> bool:
+    """Sleep to the wall-clock target in shrinking steps (no drift). False if stopped."""
+    while not stop.is_set():
+        left = (target - now_ist()).total_seconds()
+        if left <= 0: return True
+        stop.wait(min(left, 30.0) if left > 1.0 else left)
+    return False
+
+
+# --------------------- Engine ---------------------
+def login_from_env() -> BrokerClient:
+    import pyotp
+    from SmartApi.smartConnect import SmartConnect
+
+    def session(smart):
+        totp = pyotp.TOTP(os.environ["ANGEL_TOTP_SECRET"].strip()).now()
+        with timer("api.generateSession"):
+            auth = smart.generateSession(os.environ["ANGEL_CLIENT_ID"].strip(), os.environ["ANGEL_MPIN"].strip(), totp)
+        if not auth or not auth.get("status"): raise RuntimeError((auth or {}).get("message", "Login failed"))
+
+    def refresh(smart):
+        # headless we hold the TOTP secret: if the refresh token is refused as well, log in from scratch
+        try: refresh_with_token(smart)
+        except Exception: session(smart)
+
+    smart = SmartConnect(api_key=os.environ["ANGEL_API_KEY"].strip())
+    session(smart)
+    return BrokerClient(smart, refresh=refresh)
+
+
+class SignalEngine:
+    """
+    One evaluation per index per bar close, on closed bars only (the forming bar the
+    API may already return is dropped). Candles come from an incremental CandleStore,
+    indicators from a per-index IndicatorEngine, quotes from a QuoteCache.
+    """
+
+    def __init__(self, smart, indices=("NIFTY",), params: Optional[dict] = None,
+                 strike_mode: str = "ATM", offset_steps: int = 0, qty: int = 25,
+                 execute: str = "off", user: str = "engine", grace: float = 2.0,
+                 state_path: str = ENGINE_STATE_PATH, instruments: Optional[InstrumentIndex] = None,
+                 journal_path: str = JOURNAL_PATH, quote_ttl: float = 1.0, auto_exit: Optional[bool] = None):
+        self.smart, self.indices = smart, [i.upper() for i in indices]
+        self.params = {"ema_fast": 5, "ema_slow": 13, "breakout_lookback": 10, "atr_len": 14,
+                       "session_start": "09:15", "session_end": "15:25", **(params or {})}
+        self.strike_mode, self.offset_steps, self.qty = strike_mode, offset_steps, qty
+        self.execute, self.user, self.grace, self.state_path = execute, user, grace, state_path
+        self.candles = CandleStore()
+        self.quotes = QuoteCache(ttl=quote_ttl)
+        self.engines: Dict[str, IndicatorEngine] = {}
+        self.resamplers: Dict[tuple, Resampler] = {}  # (index, minutes) -> higher-timeframe view of the 5m bars
+        self.state: Dict[str, dict] = {}
+        self._instruments: Optional[InstrumentIndex] = instruments
+        self._instr_fixed = instruments is not None  # injected (replay): never reload from disk
+        self._instr_version = -1.0
+        self._entered: Dict[str, str] = {}  # index -> bar time already traded
+        self.journal = TradeJournal(journal_path) if execute != "off" else None
+        self.alerts = AlertDispatcher() if execute != "off" else None
+        self.sheet = SheetLogger() if execute != "off" else None
+        # entered positions are watched for target/stop by quote polling between bar closes
+        self.positions = (PositionManager(self.quotes, smart, journal=self.journal, sheet=self.sheet,
+                                          alerts=self.alerts, user=user,
+                                          auto=execute != "live" if auto_exit is None else auto_exit)
+                          if execute != "off" else None)
+
+    def instruments(self) -> InstrumentIndex:
+        if self._instr_fixed: return self._instruments
+        v = scrip_master_version()
+        if self._instruments is None or v != self._instr_version:
+            self._instruments, self._instr_version = InstrumentIndex(load_scrip_master()), v
+        return self._instruments
+
+    @timed("engine.evaluate")
+    def evaluate(self, index: str, now: Optional[dt.datetime] = None) -> dict:
+        now = now or now_ist()
+        t0 = time.perf_counter()
+        p = self.params
+        out = {"index": index, "evaluated_at": now.isoformat(timespec="seconds"), "side": None}
+        fut = self.instruments().nearest_future(index, now.date())
+        if fut is None:
+            return {**out, "error": "No FUTIDX found for this index."}
+        token = str(fut.get("token", ""))
+        start = (now - dt.timedelta(days=5)).replace(hour=9, minute=15, second=0, microsecond=0)
+        candles = self.candles.update(self.smart, token, start, now)
+        if candles.empty:
+            return {**out, "error": "No candles received."}
+        wall = candles["time"].dt.tz_localize(None) if candles["time"].dt.tz is not None else candles["time"]
+        closed = candles[wall < bar_start(now)].reset_index(drop=True)  # drop the forming bar
+
+        bars = self._timeframe(index, p.get("timeframe"), closed)
+        eng = self.engines.get(index)
+        if eng is None:
+            eng = self.engines[index] = IndicatorEngine(p["ema_fast"], p["ema_slow"], p["breakout_lookback"], p["atr_len"])
+        side, ctx = eng.sync(bars).signal(p["session_start"], p["session_end"])
+        if p.get("confirm"):
+            trend = htf_trend(self._timeframe(index, p["confirm"], closed), p["ema_fast"], p["ema_slow"])
+            side, ctx = confirm_with_htf(side, ctx, trend)
+
+        last_close = float(closed["close"].iloc[-1]) if not closed.empty else float(candles["close"].iloc[-1])
+        strike = strike_for_mode(last_close, atm_step_for_index(index), self.strike_mode, self.offset_steps)
+        legs = {k: self.instruments().option_for_strike(index, strike, k, now.date()) for k in ("CE", "PE")}
+        out.update({
+            "bar_time": str(bars["time"].iloc[-1]) if not bars.empty else None,
+            "side": side, "ctx": ctx, "fut_token": token, "last_close": last_close, "strike": strike,
+            "legs": {k: None if r is None else {"symbol": r.get("tradingsymbol", ""), "token": str(r.get("token", "")),
+                                               "exchange": r.get("exch_seg", "NFO"), "expiry": str(r.get("expiry", ""))}
+                     for k, r in legs.items()},
+        })
+        if side and self.execute != "off" and legs.get(side) is not None and self._entered.get(index) != out["bar_time"]:
+            entry = self._enter(index, side, ctx, out["legs"][side])
+            if entry is None:
+                out["error"] = f"No quote for {out['legs'][side]['symbol']}; entry skipped."
+            else:
+                out["entry"] = entry
+                self._entered[index] = out["bar_time"]
+        out["latency_ms"] = round((time.perf_counter() - t0) * 1e3, 1)
+        return out
+
+    def _timeframe(self, index: str, tf, closed):
+        """Closed 5m bars, or the `tf` bars built from them (the last bucket may still be filling)."""
+        if not tf or minutes_of(tf) == BAR_MINUTES: return closed
+        rs = self.resamplers.get((index, minutes_of(tf)))
+        if rs is None: rs = self.resamplers[(index, minutes_of(tf))] = Resampler(tf)
+        return rs.update(closed)
+
+    def _enter(self, index: str, side: str, ctx: dict, leg: dict) -> Optional[dict]:
+        """Book (and, live, place) the entry. None when the leg has no quote: levels need a real entry price."""
+        exch, tsym, tok = "NFO", leg["symbol"], leg["token"]
+        quotes, _ = self.quotes.get_many(self.smart, [(exch, tsym, tok)])
+        entry_ltp = quotes.get((exch, tok))
+        if not entry_ltp: return None
+        if self.execute == "live":
+            resp = orders.place_live_order(self.smart, exch, tsym, tok, "BUY", self.qty)
+            status = "LIVE-PLACED" if (resp or {}).get("status") else "LIVE-FAIL"
+        else:
+            status = "PAPER"
+        entry = self.positions.enter(orders.make_entry(index, side, exch, tsym, tok, self.qty, entry_ltp, ctx, status))
+        event = {**entry, "event": "ENTER", "source": "engine"}
+        self.journal.append(event, user=self.user)
+        self.sheet.log(event)
+        self.alerts.webhook({"type": "enter", **entry})
+        self.alerts.email(f"[ENTER-{status}] {index} {side} {tsym}", json.dumps(entry, indent=2))
+        return entry
+
+    def _evaluate_safe(self, index: str, now: Optional[dt.datetime]) -> dict:
+        try:
+            return self.evaluate(index, now)
+        except Exception as e:
+            return {"index": index, "error": f"{type(e).__name__}: {e}"}
+
+    def tick(self, now: Optional[dt.datetime] = None):
+        self.instruments()  # refresh once, before the workers share it
+        # indices are independent; fetch/evaluate them concurrently (latency ~ slowest index)
+        with ThreadPoolExecutor(max_workers=len(self.indices) or 1, thread_name_prefix="engine") as ex:
+            for index, res in zip(self.indices, ex.map(lambda i: self._evaluate_safe(i, now), self.indices)):
+                self.state[index] = res
+        write_state({"heartbeat": now_ist().isoformat(timespec="seconds"), "pid": os.getpid(),
+                     "params": self.params, "execute": self.execute, "indices": self.state,
+                     "positions": self.positions.positions() if self.positions else []}, self.state_path)
+
+    def run_forever(self, stop: Optional[threading.Event] = None):
+        stop = stop or threading.Event()
+        if self.positions: self.positions.start()
+        self.tick()
+        while not stop.is_set():
+            target = next_bar_close(now_ist()) + dt.timedelta(seconds=self.grace)  # let the API close the bar
+            if not sleep_until(target, stop): break
+            self.tick()
+        if self.positions: self.positions.stop(); self.positions.flush(10)
+        if self.alerts: self.alerts.flush(10)
+        if self.sheet: self.sheet.flush()
+
+
+def main():
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    params = {k: int(os.environ[f"ENGINE_{k.upper()}"]) for k in ("ema_fast", "ema_slow", "breakout_lookback", "atr_len")
+              if os.getenv(f"ENGINE_{k.upper()}")}
+    params.update({k: os.environ[f"ENGINE_{k.upper()}"].strip() for k in ("timeframe", "confirm")
+                   if os.getenv(f"ENGINE_{k.upper()}", "").strip()})
+    eng = SignalEngine(
+        login_from_env(),
+        indices=[i.strip() for i in os.getenv("ENGINE_INDICES", "NIFTY").split(",") if i.strip()],
+        params=params,
+        strike_mode=os.getenv("ENGINE_STRIKE_MODE", "ATM"),
+        offset_steps=int(os.getenv("ENGINE_OFFSET_STEPS", "0") or 0),
+        qty=int(os.getenv("ENGINE_QTY", "25") or 25),
+        execute=os.getenv("ENGINE_EXECUTE", "off").strip().lower(),
+        user=os.getenv("ANGEL_CLIENT_ID", "engine").strip(),
+        auto_exit={"1": True, "0": False}.get(os.getenv("ENGINE_AUTO_EXIT", "").strip()),
+    )
+    if os.getenv("METRICS_PORT"):
+        serve(int(os.environ["METRICS_PORT"]))
+        if eng.alerts: REGISTRY.gauge("alerts_queued", lambda: sum(v for k, v in eng.alerts.metrics().items() if k.startswith("queued_")))
+        if eng.sheet: REGISTRY.gauge("gsheet_pending", eng.sheet.pending)
+        REGISTRY.gauge("broker_queued", eng.smart.limiter.queued)
+    eng.run_forever(stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# feed.py — live tick feed (SmartAPI WebSocket v2) + shared in-process tick / bar cache
+from __future__ import annotations
+
+import datetime as dt
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from candles import CANDLE_COLS, empty_candles
+from timeframes import SESSION_OPEN, bucket_starts
+
+EXCHANGE_TYPES = {"NSE": 1, "NFO": 2, "BSE": 3, "BFO": 4, "MCX": 5}
+_EXCH_BY_TYPE = {v: k for k, v in EXCHANGE_TYPES.items()}
+IST = dt.timezone(dt.timedelta(hours=5, minutes=30))
+MODE_LTP, MODE_QUOTE = 1, 2  # QUOTE carries day volume, which the bar builder needs
+
+TickKey = Tuple[str, str]  # (exchange, token)
+
+
+# --------------------- Ticks -> bars ---------------------
+class BarBuilder:
+    """
+    Folds ticks into fixed-minute OHLCV bars; volume from day-volume deltas when present.
+    Buckets are anchored at the session open, as in timeframes.resample (60m bars start
+    09:15, 10:15, ...).
+    """
+
+    def __init__(self, minutes: int = 5, keep: int = 500, session_open: str = SESSION_OPEN):
+        self.minutes, self.session_open = minutes, session_open
+        self.bars: deque = deque(maxlen=keep)  # completed bars, oldest first
+        self.current: Optional[dict] = None
+        self._last_cum: Optional[float] = None
+        self._span: Optional[Tuple[dt.datetime, dt.datetime]] = None  # [start, end) of the last bucket looked up
+
+    def _bucket(self, ts: dt.datetime) -> dt.datetime:
+        # ticks inside the known bucket skip the lookup: bucket_starts runs once per bar
+        if self._span and self._span[0] <= ts < self._span[1]: return self._span[0]
+        wall = int(bucket_starts(pd.Series([ts]), self.minutes, self.session_open)[0])
+        start = pd.Timestamp(wall).to_pydatetime().replace(tzinfo=ts.tzinfo)
+        self._span = (start, start + dt.timedelta(minutes=min(self.minutes, 24 * 60)))
+        return start
+
+    def on_tick(self, ts: dt.datetime, price: float, cum_volume: Optional[float] = None):
+        vol = 0.0
+        if cum_volume is not None:
+            if self._last_cum is not None and cum_volume >= self._last_cum: vol = cum_volume - self._last_cum
+            self._last_cum = cum_volume
+        b = self._bucket(ts)
+        cur = self.current
+        if cur is None or b > cur["time"]:
+            if cur is not None: self.bars.append(cur)
+            self.current = {"time": b, "open": price, "high": price, "low": price, "close": price, "volume": vol}
+        elif b == cur["time"]:
+            cur["high"] = max(cur["high"], price); cur["low"] = min(cur["low"], price)
+            cur["close"] = price; cur["volume"] += vol
+        # ticks older than the forming bar are late prints; drop them
+
+    def frame(self, include_forming: bool = True) -> pd.DataFrame:
+        rows = list(self.bars) + ([dict(self.current)] if include_forming and self.current else [])
+        if not rows: return empty_candles()
+        df = pd.DataFrame(rows, columns=CANDLE_COLS)
+        df["time"] = pd.to_datetime(df["time"])
+        return df
+
+
+class TickCache:
+    """Lock-protected last price + live bars per (exchange, token), shared by all sessions."""
+
+    def __init__(self, bar_minutes: int = 5):
+        self.bar_minutes = bar_minutes
+        self._lock = threading.Lock()
+        self._last: Dict[TickKey, Tuple[float, float, dt.datetime]] = {}  # price, monotonic rx, exchange ts
+        self._bars: Dict[TickKey, BarBuilder] = {}
+        self._listeners: List[Callable[[str, str, float], None]] = []
+        self.ticks = 0
+
+    def add_listener(self, fn: Callable[[str, str, float], None]):
+        """fn(exchange, token, price) on the feed thread after every tick; keep it fast."""
+        self._listeners.append(fn)
+
+    def on_tick(self, exch: str, token: str, price: float, ts: dt.datetime, cum_volume: Optional[float] = None):
+        key = (exch, str(token))
+        with self._lock:
+            self._last[key] = (float(price), time.monotonic(), ts)
+            b = self._bars.get(key)
+            if b is None: b = self._bars[key] = BarBuilder(self.bar_minutes)
+            b.on_tick(ts, float(price), cum_volume)
+            self.ticks += 1
+        for fn in self._listeners:
+            try: fn(key[0], key[1], float(price))
+            except Exception: pass  # a listener must never stall the feed
+
+    def ltp(self, exch: str, token: str, max_age: float = 5.0) -> Optional[float]:
+        with self._lock:
+            hit = self._last.get((exch, str(token)))
+        return hit[0] if hit and time.monotonic() - hit[1] <= max_age else None
+
+    def bars(self, exch: str, token: str, include_forming: bool = True) -> pd.DataFrame:
+        with self._lock:
+            b = self._bars.get((exch, str(token)))
+            return b.frame(include_forming) if b else empty_candles()
+
+
+# --------------------- Feeds ---------------------
+class LiveFeed:
+    """
+    SmartWebSocketV2 on a daemon thread, pushing ticks into a TickCache.
+    subscribe() may be called any time; tokens queued before the socket opens are
+    sent from on_open (and re-sent after a reconnect).
+    """
+
+    def __init__(self, cache: TickCache, auth_token: str, api_key: str, client_code: str, feed_token: str,
+                 mode: int = MODE_QUOTE):
+        self.cache, self.mode = cache, mode
+        self._creds = (auth_token, api_key, client_code, feed_token)
+        self._subs: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self._ws = None
+        self._thread: Optional[threading.Thread] = None
+        self.connected = False
+        self.last_error = ""
+
+    def _token_list(self, subs: Dict[str, set]) -> list:
+        return [{"exchangeType": EXCHANGE_TYPES[e], "tokens": sorted(t)} for e, t in subs.items() if t and e in EXCHANGE_TYPES]
+
+    def subscribe(self, instruments: Iterable[TickKey]):
+        new: Dict[str, set] = {}
+        with self._lock:
+            for exch, tok in instruments:
+                have = self._subs.setdefault(exch, set())
+                if str(tok) not in have:
+                    have.add(str(tok)); new.setdefault(exch, set()).add(str(tok))
+        if new and self.connected and self._ws is not None:
+            try: self._ws.subscribe("opts", self.mode, self._token_list(new))
+            except Exception as e: self.last_error = str(e)
+
+    def _on_open(self, ws):
+        self.connected = True
+        with self._lock: subs = {e: set(t) for e, t in self._subs.items()}
+        if subs: self._ws.subscribe("opts", self.mode, self._token_list(subs))
+
+    def _on_data(self, ws, msg):
+        try:
+            exch = _EXCH_BY_TYPE.get(int(msg.get("exchange_type", 0)), "")
+            price = float(msg["last_traded_price"]) / 100.0  # feed sends paise
+            ts_ms = msg.get("exchange_timestamp")
+            ts = dt.datetime.fromtimestamp(ts_ms / 1000.0, IST) if ts_ms else dt.datetime.now(IST)
+            self.cache.on_tick(exch, str(msg["token"]), price, ts, msg.get("volume_trade_for_the_day"))
+        except Exception as e:
+            self.last_error = f"bad tick: {e}"
+
+    def _on_error(self, ws, err):
+        self.last_error = str(err)
+
+    def _on_close(self, ws):
+        self.connected = False
+
+    def start(self) -> "LiveFeed":
+        if self._thread and self._thread.is_alive(): return self
+        from SmartApi.smartWebSocketV2 import SmartWebSocketV2
+        self._ws = SmartWebSocketV2(*self._creds)
+        self._ws.on_open, self._ws.on_data = self._on_open, self._on_data
+        self._ws.on_error, self._ws.on_close = self._on_error, self._on_close
+        self._thread = threading.Thread(target=self._ws.connect, name="tick-feed", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._ws is not None:
+            try: self._ws.close_connection()
+            except Exception: pass
+        self.connected = False
+
+
+def load_ticks(path: str) -> pd.DataFrame:
+    """Recorded ticks: time, exchange, token, price[, volume] (volume = cumulative day volume)."""
+    df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path, dtype={"token": str})
+    df["time"] = pd.to_datetime(df["time"])
+    if df["time"].dt.tz is None: df["time"] = df["time"].dt.tz_localize(IST)
+    return df.sort_values("time", kind="mergesort").reset_index(drop=True)
+
+
+class ReplayFeed:
+    """
+    Offline stand-in for LiveFeed: replays recorded ticks into a TickCache at `speed`x
+    real time (speed=0 replays as fast as possible). Same start/stop/subscribe surface;
+    only subscribed tokens are replayed once anything is subscribed.
+    """
+
+    def __init__(self, cache: TickCache, ticks: pd.DataFrame, speed: float = 1.0):
+        self.cache, self.ticks, self.speed = cache, ticks, speed
+        self._subs: set = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.connected = False
+        self.last_error = ""
+        self.done = threading.Event()
+
+    def subscribe(self, instruments: Iterable[TickKey]):
+        self._subs.update((e, str(t)) for e, t in instruments)
+
+    def _run(self):
+        self.connected = True
+        prev = None
+        cols = [self.ticks[c].tolist() for c in ("time", "exchange", "token", "price")]
+        vols = self.ticks["volume"].tolist() if "volume" in self.ticks.columns else [None] * len(self.ticks)
+        for ts, exch, tok, px, vol in zip(*cols, vols):
+            if self._stop.is_set(): break
+            if self._subs and (exch, str(tok)) not in self._subs: continue
+            if prev is not None and self.speed > 0:
+                gap = (ts - prev).total_seconds() / self.speed
+                if gap > 0: self._stop.wait(gap)
+            prev = ts
+            self.cache.on_tick(exch, str(tok), float(px), ts.to_pydatetime(), None if vol is None or vol != vol else float(vol))
+        self.connected = False
+        self.done.set()
+
+    def start(self) -> "ReplayFeed":
+        if self._thread and self._thread.is_alive(): return self
+        self._stop.clear(); self.done.clear()
+        self._thread = threading.Thread(target=self._run, name="tick-replay", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,109 @@
+# greeks.py — vectorized Black-76 prices, implied volatility and Greeks (whole chain per call)
+from __future__ import annotations
+
+import datetime as dt
+
+import numpy as np
+
+RISK_FREE = 0.065        # annual, continuously compounded (discounting only under Black-76)
+EXPIRY_TIME = dt.time(15, 30)
+YEAR_SECONDS = 365.0 * 24 * 3600
+
+_SQRT2PI = np.sqrt(2.0 * np.pi)
+
+
+# --------------------- Normal distribution (no scipy) ---------------------
+def _erfc(x: np.ndarray) -> np.ndarray:
+    # Chebyshev fit (Numerical Recipes erfcc), fractional error < 1.2e-7 everywhere
+    z = np.abs(x)
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = -z*z - 1.26551223 + t*(1.00002368 + t*(0.37409196 + t*(0.09678418 + t*(-0.18628806 + t*(0.27886807
+           + t*(-1.13520398 + t*(1.48851587 + t*(-0.82215223 + t*0.17087277))))))))
+    r = t * np.exp(poly)
+    return np.where(x >= 0, r, 2.0 - r)
+
+def norm_cdf(x) -> np.ndarray:
+    return 0.5 * _erfc(-np.asarray(x, dtype=float) / np.sqrt(2.0))
+
+def norm_pdf(x) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    return np.exp(-0.5 * x * x) / _SQRT2PI
+
+
+# --------------------- Black-76 ---------------------
+def year_fraction(expiry: dt.date, now: dt.datetime) -> float:
+    """Calendar time to the 15:30 expiry close, in years (<= 0 once expired)."""
+    return (dt.datetime.combine(expiry, EXPIRY_TIME) - now).total_seconds() / YEAR_SECONDS
+
+def _d1_d2(F, K, T, sigma):
+    sd = sigma * np.sqrt(T)
+    d1 = (np.log(F / K) + 0.5 * sd * sd) / sd
+    return d1, d1 - sd
+
+def black76_price(F, K, T, sigma, is_call, r: float = RISK_FREE) -> np.ndarray:
+    """Option price on forward/futures price F. All array arguments broadcast."""
+    F, K, T, sigma = (np.asarray(a, dtype=float) for a in (F, K, T, sigma))
+    is_call = np.asarray(is_call, dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1, d2 = _d1_d2(F, K, T, sigma)
+        disc = np.exp(-r * T)
+        call = disc * (F * norm_cdf(d1) - K * norm_cdf(d2))
+        put = disc * (K * norm_cdf(-d2) - F * norm_cdf(-d1))
+    return np.where(is_call, call, put)
+
+def black76_greeks(F, K, T, sigma, is_call, r: float = RISK_FREE) -> dict:
+    """
+    delta / gamma against the futures price, vega per 1 vol point (0.01),
+    theta per calendar day. NaN wherever sigma or T is not positive.
+    """
+    F, K, T, sigma = (np.asarray(a, dtype=float) for a in (F, K, T, sigma))
+    is_call = np.asarray(is_call, dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ok = (sigma > 0) & (T > 0)
+        sqrt_t = np.sqrt(T)
+        d1, _ = _d1_d2(F, K, T, sigma)
+        disc = np.exp(-r * T)
+        pdf = norm_pdf(d1)
+        price = black76_price(F, K, T, sigma, is_call, r)
+        delta = np.where(is_call, disc * norm_cdf(d1), -disc * norm_cdf(-d1))
+        gamma = disc * pdf / (F * sigma * sqrt_t)
+        vega = disc * F * pdf * sqrt_t
+        theta = r * price - disc * F * pdf * sigma / (2.0 * sqrt_t)
+    nan = np.nan
+    return {"delta": np.where(ok, delta, nan), "gamma": np.where(ok, gamma, nan),
+            "vega": np.where(ok, vega / 100.0, nan), "theta": np.where(ok, theta / 365.0, nan)}
+
+def implied_vol(price, F, K, T, is_call, r: float = RISK_FREE,
+                tol: float = 1e-6, max_iter: int = 60, lo: float = 1e-4, hi: float = 5.0) -> np.ndarray:
+    """
+    Newton-Raphson on every option at once, safeguarded by a shrinking [lo, hi] bracket:
+    a step that leaves the bracket (or has no vega to work with) bisects instead, so
+    deep ITM/OTM strikes converge too. Prices outside the no-arbitrage band give NaN.
+    """
+    price, F, K, T = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (price, F, K, T)))
+    is_call = np.broadcast_to(np.asarray(is_call, dtype=bool), price.shape)
+    disc = np.exp(-r * np.where(T > 0, T, 0.0))
+    intrinsic = disc * np.where(is_call, np.maximum(F - K, 0.0), np.maximum(K - F, 0.0))
+    upper = disc * np.where(is_call, F, K)
+    valid = np.isfinite(price) & (T > 0) & (F > 0) & (K > 0) & (price > intrinsic) & (price < upper)
+
+    lo_b = np.full(price.shape, lo)
+    hi_b = np.full(price.shape, hi)
+    sigma = np.full(price.shape, 0.2)
+    todo = valid.copy()
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(max_iter):
+            if not todo.any(): break
+            idx = np.flatnonzero(todo)
+            s, f, k, t = sigma[idx], F[idx], K[idx], T[idx]
+            diff = black76_price(f, k, t, s, is_call[idx], r) - price[idx]
+            done = np.abs(diff) < tol
+            lo_b[idx] = np.where(diff < 0, s, lo_b[idx])
+            hi_b[idx] = np.where(diff > 0, s, hi_b[idx])
+            d1, _ = _d1_d2(f, k, t, s)
+            vega = np.exp(-r * t) * f * norm_pdf(d1) * np.sqrt(t)
+            step = s - diff / vega
+            bad = ~np.isfinite(step) | (step <= lo_b[idx]) | (step >= hi_b[idx])
+            sigma[idx] = np.where(done, s, np.where(bad, 0.5 * (lo_b[idx] + hi_b[idx]), step))
+            todo[idx] = ~done & (hi_b[idx] - lo_b[idx] > 1e-10)
+    return np.where(valid, sigma, np.nan)
@@ -0,0 +1,104 @@
+# gsheet.py — buffered Google Sheets trade logging with a cached, authorized worksheet
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from metrics import timer
+
+
+def _status(e: Exception) -> int:
+    resp = getattr(e, "response", None)
+    return int(getattr(resp, "status_code", 0) or 0)
+
+
+class SheetLogger:
+    """
+    log() only appends to an in-memory buffer. A background thread flushes it every
+    `flush_interval` seconds (or as soon as `batch_size` rows are waiting) with one
+    append_rows() call on a worksheet handle that is authorized once and reused.
+    429 / 5xx responses back off exponentially with jitter; rows stay buffered until
+    they land. Auth errors drop the cached handle so the next flush re-authorizes.
+    """
+
+    def __init__(self, flush_interval: float = 2.0, batch_size: int = 50, max_backoff: float = 60.0):
+        self.flush_interval, self.batch_size, self.max_backoff = flush_interval, batch_size, max_backoff
+        self._buf: deque = deque()
+        self._cv = threading.Condition()
+        self._flush_lock = threading.Lock()  # one flush at a time (background thread, engine loop)
+        self._ws = None
+        self._ws_key: Optional[tuple] = None
+        self._backoff = 0.0
+        self.rows_written = 0
+        self.flushes = 0
+        self.last_error = ""
+        threading.Thread(target=self._run, name="gsheet-flush", daemon=True).start()
+
+    @staticmethod
+    def _config() -> Optional[tuple]:
+        js = os.getenv("GSPREAD_SERVICE_ACCOUNT_JSON","").strip()
+        return (js, os.getenv("GSHEET_ID","").strip()) if js else None
+
+    def log(self, entry: dict):
+        if not self._config(): return
+        with self._cv:
+            self._buf.append([entry.get(k,"") for k in sorted(entry.keys())])
+            if len(self._buf) >= self.batch_size: self._cv.notify()
+
+    def pending(self) -> int:
+        return len(self._buf)
+
+    def _worksheet(self, cfg: tuple):
+        if self._ws is not None and self._ws_key == cfg: return self._ws
+        import gspread
+        from google.oauth2.service_account import Credentials
+        info = json.loads(cfg[0])
+        scopes = ["https://www.googleapis.com/auth/spreadsheets"]
+        creds = Credentials.from_service_account_info(info, scopes=scopes)
+        gc = gspread.authorize(creds)
+        self._ws, self._ws_key = gc.open_by_key(cfg[1]).sheet1, cfg
+        return self._ws
+
+    def flush(self) -> bool:
+        """Write everything buffered in one request. True when the buffer was drained."""
+        cfg = self._config()
+        if not cfg: return True
+        with self._flush_lock:
+            with self._cv:  # take the batch out: rows logged during the request wait for the next flush
+                rows = list(self._buf)
+                self._buf.clear()
+            if not rows: return True
+            try:
+                with timer("gsheet.append_rows"):
+                    self._worksheet(cfg).append_rows(rows, value_input_option="USER_ENTERED")
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                code = _status(e)
+                if code in (401, 403): self._ws = None
+                # anything but a 4xx rejection of the rows themselves goes back in front, in order
+                if not (400 <= code < 500 and code not in (401, 403, 429)):
+                    with self._cv: self._buf.extendleft(reversed(rows))
+                if code == 429 or code >= 500 or code == 0:
+                    self._backoff = min(self.max_backoff, max(1.0, self._backoff * 2))
+                return False
+            self._backoff = 0.0
+            self.rows_written += len(rows)
+            self.flushes += 1
+            return True
+
+    def _run(self):
+        while True:
+            with self._cv:
+                self._cv.wait(timeout=self.flush_interval)
+            if self._backoff:
+                time.sleep(self._backoff * (0.5 + random.random()))
+            self.flush()
+
+    def metrics(self) -> dict:
+        return {"pending": self.pending(), "rows_written": self.rows_written, "flushes": self.flushes,
+                "backoff_s": round(self._backoff, 1), "last_error": self.last_error}
@@ -0,0 +1,274 @@
+# instruments.py — scrip master helpers + pre-built instrument index
+from __future__ import annotations
+
+import datetime as dt
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from io import StringIO
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import requests
+
+from metrics import timed
+
+SCRIP_MASTER_URL = "https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.csv"
+SCRIP_CACHE_PATH = os.getenv("SCRIP_CACHE_PATH", "/tmp/scrip_master.arrow")
+SCRIP_CACHE_TTL = int(os.getenv("SCRIP_CACHE_TTL", "3600") or 3600)
+SCRIP_RETRY_SECONDS = float(os.getenv("SCRIP_RETRY_SECONDS", "120") or 120)  # between refresh attempts of a stale file
+_CATEGORY_COLS = ("name", "exch_seg", "instrumenttype", "optiontype")
+
+
+def col_upper(df: pd.DataFrame, col: str) -> pd.Series:
+    return df[col].astype(str).str.upper() if col in df.columns else pd.Series([""]*len(df), index=df.index)
+
+def atm_step_for_index(index: str) -> int:
+    return {"NIFTY": 50, "BANKNIFTY": 100, "SENSEX": 100}.get(index.upper(), 50)
+
+def strike_for_mode(last_close: float, step: int, mode: str = "ATM", offset_steps: int = 0) -> int:
+    atm_base = int(round(last_close / step) * step)
+    if mode == "ITM": return atm_base + (offset_steps * step)
+    if mode == "OTM": return atm_base - (offset_steps * step)
+    return atm_base
+
+
+def _parse_expiry(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(s): return s
+    out = pd.to_datetime(s, errors="coerce", format="%d%b%Y")  # master uses e.g. 28MAR2024
+    miss = out.isna() & s.notna()
+    if miss.any(): out[miss] = pd.to_datetime(s[miss], errors="coerce")
+    return out
+
+
+# --------------------- Scrip master download + on-disk cache ---------------------
+@timed("scrip.download")
+def fetch_scrip_master(url: str = SCRIP_MASTER_URL) -> pd.DataFrame:
+    r = requests.get(url, timeout=30)
+    r.raise_for_status()
+    return compact_scrip_master(pd.read_csv(StringIO(r.text)))
+
+def compact_scrip_master(df: pd.DataFrame) -> pd.DataFrame:
+    """Typed columns: categoricals for the low-cardinality keys, datetime expiry, float strike."""
+    df = df.copy()
+    for c in _CATEGORY_COLS:
+        if c in df.columns: df[c] = df[c].astype("category")
+    if "expiry" in df.columns: df["expiry"] = _parse_expiry(df["expiry"])
+    for c in ("strike", "lotsize", "tick_size"):
+        if c in df.columns: df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df
+
+def write_scrip_cache(df: pd.DataFrame, path: str = SCRIP_CACHE_PATH):
+    # uncompressed Arrow IPC: readers load it without parsing; os.replace keeps other workers' reads atomic
+    from pyarrow import feather
+    tmp = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(df, tmp, compression="uncompressed")
+    os.replace(tmp, path)
+
+def read_scrip_cache(path: str = SCRIP_CACHE_PATH) -> Optional[pd.DataFrame]:
+    """
+    The typed frame from the on-disk cache. Mapping the file spares a read into a buffer,
+    but to_pandas() still builds the frame in this process's memory (strings and
+    categoricals can't stay on the mapped pages): what workers share is the download and
+    the parse, not the frame itself.
+    """
+    try:
+        from pyarrow import feather
+        return feather.read_table(path, memory_map=True).to_pandas()
+    except Exception:
+        return None
+
+def _refresh_scrip_cache(path: str, url: str):
+    # one refresher across all worker processes: the lock file is the token
+    lock = path + ".lock"
+    try:
+        if os.path.exists(lock) and time.time() - os.path.getmtime(lock) > 300: os.remove(lock)  # crashed refresher
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except OSError:
+        return
+    try:
+        os.close(fd)
+        write_scrip_cache(fetch_scrip_master(url), path)
+    except Exception:
+        pass  # keep serving the stale file; the next version check after SCRIP_RETRY_SECONDS retries
+    finally:
+        try: os.remove(lock)
+        except OSError: pass
+
+_refresh_guard = threading.Lock()
+_refresh_after: Dict[str, float] = {}  # path -> monotonic time the next refresh may start (inf while one runs)
+
+def _refresh_in_background(path: str, url: str):
+    """At most one refresh thread per path in this process, and none sooner than SCRIP_RETRY_SECONDS after the last."""
+    with _refresh_guard:
+        if time.monotonic() < _refresh_after.get(path, 0.0): return
+        _refresh_after[path] = float("inf")
+
+    def run():
+        try: _refresh_scrip_cache(path, url)
+        finally:
+            with _refresh_guard: _refresh_after[path] = time.monotonic() + SCRIP_RETRY_SECONDS
+
+    threading.Thread(target=run, name="scrip-refresh", daemon=True).start()
+
+def scrip_master_version(path: str = SCRIP_CACHE_PATH, ttl: int = SCRIP_CACHE_TTL, url: str = SCRIP_MASTER_URL) -> float:
+    """
+    mtime of the on-disk master (0.0 when missing). Cheap enough for every rerun;
+    when the file is older than ttl a background thread refreshes it and the next
+    call returns the new mtime. A failing download is retried at most every
+    SCRIP_RETRY_SECONDS, never by several threads at once.
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return 0.0
+    if time.time() - mtime > ttl:
+        _refresh_in_background(path, url)
+    return mtime
+
+@timed("scrip.load")
+def load_scrip_master(path: str = SCRIP_CACHE_PATH, url: str = SCRIP_MASTER_URL) -> pd.DataFrame:
+    """Read of the shared on-disk cache; downloads synchronously only on a cold disk."""
+    df = read_scrip_cache(path)
+    if df is not None: return df
+    df = fetch_scrip_master(url)
+    try:
+        write_scrip_cache(df, path)
+    except Exception:
+        pass  # no pyarrow / read-only disk: still serve from memory
+    return df
+
+
+# --------------------- Full-frame scans (reference path) ---------------------
+def pick_nearest_future_row(scrips: pd.DataFrame, index: str) -> Optional[pd.Series]:
+    if scrips is None or scrips.empty: return None
+    df = scrips.copy()
+    if "expiry" not in df.columns: return None
+    df["expiry"] = pd.to_datetime(df["expiry"], errors="coerce").dt.date
+    name_u = col_upper(df, "name")
+    instr_u = col_upper(df, "instrumenttype")
+    today = dt.date.today()
+    sub = df[(name_u==index.upper()) & (instr_u=="FUTIDX") & df["expiry"].notna() & (df["expiry"]>=today)].copy()
+    if sub.empty: return None
+    sub.sort_values(["expiry","token"], inplace=True, kind="mergesort")
+    return sub.iloc[0]
+
+def nearest_options_expiry(scrips: pd.DataFrame, index: str) -> Optional[dt.date]:
+    if scrips is None or scrips.empty: return None
+    df = scrips.copy()
+    if "expiry" not in df.columns: return None
+    df["expiry"] = pd.to_datetime(df["expiry"], errors="coerce").dt.date
+    name_u = col_upper(df, "name")
+    instr_u = col_upper(df, "instrumenttype")
+    today = dt.date.today()
+    sub = df[(name_u==index.upper()) & (instr_u=="OPTIDX") & df["expiry"].notna() & (df["expiry"]>=today)].copy()
+    if sub.empty: return None
+    sub.sort_values("expiry", inplace=True, kind="mergesort")
+    return sub.iloc[0]["expiry"]
+
+def pick_nearest_expiry_row_for_strike(scrips: pd.DataFrame, index: str, strike: int, kind: str) -> Optional[pd.Series]:
+    if scrips is None or scrips.empty: return None
+    df = scrips.copy()
+    if "expiry" not in df.columns: return None
+    df["expiry"] = pd.to_datetime(df["expiry"], errors="coerce").dt.date
+    name_u = col_upper(df, "name")
+    instr_u = col_upper(df, "instrumenttype")
+    opt_u  = col_upper(df, "optiontype")
+    strikes = pd.to_numeric(df["strike"], errors="coerce") if "strike" in df.columns else pd.Series([float("nan")]*len(df), index=df.index)
+    today = dt.date.today()
+    sub = df[
+        (name_u==index.upper()) & (instr_u=="OPTIDX") & (opt_u==kind.upper()) &
+        (strikes == float(strike)) & df["expiry"].notna() & (df["expiry"]>=today)
+    ].copy()
+    if sub.empty: return None
+    sub.sort_values(["expiry","token"], inplace=True, kind="mergesort")
+    return sub.iloc[0]
+
+
+# --------------------- Pre-built index (hot path) ---------------------
+class _Bucket:
+    """Rows of one key, ordered by (expiry, token) exactly like the scans above."""
+    __slots__ = ("expiries", "rows")
+
+    def __init__(self):
+        self.expiries: List[dt.date] = []
+        self.rows: List[int] = []
+
+    def first_from(self, today: dt.date) -> Optional[int]:
+        i = bisect_left(self.expiries, today)
+        return i if i < len(self.rows) else None
+
+
+class InstrumentIndex:
+    """
+    One-time normalized view of the scrip master.
+    - name / instrumenttype / optiontype uppercased once, expiry parsed once
+    - (name, instrumenttype)                      -> expiry-sorted rows
+    - (name, instrumenttype, optiontype, strike)  -> expiry-sorted rows
+    Lookups are a dict hit + bisect on the expiry list; no per-call frame copies.
+    Returned rows match the pick_* scans (expiry as dt.date, other columns untouched).
+    """
+
+    @timed("scrip.index_build")
+    def __init__(self, scrips: Optional[pd.DataFrame]):
+        self._by_kind: Dict[Tuple[str, str], _Bucket] = {}
+        self._by_contract: Dict[Tuple[str, str, str, float], _Bucket] = {}
+        if scrips is None or scrips.empty or "expiry" not in scrips.columns:
+            self.frame = pd.DataFrame()
+            return
+
+        df = scrips.assign(expiry=_parse_expiry(scrips["expiry"]).dt.date)
+        df = df[df["expiry"].notna()]
+        df = df.sort_values(["expiry","token"], kind="mergesort") if "token" in df.columns else df.sort_values("expiry", kind="mergesort")
+        self.frame = df.reset_index(drop=True)
+
+        names = col_upper(self.frame, "name").to_numpy()
+        instrs = col_upper(self.frame, "instrumenttype").to_numpy()
+        opts = col_upper(self.frame, "optiontype").to_numpy()
+        strikes = (pd.to_numeric(self.frame["strike"], errors="coerce") if "strike" in self.frame.columns
+                   else pd.Series([float("nan")]*len(self.frame))).to_numpy(dtype=float)
+        expiries = self.frame["expiry"].to_numpy()
+
+        for pos in range(len(self.frame)):
+            exp = expiries[pos]
+            b = self._by_kind.get((names[pos], instrs[pos]))
+            if b is None: b = self._by_kind[(names[pos], instrs[pos])] = _Bucket()
+            b.expiries.append(exp); b.rows.append(pos)
+            k = strikes[pos]
+            if k != k: continue  # NaN strike never matches a lookup
+            key = (names[pos], instrs[pos], opts[pos], float(k))
+            b = self._by_contract.get(key)
+            if b is None: b = self._by_contract[key] = _Bucket()
+            b.expiries.append(exp); b.rows.append(pos)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _first_row(self, bucket: Optional[_Bucket], today: Optional[dt.date]) -> Optional[pd.Series]:
+        if bucket is None: return None
+        i = bucket.first_from(today or dt.date.today())
+        return None if i is None else self.frame.iloc[bucket.rows[i]]
+
+    @timed("scrip.lookup")
+    def nearest_future(self, index: str, today: Optional[dt.date] = None) -> Optional[pd.Series]:
+        return self._first_row(self._by_kind.get((index.upper(), "FUTIDX")), today)
+
+    @timed("scrip.lookup")
+    def nearest_options_expiry(self, index: str, today: Optional[dt.date] = None) -> Optional[dt.date]:
+        b = self._by_kind.get((index.upper(), "OPTIDX"))
+        if b is None: return None
+        i = b.first_from(today or dt.date.today())
+        return None if i is None else b.expiries[i]
+
+    @timed("scrip.lookup")
+    def option_for_strike(self, index: str, strike: int, kind: str, today: Optional[dt.date] = None) -> Optional[pd.Series]:
+        key = (index.upper(), "OPTIDX", kind.upper(), float(strike))
+        return self._first_row(self._by_contract.get(key), today)
+
+    def options_for_expiry(self, index: str, expiry: Optional[dt.date]) -> pd.DataFrame:
+        """Every OPTIDX row of `index` expiring on `expiry` (the bucket slice; no scan)."""
+        b = self._by_kind.get((index.upper(), "OPTIDX"))
+        if b is None or expiry is None: return self.frame.iloc[0:0]
+        lo, hi = bisect_left(b.expiries, expiry), bisect_right(b.expiries, expiry)
+        return self.frame.iloc[b.rows[lo:hi]]
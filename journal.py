@@ -0,0 +1,101 @@
+# journal.py — durable append-only trade journal (SQLite, WAL)
+from __future__ import annotations
+
+import datetime as dt
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional
+
+import pandas as pd
+
+JOURNAL_PATH = os.getenv("TRADE_JOURNAL_PATH", "/tmp/trades.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts      TEXT NOT NULL,
+    day     TEXT NOT NULL,
+    user    TEXT NOT NULL DEFAULT '',
+    symbol  TEXT NOT NULL DEFAULT '',
+    idx     TEXT NOT NULL DEFAULT '',
+    event   TEXT NOT NULL DEFAULT '',
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_user_day    ON events(user, day);
+CREATE INDEX IF NOT EXISTS events_user_symbol ON events(user, symbol, day);
+"""
+
+
+class TradeJournal:
+    """
+    One row per event, never rewritten. WAL + synchronous=NORMAL means a commit is an
+    append to the log and fsync happens at checkpoints, so writes batch their fsyncs
+    while readers (the trade-log viewer) never block writers. An append also folds the
+    WAL back into the main file once `checkpoint_every` seconds have passed since the
+    last time, so the log stays short over months of history.
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH, checkpoint_every: float = 300.0):
+        self.path, self.checkpoint_every = path, checkpoint_every
+        self._checkpointed = time.monotonic()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    @staticmethod
+    def _row(entry: dict, user: str) -> tuple:
+        ts = str(entry.get("ts") or dt.datetime.now().isoformat(timespec="seconds"))
+        return (ts, ts[:10], user, str(entry.get("symbol", "")), str(entry.get("index", "")),
+                str(entry.get("event", "")), json.dumps(entry, default=str))
+
+    def append(self, entry: dict, user: str = ""):
+        self.append_many([entry], user)
+
+    def append_many(self, entries: Iterable[dict], user: str = ""):
+        rows = [self._row(e, user) for e in entries]
+        if not rows: return
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany("INSERT INTO events(ts, day, user, symbol, idx, event, payload) VALUES (?,?,?,?,?,?,?)", rows)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")  # all or nothing, and the next BEGIN still works
+                raise
+            if time.monotonic() - self._checkpointed >= self.checkpoint_every: self._checkpoint()
+
+    def query(self, user: str = "", symbol: Optional[str] = None,
+              day_from: Optional[dt.date] = None, day_to: Optional[dt.date] = None,
+              limit: int = 50) -> pd.DataFrame:
+        """Latest `limit` events (oldest first), filtered on the indexed columns."""
+        sql, args = "SELECT payload FROM events WHERE user = ?", [user]
+        if symbol: sql += " AND symbol = ?"; args.append(symbol)
+        if day_from: sql += " AND day >= ?"; args.append(day_from.isoformat())
+        if day_to: sql += " AND day <= ?"; args.append(day_to.isoformat())
+        sql += " ORDER BY id DESC LIMIT ?"; args.append(int(limit))
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return pd.DataFrame([json.loads(p) for (p,) in reversed(rows)])
+
+    def symbols(self, user: str = "") -> list:
+        with self._lock:
+            return [s for (s,) in self._db.execute(
+                "SELECT DISTINCT symbol FROM events WHERE user = ? ORDER BY symbol", (user,))]
+
+    def count(self, user: str = "") -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM events WHERE user = ?", (user,)).fetchone()[0]
+
+    def checkpoint(self):
+        """Fold the WAL back into the main file now (append_many also does it every `checkpoint_every` s)."""
+        with self._lock:
+            self._checkpoint()
+
+    def _checkpoint(self):
+        self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._checkpointed = time.monotonic()
@@ -0,0 +1,150 @@
+# mdcache.py — process-wide market data cache: TTL + LRU, request coalescing, pluggable backend
+from __future__ import annotations
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Tuple
+
+_MISS = object()
+
+
+class MemoryBackend:
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._d: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: Hashable):
+        with self._lock:
+            hit = self._d.get(key)
+            if hit is None: return _MISS
+            if hit[0] < time.monotonic():
+                del self._d[key]; return _MISS
+            self._d.move_to_end(key)
+            return hit[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        with self._lock:
+            self._d[key] = (time.monotonic() + ttl, value)
+            self._d.move_to_end(key)
+            while len(self._d) > self.max_entries:
+                self._d.popitem(last=False); self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._d)
+
+
+class RedisBackend:
+    """
+    Redis-compatible store (Redis, Valkey, KeyDB...) so several app processes share one
+    cache. Values are pickled; expiry and LRU are left to the server (set maxmemory-policy
+    allkeys-lru). Coalescing stays per process.
+    """
+
+    def __init__(self, url: str, prefix: str = "md:"):
+        import redis
+        self._r = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.evictions = 0
+
+    def _k(self, key: Hashable) -> str:
+        return self.prefix + repr(key)
+
+    def get(self, key: Hashable):
+        raw = self._r.get(self._k(key))
+        return _MISS if raw is None else pickle.loads(raw)
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        self._r.set(self._k(key), pickle.dumps(value), px=max(1, int(ttl * 1000)))
+
+    def __len__(self) -> int:
+        return int(self._r.dbsize())
+
+
+def backend_from_env():
+    url = os.getenv("MD_CACHE_URL", "").strip()
+    return RedisBackend(url) if url else MemoryBackend(int(os.getenv("MD_CACHE_MAX_ENTRIES", "4096") or 4096))
+
+
+class MarketDataCache:
+    """
+    get_or_fetch(key, ttl, fetch): serve a cached value, otherwise run `fetch` once no
+    matter how many threads ask for the same key at the same time (single-flight) —
+    the rest wait for that result. claim()/publish() expose the same protocol for
+    batched fetches where one request fills many keys (quotes).
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self._inflight: Dict[Hashable, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "fetches": 0, "errors": 0}
+
+    def count(self, k: str, n: int = 1):
+        with self._lock: self._stats[k] += n
+
+    def peek(self, key: Hashable):
+        v = self.backend.get(key)
+        return None if v is _MISS else v
+
+    # ---- batched protocol ----
+    def claim(self, keys: Iterable[Hashable]) -> Tuple[Dict[Hashable, Any], List[Hashable], List[Tuple[Hashable, threading.Event]]]:
+        """Split keys into (cached values, keys this caller must fetch, keys someone else is fetching)."""
+        cached, mine, theirs = {}, [], []
+        for key in keys:
+            v = self.backend.get(key)
+            if v is not _MISS:
+                cached[key] = v; continue
+            with self._lock:
+                ev = self._inflight.get(key)
+                if ev is None: self._inflight[key] = threading.Event(); mine.append(key)
+                else: theirs.append((key, ev))
+        self.count("hits", len(cached)); self.count("misses", len(mine)); self.count("coalesced", len(theirs))
+        return cached, mine, theirs
+
+    def publish(self, values: Dict[Hashable, Any], claimed: Iterable[Hashable], ttl: float):
+        """Store fetched values and wake waiters on every claimed key (fetched or not)."""
+        for k, v in values.items(): self.backend.set(k, v, ttl)
+        with self._lock:
+            evs = [self._inflight.pop(k, None) for k in claimed]
+        for ev in evs:
+            if ev is not None: ev.set()
+
+    def wait(self, theirs: List[Tuple[Hashable, threading.Event]], timeout: float = 15.0) -> Dict[Hashable, Any]:
+        out = {}
+        for key, ev in theirs:
+            ev.wait(timeout)
+            v = self.backend.get(key)
+            if v is not _MISS: out[key] = v
+        return out
+
+    # ---- single key ----
+    def get_or_fetch(self, key: Hashable, ttl: float, fetch: Callable[[], Any], timeout: float = 30.0):
+        cached, mine, theirs = self.claim([key])
+        if cached: return cached[key]
+        if theirs:
+            got = self.wait(theirs, timeout)
+            if key in got: return got[key]
+            return self.get_or_fetch(key, ttl, fetch, timeout)  # the other fetch failed; try ourselves
+        try:
+            self.count("fetches")
+            value = fetch()
+        except Exception:
+            self.count("errors")
+            self.publish({}, mine, ttl)
+            raise
+        self.publish({key: value}, mine, ttl)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock: s = dict(self._stats)
+        lookups = s["hits"] + s["misses"] + s["coalesced"]
+        return {**s, "hit_rate": round(s["hits"] / lookups, 3) if lookups else None,
+                "entries": len(self.backend), "evictions": getattr(self.backend, "evictions", 0),
+                "backend": type(self.backend).__name__}
@@ -0,0 +1,156 @@
+# metrics.py — in-process latency histograms / call + error counters, Prometheus text export
+from __future__ import annotations
+
+import bisect
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # seconds
+PREFIX = "optbot"
+
+
+class _Op:
+    __slots__ = ("counts", "total", "calls", "errors", "recent")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.total, self.calls, self.errors = 0.0, 0, 0
+        self.recent: deque = deque(maxlen=1024)  # raw samples for the panel's percentiles
+
+
+class Span:
+    """Handed out by timer(); fail() marks a call that returned an error instead of raising."""
+    __slots__ = ("failed",)
+
+    def __init__(self):
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+
+class Registry:
+    """
+    observe(op, seconds, error) is the only write path: one lock, one bisect.
+    Ops are free-form dotted names ("api.getCandleData", "scrip.load", ...).
+    """
+
+    def __init__(self):
+        self._ops: Dict[str, _Op] = {}
+        self._gauges: Dict[str, Callable[[], Optional[float]]] = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def observe(self, op: str, seconds: float, error: bool = False):
+        i = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            o = self._ops.get(op)
+            if o is None: o = self._ops[op] = _Op()
+            o.counts[i] += 1
+            o.total += seconds
+            o.calls += 1
+            o.errors += error
+            o.recent.append(seconds)
+
+    def gauge(self, name: str, fn: Callable[[], Optional[float]]):
+        """Sampled at export time (queue depths, hit rates, ...). Re-registering replaces."""
+        self._gauges[name] = fn
+
+    def reset(self):
+        with self._lock: self._ops.clear()
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            ops = {k: (o.calls, o.errors, o.total, sorted(o.recent)) for k, o in self._ops.items()}
+        rows = []
+        for op, (calls, errors, total, lat) in sorted(ops.items()):
+            pct = lambda p: round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1e3, 3) if lat else None
+            rows.append({"op": op, "calls": calls, "errors": errors,
+                         "error_rate": round(errors / calls, 4) if calls else 0.0,
+                         "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99),
+                         "max_ms": round(lat[-1] * 1e3, 3) if lat else None, "total_s": round(total, 3)})
+        return rows
+
+    def prometheus_text(self) -> str:
+        with self._lock:
+            ops = {k: (list(o.counts), o.total, o.calls, o.errors) for k, o in self._ops.items()}
+        name = f"{PREFIX}_op_duration_seconds"
+        out = [f"# HELP {name} Latency of instrumented operations.", f"# TYPE {name} histogram"]
+        for op, (counts, total, calls, _) in sorted(ops.items()):
+            cum = 0
+            for le, c in zip(BUCKETS, counts):
+                cum += c
+                out.append(f'{name}_bucket{{op="{op}",le="{le}"}} {cum}')
+            out.append(f'{name}_bucket{{op="{op}",le="+Inf"}} {calls}')
+            out.append(f'{name}_sum{{op="{op}"}} {total:.6f}')
+            out.append(f'{name}_count{{op="{op}"}} {calls}')
+        name = f"{PREFIX}_op_errors_total"
+        out += [f"# HELP {name} Instrumented operations that raised or reported failure.", f"# TYPE {name} counter"]
+        out += [f'{name}{{op="{op}"}} {v[3]}' for op, v in sorted(ops.items())]
+        for g, fn in sorted(self._gauges.items()):
+            try: v = fn()
+            except Exception: v = None
+            if v is None: continue
+            out += [f"# TYPE {PREFIX}_{g} gauge", f"{PREFIX}_{g} {float(v)}"]
+        out += [f"# TYPE {PREFIX}_process_start_time_seconds gauge", f"{PREFIX}_process_start_time_seconds {self.started}"]
+        return "\n".join(out) + "\n"
+
+
+REGISTRY = Registry()
+
+
+@contextmanager
+def timer(op: str, registry: Optional[Registry] = None):
+    span, t0 = Span(), time.perf_counter()
+    try:
+        yield span
+    except BaseException:
+        span.failed = True
+        raise
+    finally:
+        (registry or REGISTRY).observe(op, time.perf_counter() - t0, span.failed)
+
+def timed(op: str, registry: Optional[Registry] = None):
+    """Decorator form of timer(); exceptions count as errors and propagate."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # inlined timer(): this wraps hot lookups, a generator context manager costs more
+            t0, failed = time.perf_counter(), True
+            try:
+                out = fn(*args, **kwargs)
+                failed = False
+                return out
+            finally:
+                (registry or REGISTRY).observe(op, time.perf_counter() - t0, failed)
+        return wrapper
+    return deco
+
+
+# --------------------- /metrics endpoint ---------------------
+def serve(port: int, registry: Optional[Registry] = None, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Expose GET /metrics for a Prometheus scraper on a daemon thread."""
+    reg = registry or REGISTRY
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404); return
+            body = reg.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=srv.serve_forever, name="metrics-http", daemon=True).start()
+    return srv
@@ -0,0 +1,52 @@
+# orders.py — order placement + position records shared by the UI and the headless engine
+from __future__ import annotations
+
+import datetime as dt
+from typing import Optional
+
+from metrics import timer
+from strategy import option_levels
+
+
+def place_live_order(smart, exchange: str, tradingsymbol: str, token: str, txn_type: str, qty: int, product="MIS", ordertype="MARKET"):
+    try:
+        orderparams = {
+            "variety": "NORMAL",
+            "tradingsymbol": tradingsymbol,
+            "symboltoken": str(token),
+            "transactiontype": txn_type,  # BUY / SELL
+            "exchange": exchange,         # NFO
+            "ordertype": ordertype,       # MARKET/LIMIT
+            "producttype": product,       # MIS/NRML/CNC
+            "duration": "DAY",
+            "quantity": int(qty),
+        }
+        with timer("api.placeOrder") as span:
+            r = smart.placeOrder(orderparams)
+            if not (r or {}).get("status"): span.fail()
+        return r
+    except Exception as e:
+        return {"status": False, "message": str(e)}
+
+def make_entry(index: str, side: str, exch: str, tsym: str, tok: str, qty: int,
+               entry_ltp: float, ctx: dict, status: str, greeks: Optional[dict] = None) -> dict:
+    """Position record for a buy of the chosen option (targets via strategy.option_levels)."""
+    target_price, stop_price = option_levels(entry_ltp, ctx, greeks)
+    return {
+        "ts": dt.datetime.now().isoformat(timespec="seconds"),
+        "index": index,
+        "signal": side,
+        "exchange": exch,
+        "symbol": tsym,
+        "token": tok,
+        "qty": int(qty),
+        "entry_ltp": round(entry_ltp,2),
+        "target_price": target_price,
+        "stop_price": stop_price,
+        "status": status,
+    }
+
+def make_exit(pos: dict, exit_ltp: float, reason: str, status: str = "") -> dict:
+    """EXIT event for an open position record (reason: TARGET / STOP / MANUAL)."""
+    return {**pos, "exit_ltp": round(exit_ltp,2), "event": "EXIT", "exit_reason": reason,
+            "exit_status": status or pos.get("status", ""), "ts": dt.datetime.now().isoformat(timespec="seconds")}
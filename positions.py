@@ -0,0 +1,287 @@
+# positions.py — open positions as NumPy columns; automatic target/stop exits on every price update
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import orders
+from metrics import timer
+
+Key = Tuple[str, str]  # (exchange, token)
+Trigger = Tuple[dict, float, str]  # (position, ltp, reason)
+
+
+class PositionBook:
+    """
+    Open positions as parallel NumPy columns (target, stop, active, price slot) plus a
+    price per (exchange, token) slot. update() writes the new prices into their slots
+    and then tests the whole book against target / stop in one vectorized pass;
+    rows that trigger are deactivated inside the same lock, so a position fires once
+    however many price sources race. Closed rows are compacted lazily.
+
+    A row whose exit failed goes back in with reopen(): open again (counted, priced,
+    closable), but flagged as exiting so prices don't re-trigger it; retries() claims
+    those rows for another attempt.
+    """
+
+    def __init__(self, capacity: int = 32):
+        self._lock = threading.Lock()
+        self._target = np.full(capacity, np.nan)
+        self._stop = np.full(capacity, np.nan)
+        self._active = np.zeros(capacity, dtype=bool)
+        self._exiting = np.zeros(capacity, dtype=bool)   # open, exit failed: awaiting a retry
+        self._kslot = np.zeros(capacity, dtype=np.intp)   # row -> price slot
+        self._price = np.full(capacity, np.nan)           # slot -> last price
+        self._slots: Dict[Key, int] = {}
+        self._pos: List[dict] = []
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return int(self._active[:len(self._pos)].sum())
+
+    @staticmethod
+    def _grown(a: np.ndarray, fill) -> np.ndarray:
+        b = np.full(len(a) * 2, fill, dtype=a.dtype); b[:len(a)] = a
+        return b
+
+    def _compact(self):
+        keep = np.flatnonzero(self._active[:len(self._pos)])
+        n = len(keep)
+        self._target[:n], self._stop[:n], self._kslot[:n] = self._target[keep], self._stop[keep], self._kslot[keep]
+        self._exiting[:n] = self._exiting[keep]; self._exiting[n:] = False
+        self._active[:] = False; self._active[:n] = True
+        self._pos = [self._pos[i] for i in keep]
+
+    def _slot(self, key: Key) -> int:
+        s = self._slots.get(key)
+        if s is None:
+            s = self._slots[key] = len(self._slots)
+            if s == len(self._price): self._price = self._grown(self._price, np.nan)
+        return s
+
+    def add(self, pos: dict) -> dict:
+        with self._lock:
+            return self._add(pos)[1]
+
+    def _add(self, pos: dict) -> Tuple[int, dict]:
+        if len(self._pos) > 32 and len(self) * 2 < len(self._pos): self._compact()
+        if len(self._pos) == len(self._target):
+            self._target, self._stop = self._grown(self._target, np.nan), self._grown(self._stop, np.nan)
+            self._active, self._kslot = self._grown(self._active, False), self._grown(self._kslot, 0)
+            self._exiting = self._grown(self._exiting, False)
+        i = len(self._pos)
+        pos = {**pos, "pos_id": pos.get("pos_id", self._next_id)}
+        self._next_id = max(self._next_id, int(pos["pos_id"])) + 1
+        self._pos.append(pos)
+        s = self._slot((pos["exchange"], str(pos["token"])))
+        self._target[i] = float(pos.get("target_price") or np.nan)
+        self._stop[i] = float(pos.get("stop_price") or np.nan)
+        self._kslot[i] = s
+        self._active[i], self._exiting[i] = True, False
+        if self._price[s] != self._price[s]: self._price[s] = float(pos.get("entry_ltp") or np.nan)
+        return i, pos
+
+    def reopen(self, pos: dict):
+        """Put a position whose exit failed back in the book, flagged for retries()."""
+        with self._lock:
+            n = len(self._pos)
+            i = next((j for j in range(n) if self._pos[j]["pos_id"] == pos["pos_id"]), None)
+            if i is None: i, _ = self._add(pos)  # compacted away meanwhile
+            self._active[i] = self._exiting[i] = True
+
+    def retries(self) -> List[Tuple[dict, float]]:
+        """Claim (deactivate) every position awaiting an exit retry: [(position, last price)]."""
+        with self._lock:
+            n = len(self._pos)
+            rows = np.flatnonzero(self._active[:n] & self._exiting[:n])
+            self._active[rows] = self._exiting[rows] = False
+            return [(self._pos[i], float(self._price[self._kslot[i]])) for i in rows]
+
+    def update(self, prices: Dict[Key, float], check: bool = True) -> List[Trigger]:
+        """Apply {(exchange, token): ltp}; returns (and closes) the positions that hit target/stop."""
+        with self._lock:
+            slots, vals = [], []
+            for k, v in prices.items():
+                s = self._slots.get(k)
+                if s is not None and v is not None: slots.append(s); vals.append(float(v))
+            if not slots: return []
+            self._price[slots] = vals
+            if not check: return []
+            n = len(self._pos)
+            touched = np.zeros(len(self._price), dtype=bool); touched[slots] = True
+            kslot = self._kslot[:n]
+            last = self._price[kslot]
+            tgt_hit = last >= self._target[:n]
+            hit = self._active[:n] & ~self._exiting[:n] & touched[kslot] & (tgt_hit | (last <= self._stop[:n]))
+            if not hit.any(): return []
+            fired = np.flatnonzero(hit)
+            self._active[fired] = False
+            return [(self._pos[i], float(last[i]), "TARGET" if tgt_hit[i] else "STOP") for i in fired]
+
+    def close(self, pos_ids=None) -> List[Tuple[dict, float]]:
+        """Deactivate the given positions (all when None): [(position, last price)]."""
+        with self._lock:
+            out = []
+            for i in np.flatnonzero(self._active[:len(self._pos)]):
+                p = self._pos[i]
+                if pos_ids is None or p["pos_id"] in pos_ids:
+                    self._active[i] = self._exiting[i] = False
+                    out.append((p, float(self._price[self._kslot[i]])))
+            return out
+
+    def keys(self) -> List[Tuple[str, str, str]]:
+        """(exchange, symbol, token) of every open position, for quote polling / subscriptions."""
+        with self._lock:
+            seen = {(self._pos[i]["exchange"], str(self._pos[i]["token"])): self._pos[i]["symbol"]
+                    for i in np.flatnonzero(self._active[:len(self._pos)])}
+        return [(e, s, t) for (e, t), s in seen.items()]
+
+    def snapshot(self) -> List[dict]:
+        """Open positions with ltp_now / mtm from the last applied price, and exit_pending after a failed exit."""
+        with self._lock:
+            out = []
+            for i in np.flatnonzero(self._active[:len(self._pos)]):
+                p, ltp = self._pos[i], float(self._price[self._kslot[i]])
+                out.append({**p, "ltp_now": round(ltp, 2), "mtm": round((ltp - p["entry_ltp"]) * p["qty"], 2),
+                            "exit_pending": bool(self._exiting[i])})
+            return out
+
+
+class PositionManager:
+    """
+    Watches a PositionBook and exits positions the moment a price crosses their
+    target or stop — no page rerun or button click involved.
+
+    Prices arrive pushed from a TickCache listener (live feed) and, for positions
+    without fresh ticks, from a QuoteCache poll every `poll` seconds. Exits run on a
+    small worker pool so the tick thread never waits on the broker: SELL for
+    LIVE-PLACED positions, then the EXIT event to journal / sheet / alerts.
+
+    A SELL the broker refuses leaves the position open in the book (it still is at
+    the broker) and is retried on every quote poll until it goes through; only then
+    is the EXIT recorded. `auto` (target/stop exits) is the caller's opt-in — off
+    unless asked for, since for live positions it means SELLs without a click.
+    """
+
+    def __init__(self, quotes, smart=None, tick_cache=None, poll: float = 1.0,
+                 journal=None, sheet=None, alerts=None, user: str = "", tick_age: float = 3.0,
+                 auto: bool = False):
+        self.book = PositionBook()
+        self.quotes, self.smart, self.ticks, self.poll, self.tick_age = quotes, smart, tick_cache, poll, tick_age
+        self.journal, self.sheet, self.alerts, self.user = journal, sheet, alerts, user
+        self.auto = auto
+        self._reasons: Dict[int, str] = {}  # pos_id -> reason of the exit awaiting a retry
+        self.exits: deque = deque(maxlen=50)
+        self.last_error = ""
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="exit")
+        self._pending: List[Future] = []
+        self._plock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if tick_cache is not None: tick_cache.add_listener(self.on_tick)
+
+    def bind(self, smart):
+        self.smart = smart
+
+    def start(self) -> "PositionManager":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="positions", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # ---- price sources ----
+    def on_tick(self, exch: str, token: str, price: float):
+        self.apply({(exch, token): price})
+
+    def apply(self, prices: Dict[Key, float]):
+        """Any caller that already holds fresh quotes (e.g. a UI rerun) can feed them in."""
+        self._fire(self.book.update(prices, check=self.auto))
+
+    def refresh(self) -> int:
+        """
+        Retry failed exits, then quote every open position lacking a fresh tick and apply
+        the prices. Returns tokens polled.
+        """
+        self._retry()
+        keys = self.book.keys()
+        if self.ticks is not None:  # ticking tokens were already checked by on_tick
+            keys = [k for k in keys if self.ticks.ltp(k[0], k[2], self.tick_age) is None]
+        if keys and self.smart is not None:
+            ltps, errors = self.quotes.get_many(self.smart, keys)
+            if errors: self.last_error = errors[-1]
+            self.apply(ltps)
+        return len(keys)
+
+    def _run(self):
+        while not self._stop.wait(self.poll):
+            if not len(self.book): continue
+            try: self.refresh()
+            except Exception as e: self.last_error = f"{type(e).__name__}: {e}"
+
+    # ---- exits ----
+    def _fire(self, triggers: List[Trigger]):
+        if not triggers: return
+        futs = [self._pool.submit(self._exit, pos, ltp, reason, time.perf_counter()) for pos, ltp, reason in triggers]
+        with self._plock:
+            self._pending = [f for f in self._pending if not f.done()] + futs
+
+    def _retry(self):
+        claimed = self.book.retries()
+        if not claimed: return
+        futs = [self._pool.submit(self._exit, pos, ltp, self._reasons.get(pos["pos_id"], "RETRY")) for pos, ltp in claimed]
+        with self._plock:
+            self._pending = [f for f in self._pending if not f.done()] + futs
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Wait for triggered exits still in flight (shutdown paths, simulations)."""
+        with self._plock: pending = list(self._pending)
+        return not wait(pending, timeout).not_done
+
+    def _exit(self, pos: dict, ltp: float, reason: str, t0: Optional[float] = None) -> Optional[dict]:
+        """SELL (live) and record the exit. None when the SELL failed: the position is back in the book for a retry."""
+        with timer("positions.exit") as span:
+            status = ""
+            if str(pos.get("status", "")).startswith("LIVE-PLACED") and self.smart is not None:
+                resp = orders.place_live_order(self.smart, pos["exchange"], pos["symbol"], str(pos["token"]), "SELL", pos["qty"])
+                if not (resp or {}).get("status"):
+                    span.fail(); self.last_error = f"SELL failed for {pos['symbol']}: {(resp or {}).get('message')}; retrying"
+                    self._reasons[pos["pos_id"]] = reason
+                    self.book.reopen(pos)
+                    return None
+                status = "LIVE-SOLD"
+            self._reasons.pop(pos["pos_id"], None)
+            rec = orders.make_exit(pos, ltp, reason, status)
+            if t0 is not None: rec["trigger_to_exit_ms"] = round((time.perf_counter() - t0) * 1e3, 2)
+            self.exits.append(rec)
+            if self.journal is not None: self.journal.append(rec, user=self.user)
+            if self.sheet is not None: self.sheet.log(rec)
+            if self.alerts is not None:
+                self.alerts.webhook({"type": "exit", **rec})
+                self.alerts.email(f"[EXIT-{reason}] {pos['index']} {pos['signal']} {pos['symbol']}", json.dumps(rec, indent=2))
+        return rec
+
+    # ---- callers ----
+    def enter(self, entry: dict) -> dict:
+        return self.book.add(entry)
+
+    def exit_all(self, prices: Optional[Dict[Key, float]] = None, reason: str = "MANUAL") -> List[dict]:
+        """
+        Close everything now, on the caller's thread (so alert digests apply). Returns the
+        exits recorded; positions whose SELL failed stay open and are retried by the poll.
+        """
+        if prices: self.book.update(prices, check=False)
+        done = [self._exit(pos, ltp, reason) for pos, ltp in self.book.close()]
+        return [r for r in done if r is not None]
+
+    def positions(self) -> List[dict]:
+        return self.book.snapshot()
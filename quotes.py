@@ -0,0 +1,92 @@
+# quotes.py — batched LTP fetching with a short-TTL (exchange, token) cache
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from mdcache import MarketDataCache
+from metrics import timer
+
+Instrument = Tuple[str, str, str]   # (exchange, tradingsymbol, token)
+QuoteKey = Tuple[str, str]          # (exchange, token)
+
+MAX_TOKENS_PER_CALL = 50  # getMarketData limit per request
+
+
+def _chunks(seq: list, n: int):
+    for i in range(0, len(seq), n): yield seq[i:i + n]
+
+
+class QuoteCache:
+    """
+    get_many() dedupes the requested instruments by (exchange, token), serves the ones
+    quoted within `ttl` seconds from the MarketDataCache and fetches the rest with
+    getMarketData("LTP") — one request per exchange per 50 tokens. Anything the batch
+    call misses falls back to ltpData() on a bounded thread pool. Tokens another caller
+    is already fetching are waited for, not requested again.
+    """
+
+    def __init__(self, ttl: float = 1.5, max_workers: int = 8, cache: Optional[MarketDataCache] = None):
+        self.ttl = ttl
+        self.cache = cache or MarketDataCache()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ltp")
+
+    @staticmethod
+    def _key(exch: str, token: str) -> tuple:
+        return ("ltp", exch, str(token))
+
+    def put(self, exch: str, token: str, ltp: float):
+        self.cache.backend.set(self._key(exch, token), float(ltp), self.ttl)
+
+    def peek(self, exch: str, token: str) -> Optional[float]:
+        return self.cache.peek(self._key(exch, token))
+
+    def _batch(self, smart, missing: Dict[QuoteKey, str], got: Dict[QuoteKey, float], errors: List[str]):
+        by_exch: Dict[str, List[str]] = {}
+        for exch, tok in missing: by_exch.setdefault(exch, []).append(tok)
+        for exch, toks in by_exch.items():
+            for part in _chunks(toks, MAX_TOKENS_PER_CALL):
+                try:
+                    self.cache.count("fetches")
+                    with timer("api.getMarketData"):
+                        r = smart.getMarketData("LTP", {exch: part})
+                    fetched = ((r or {}).get("data") or {}).get("fetched") or []
+                except Exception as e:
+                    errors.append(f"batch LTP failed for {exch} ({len(part)} tokens) → {e}")
+                    continue
+                for q in fetched:
+                    if q.get("ltp") is not None:
+                        got[(q.get("exchange") or exch, str(q.get("symbolToken")))] = float(q["ltp"])
+
+    def _single(self, smart, exch: str, tsym: str, token: str, got: Dict[QuoteKey, float], errors: List[str]):
+        try:
+            self.cache.count("fetches")
+            with timer("api.ltpData") as span:
+                r = smart.ltpData(exch, tsym, str(token))
+                if not (r and r.get("status")): span.fail()
+            if r and r.get("status") and r.get("data") and "ltp" in r["data"]:
+                got[(exch, str(token))] = float(r["data"]["ltp"])
+        except Exception as e:
+            errors.append(f"LTP failed for {tsym} ({exch}:{token}) → {e}")
+
+    def get_many(self, smart, instruments: Iterable[Instrument]) -> Tuple[Dict[QuoteKey, float], List[str]]:
+        """Returns ({(exchange, token): ltp}, error messages). Unquoted instruments are absent."""
+        wanted: Dict[QuoteKey, str] = {}
+        for exch, tsym, tok in instruments:
+            wanted.setdefault((exch, str(tok)), tsym)
+        errors: List[str] = []
+        cached, mine, theirs = self.cache.claim([self._key(*k) for k in wanted])
+        got: Dict[QuoteKey, float] = {(k[1], k[2]): v for k, v in cached.items()}
+        fresh: Dict[QuoteKey, float] = {}
+        missing = {(k[1], k[2]): wanted[(k[1], k[2])] for k in mine}
+        try:
+            if missing and smart is not None:
+                if hasattr(smart, "getMarketData"): self._batch(smart, missing, fresh, errors)
+                left = [(k, s) for k, s in missing.items() if k not in fresh]
+                futs = [self._pool.submit(self._single, smart, k[0], s, k[1], fresh, errors) for k, s in left]
+                for f in futs: f.result()
+        finally:
+            self.cache.publish({self._key(*k): v for k, v in fresh.items()}, mine, self.ttl)
+        got.update(fresh)
+        got.update({(k[1], k[2]): v for k, v in self.cache.wait(theirs).items()})
+        return {k: got[k] for k in wanted if k in got}, errors
@@ -0,0 +1,378 @@
+# replay.py — offline SmartConnect stand-in: recorded candles/ticks on a simulated clock
+#
+#   python replay.py NIFTY=nifty_5m.csv [BANKNIFTY=bn_5m.csv] --execute live --latency-ms 40 --error-rate 0.02
+#
+# FakeSmartConnect answers generateSession / getCandleData / ltpData / getMarketData /
+# placeOrder from recorded FUTIDX candles (and, optionally, ticks); option premiums are
+# Black-76 prices off the replayed future. run_pipeline() drives SignalEngine and its
+# PositionManager bar by bar (signal -> order -> position -> exit -> journal/alerts) and
+# reports throughput, latency and trades. With REPLAY_CANDLES set, app.py logs into
+# the same fake broker (clock running at REPLAY_SPEED x real time) for UI load tests.
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from broker import BrokerClient, RateLimiter
+from candles import load_candles
+from feed import IST, load_ticks
+from greeks import black76_price, year_fraction
+from instruments import InstrumentIndex, atm_step_for_index
+from timeframes import INTERVAL_MINUTES
+
+RATE_LIMITED = {"status": False, "message": "Access denied because of exceeding access rate", "errorcode": "AB1004"}
+TOKEN_EXPIRED = {"status": False, "message": "Invalid Token", "errorcode": "AG8001", "data": None}
+
+
+class SimClock:
+    """Naive IST wall clock. speed=None: moves only by set(); otherwise runs at speed x real time."""
+
+    def __init__(self, start: dt.datetime, speed: Optional[float] = None):
+        self.speed = speed
+        self._lock = threading.Lock()
+        self.set(start)
+
+    def set(self, t: dt.datetime):
+        with self._lock: self._t0, self._wall0 = t, time.monotonic()
+
+    def now(self) -> dt.datetime:
+        with self._lock: t0, w0 = self._t0, self._wall0
+        return t0 if not self.speed else t0 + dt.timedelta(seconds=(time.monotonic() - w0) * self.speed)
+
+
+def _naive_ist(times: pd.Series) -> pd.Series:
+    return times.dt.tz_convert(IST).dt.tz_localize(None) if times.dt.tz is not None else times
+
+
+class _Series:
+    """One recorded future: bar arrays on a naive-IST int64 axis (+ optional tick arrays)."""
+
+    def __init__(self, candles: pd.DataFrame, ticks: Optional[pd.DataFrame] = None):
+        t = _naive_ist(candles["time"])
+        self.t = t.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        self.o, self.h, self.l, self.c, self.v = (candles[k].to_numpy(dtype=float) for k in ("open", "high", "low", "close", "volume"))
+        self.bar_ns = int(np.median(np.diff(self.t))) if len(self.t) > 1 else 300 * 10**9
+        self.minutes = self.bar_ns // (60 * 10**9)
+        self.tick_t = self.tick_p = None
+        if ticks is not None and len(ticks):
+            self.tick_t = _naive_ist(ticks["time"]).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+            self.tick_p = ticks["price"].to_numpy(dtype=float)
+
+    def price(self, now_ns: int) -> float:
+        if self.tick_t is not None:
+            i = np.searchsorted(self.tick_t, now_ns, "right") - 1
+            if i >= 0: return float(self.tick_p[i])
+        i = np.searchsorted(self.t, now_ns, "right") - 1
+        if i < 0: return float(self.o[0])
+        frac = min(1.0, (now_ns - self.t[i]) / self.bar_ns)  # straight line open -> close inside the bar
+        return float(self.o[i] + (self.c[i] - self.o[i]) * frac)
+
+    def bars(self, from_ns: int, to_ns: int, now_ns: int) -> List[list]:
+        lo = np.searchsorted(self.t, from_ns, "left")
+        hi = np.searchsorted(self.t, min(to_ns, now_ns), "right")
+        rows = []
+        for i in range(lo, hi):
+            o, h, l, c, v = self.o[i], self.h[i], self.l[i], self.c[i], self.v[i]
+            if self.t[i] + self.bar_ns > now_ns:  # still forming: only what has traded so far
+                frac = (now_ns - self.t[i]) / self.bar_ns
+                c = self.price(now_ns); h, l, v = max(o, c), min(o, c), v * frac
+            ts = pd.Timestamp(self.t[i]).tz_localize(IST).isoformat()
+            rows.append([ts, float(o), float(h), float(l), float(c), float(v)])
+        return rows
+
+
+# --------------------- Synthetic scrip master for the replayed world ---------------------
+def replay_scrip_master(series: Dict[str, Tuple[str, pd.DataFrame]], strikes_each_side: int = 30) -> pd.DataFrame:
+    """
+    FUTIDX row per index (the recorded token, expiring after the data ends) plus weekly
+    OPTIDX CE/PE contracts for every Thursday in range, strikes spanning the traded range.
+    """
+    rows, tok = [], 500_000
+    for name, (fut_token, df) in series.items():
+        t = _naive_ist(df["time"])
+        first, last = t.iloc[0].date(), t.iloc[-1].date()
+        rows.append({"token": str(fut_token), "symbol": f"{name}FUT", "name": name, "expiry": last + dt.timedelta(days=30),
+                     "strike": -1.0, "lotsize": 25, "instrumenttype": "FUTIDX", "exch_seg": "NFO", "tick_size": 5.0,
+                     "tradingsymbol": f"{name}FUT", "optiontype": ""})
+        step = atm_step_for_index(name)
+        lo = int(df["low"].min() // step - strikes_each_side) * step
+        hi = int(df["high"].max() // step + strikes_each_side + 1) * step
+        exp = first + dt.timedelta(days=(3 - first.weekday()) % 7)
+        while exp <= last + dt.timedelta(days=7):
+            for k in range(lo, hi + step, step):
+                for kind in ("CE", "PE"):
+                    tok += 1
+                    sym = f"{name}{exp:%d%b%y}{k}{kind}".upper()
+                    rows.append({"token": str(tok), "symbol": sym, "name": name, "expiry": exp, "strike": float(k),
+                                 "lotsize": 25, "instrumenttype": "OPTIDX", "exch_seg": "NFO", "tick_size": 5.0,
+                                 "tradingsymbol": sym, "optiontype": kind})
+            exp += dt.timedelta(days=7)
+    df = pd.DataFrame(rows)
+    df["expiry"] = pd.to_datetime(df["expiry"]).dt.strftime("%d%b%Y").str.upper()
+    return df
+
+
+# --------------------- Fake broker ---------------------
+class FakeSmartConnect:
+    """
+    Same call surface as SmartApi.SmartConnect for what this app uses. Every call
+    sleeps an exponential `latency_ms` and fails with probability `error_rate`
+    (half raise ConnectionError, half return a rate-limit status=False). Failures are
+    drawn from a hash of (seed, endpoint, args, sim time, attempt), so a run is
+    reproducible whatever order threads make their calls in. With `jwt_ttl` the session
+    expires that many sim-seconds after login / generateToken, as the real JWT does.
+    """
+
+    def __init__(self, series: Dict[str, Tuple[str, pd.DataFrame]], clock: SimClock,
+                 ticks: Optional[pd.DataFrame] = None, iv: float = 0.15,
+                 latency_ms: float = 0.0, error_rate: float = 0.0, seed: int = 7, jwt_ttl: Optional[float] = None):
+        self.clock, self.iv, self.latency_ms, self.error_rate, self.seed = clock, iv, latency_ms, error_rate, seed
+        self.jwt_ttl, self.refresh_token = jwt_ttl, "replay-refresh"
+        self._session_at = clock.now()
+        self._futs: Dict[str, _Series] = {}
+        self._fut_of: Dict[str, str] = {}
+        for name, (tok, df) in series.items():
+            tk = ticks[ticks["token"].astype(str) == str(tok)] if ticks is not None else None
+            self._futs[str(tok)], self._fut_of[name] = _Series(df, tk), str(tok)
+        self.scrip_master = replay_scrip_master(series)
+        opts = self.scrip_master[self.scrip_master["instrumenttype"] == "OPTIDX"]
+        exp = pd.to_datetime(opts["expiry"], format="%d%b%Y").dt.date
+        self._opts = {t: (n, k, o == "CE", e) for t, n, k, o, e in
+                      zip(opts["token"], opts["name"], opts["strike"], opts["optiontype"], exp)}
+        self._instruments: Optional[InstrumentIndex] = None
+        self._lock = threading.Lock()
+        self._attempts: Counter = Counter()
+        self.calls: Counter = Counter()
+        self.injected: Counter = Counter()
+        self.orders: List[dict] = []
+
+    @property
+    def replay_clock(self) -> SimClock:
+        return self.clock
+
+    @property
+    def replay_instruments(self) -> InstrumentIndex:
+        if self._instruments is None: self._instruments = InstrumentIndex(self.scrip_master)
+        return self._instruments
+
+    # ---- chaos ----
+    def _chaos(self, endpoint: str, key) -> Optional[dict]:
+        now = self.clock.now()
+        with self._lock:
+            self.calls[endpoint] += 1
+            if len(self._attempts) > 200_000: self._attempts.clear()
+            self._attempts[(endpoint, key, now)] += 1
+            attempt = self._attempts[(endpoint, key, now)]
+        rng = random.Random(zlib.crc32(f"{self.seed}|{endpoint}|{key}|{now.isoformat()}|{attempt}".encode()))
+        if self.latency_ms: time.sleep(rng.expovariate(1.0 / self.latency_ms) / 1e3)
+        if self.error_rate and rng.random() < self.error_rate:
+            with self._lock: self.injected[endpoint] += 1
+            if rng.random() < 0.5: raise ConnectionError(f"injected {endpoint} failure")
+            return dict(RATE_LIMITED)
+        if self.jwt_ttl is not None and (now - self._session_at).total_seconds() > self.jwt_ttl:
+            with self._lock: self.injected["token_expired"] += 1
+            return dict(TOKEN_EXPIRED)
+        return None
+
+    def _new_session(self, client_code: str) -> dict:
+        self._session_at, self.refresh_token = self.clock.now(), "replay-refresh"
+        return {"status": True, "message": "SUCCESS", "data": {"jwtToken": "Bearer replay", "refreshToken": self.refresh_token,
+                                                                "feedToken": "replay", "clientcode": client_code}}
+
+    # ---- prices ----
+    def price(self, token: str, now: Optional[dt.datetime] = None) -> Optional[float]:
+        now = now or self.clock.now()
+        ns = pd.Timestamp(now).value
+        fut = self._futs.get(str(token))
+        if fut is not None: return round(fut.price(ns), 2)
+        meta = self._opts.get(str(token))
+        if meta is None: return None
+        name, strike, is_call, expiry = meta
+        F = self._futs[self._fut_of[name]].price(ns)
+        T = max(year_fraction(expiry, now), 1e-6)
+        px = float(black76_price(F, strike, T, self.iv, is_call))
+        return max(0.05, round(px / 0.05) * 0.05)
+
+    # ---- SmartConnect surface ----
+    def generateSession(self, client_code: str, password: str, totp: str) -> dict:
+        fail = self._chaos("generateSession", client_code)
+        if fail and fail.get("errorcode") != TOKEN_EXPIRED["errorcode"]: return fail  # logging in is how it un-expires
+        return self._new_session(client_code)
+
+    def generateToken(self, refresh_token: str) -> dict:
+        if refresh_token != self.refresh_token: return {"status": False, "message": "Invalid refresh token", "data": None}
+        with self._lock: self.calls["generateToken"] += 1
+        return self._new_session("REPLAY")
+
+    def getfeedToken(self) -> str:
+        return "replay"
+
+    def getProfile(self, refresh_token: str) -> dict:
+        return {"status": True, "data": {"name": "Replay", "clientcode": "REPLAY"}}
+
+    def getCandleData(self, params: dict) -> dict:
+        token = str(params.get("symboltoken"))
+        fail = self._chaos("getCandleData", token)
+        if fail: return fail
+        fut = self._futs.get(token)
+        if fut is None: return {"status": False, "message": "No data for token", "data": None}
+        if INTERVAL_MINUTES.get(params.get("interval"), -1) != fut.minutes:
+            return {"status": False, "message": f"only {fut.minutes}-minute bars recorded", "data": None}
+        ns = lambda s: pd.Timestamp(dt.datetime.strptime(s, "%Y-%m-%d %H:%M")).value
+        data = fut.bars(ns(params["fromdate"]), ns(params["todate"]), pd.Timestamp(self.clock.now()).value)
+        return {"status": True, "message": "SUCCESS", "data": data}
+
+    def ltpData(self, exchange: str, tradingsymbol: str, symboltoken: str) -> dict:
+        fail = self._chaos("ltpData", symboltoken)
+        if fail: return fail
+        px = self.price(symboltoken)
+        if px is None: return {"status": False, "message": "Invalid Token", "data": None}
+        return {"status": True, "data": {"exchange": exchange, "tradingsymbol": tradingsymbol,
+                                         "symboltoken": str(symboltoken), "ltp": px}}
+
+    def getMarketData(self, mode: str, exchange_tokens: dict) -> dict:
+        fail = self._chaos("getMarketData", json.dumps(exchange_tokens, sort_keys=True))
+        if fail: return fail
+        fetched, unfetched = [], []
+        now = self.clock.now()
+        for exch, tokens in exchange_tokens.items():
+            for tok in tokens:
+                px = self.price(tok, now)
+                (fetched if px is not None else unfetched).append({"exchange": exch, "symbolToken": str(tok), "ltp": px})
+        return {"status": True, "data": {"fetched": fetched, "unfetched": unfetched}}
+
+    def placeOrder(self, params: dict) -> dict:
+        fail = self._chaos("placeOrder", params.get("symboltoken"))
+        if fail: return fail
+        now = self.clock.now()
+        px = self.price(params.get("symboltoken"), now)
+        if px is None: return {"status": False, "message": "Invalid Token", "data": None}
+        with self._lock:
+            oid = f"R{len(self.orders) + 1:08d}"
+            self.orders.append({"orderid": oid, "time": now.isoformat(), "side": params.get("transactiontype"),
+                                "symbol": params.get("tradingsymbol"), "token": str(params.get("symboltoken")),
+                                "qty": int(params.get("quantity", 0)), "price": px})
+        return {"status": True, "message": "SUCCESS", "data": {"orderid": oid}}
+
+
+# --------------------- Construction ---------------------
+def fake_from_files(candle_files: Dict[str, str], clock: Optional[SimClock] = None, ticks_path: Optional[str] = None,
+                    **kwargs) -> FakeSmartConnect:
+    """{index: candles path} -> broker. Future tokens are taken from a `token` column when present."""
+    series = {}
+    for i, (name, path) in enumerate(candle_files.items()):
+        raw = pd.read_csv(path, nrows=1) if path.endswith(".csv") else None
+        tok = str(raw["token"].iloc[0]) if raw is not None and "token" in raw.columns else str(90_000 + i)
+        series[name.upper()] = (tok, load_candles(path))
+    if clock is None:
+        first = min(_naive_ist(df["time"]).iloc[0] for _, df in series.values()).to_pydatetime()
+        clock = SimClock(first + dt.timedelta(days=5))
+    return FakeSmartConnect(series, clock, load_ticks(ticks_path) if ticks_path else None, **kwargs)
+
+def from_env() -> FakeSmartConnect:
+    """REPLAY_CANDLES="NIFTY=a.csv;BANKNIFTY=b.csv" [REPLAY_SPEED, REPLAY_START, REPLAY_TICKS, REPLAY_LATENCY_MS, REPLAY_ERROR_RATE]."""
+    files = dict(p.split("=", 1) for p in os.environ["REPLAY_CANDLES"].replace(",", ";").split(";") if "=" in p)
+    smart = fake_from_files(files, ticks_path=os.getenv("REPLAY_TICKS") or None,
+                            latency_ms=float(os.getenv("REPLAY_LATENCY_MS", "0") or 0),
+                            error_rate=float(os.getenv("REPLAY_ERROR_RATE", "0") or 0))
+    start = os.getenv("REPLAY_START", "").strip()
+    smart.clock = SimClock(pd.Timestamp(start).to_pydatetime() if start else smart.clock.now(),
+                           float(os.getenv("REPLAY_SPEED", "60") or 60))
+    return smart
+
+
+# --------------------- Pipeline driver ---------------------
+def run_pipeline(smart: FakeSmartConnect, indices=("NIFTY",), start: Optional[dt.datetime] = None,
+                 end: Optional[dt.datetime] = None, execute: str = "paper", params: Optional[dict] = None,
+                 qty: int = 25, check_every: int = 60, workdir: Optional[str] = None,
+                 broker: Optional[BrokerClient] = None) -> dict:
+    """
+    Step the fake clock over every recorded bar close in [start, end]: SignalEngine.tick()
+    at the close, then the position manager's quote poll every `check_every` sim-seconds
+    until the next one. Everything runs as fast as the code allows; the returned report
+    has throughput, per-evaluation latency and the trades the journal recorded.
+    `broker` (a BrokerClient around `smart`) puts the throttling / retry layer in between.
+    Target/stop exits are on in every mode: the SELLs go to the fake broker.
+    """
+    from engine import SignalEngine  # the engine imports most of the app; keep `replay` light for app.py
+
+    workdir = workdir or tempfile.mkdtemp(prefix="replay-")
+    fut = smart._futs[smart._fut_of[indices[0].upper()]]
+    closes = pd.to_datetime(fut.t + fut.bar_ns)
+    start = pd.Timestamp(start or smart.clock.now()); end = pd.Timestamp(end or closes[-1])
+    closes = closes[(closes >= start) & (closes <= end)]
+    eng = SignalEngine(broker or smart, indices, params, execute=execute, qty=qty, user="replay", grace=0.0,
+                       state_path=os.path.join(workdir, "engine_state.json"), instruments=smart.replay_instruments,
+                       journal_path=os.path.join(workdir, "trades.sqlite"), quote_ttl=0.0, auto_exit=True)
+    lat: List[float] = []
+    errors = 0
+    t0 = time.perf_counter()
+    for close in closes:
+        smart.clock.set(close.to_pydatetime())
+        eng.tick(now=close.to_pydatetime())
+        for res in eng.state.values():
+            if "latency_ms" in res: lat.append(res["latency_ms"])
+            errors += "error" in res
+        if eng.positions is None: continue
+        for s in range(check_every, int(fut.bar_ns // 10**9), check_every):
+            if not len(eng.positions.book): break
+            smart.clock.set((close + pd.Timedelta(seconds=s)).to_pydatetime())
+            eng.positions.refresh()
+            eng.positions.flush()
+    wall = time.perf_counter() - t0
+    trades = eng.journal.query("replay", limit=1_000_000) if eng.journal else pd.DataFrame()
+    exits = trades[trades["event"] == "EXIT"] if "event" in trades.columns else trades
+    lat_a = np.asarray(lat) if lat else np.asarray([np.nan])
+    return {
+        "bars": len(closes), "indices": list(indices), "wall_s": round(wall, 3),
+        "bars_per_s": round(len(closes) * len(indices) / wall, 1) if wall else None,
+        "eval_ms_p50": round(float(np.nanpercentile(lat_a, 50)), 2), "eval_ms_p95": round(float(np.nanpercentile(lat_a, 95)), 2),
+        "eval_errors": errors, "entries": int((trades.get("event") == "ENTER").sum()) if len(trades) else 0,
+        "exits": exits["exit_reason"].value_counts().to_dict() if len(exits) else {},
+        "still_open": len(eng.positions.book) if eng.positions else 0,
+        "orders": len(smart.orders), "api_calls": dict(smart.calls), "injected_errors": dict(smart.injected),
+        "broker": broker.stats() if broker is not None else None,
+        "journal": eng.journal.path if eng.journal else None,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay recorded candles through the signal -> order -> exit pipeline.")
+    ap.add_argument("series", nargs="+", help="INDEX=candles.csv|.parquet|.arrow (optional `token` column)")
+    ap.add_argument("--ticks", help="recorded ticks (time, exchange, token, price[, volume])")
+    ap.add_argument("--start", help="first bar close to evaluate (default: 5 days into the data)")
+    ap.add_argument("--end")
+    ap.add_argument("--execute", choices=["off", "paper", "live"], default="paper")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--iv", type=float, default=0.15)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--jwt-ttl", type=float, help="sim-seconds until the session expires")
+    ap.add_argument("--broker", type=float, metavar="SCALE",
+                    help="go through BrokerClient, rate limits multiplied by SCALE (the clock runs ahead of real time)")
+    ap.add_argument("--qty", type=int, default=25)
+    a = ap.parse_args(argv)
+    files = dict(s.split("=", 1) for s in a.series)
+    smart = fake_from_files(files, ticks_path=a.ticks, latency_ms=a.latency_ms, error_rate=a.error_rate, iv=a.iv, seed=a.seed,
+                            jwt_ttl=a.jwt_ttl)
+    if a.start: smart.clock.set(pd.Timestamp(a.start).to_pydatetime())
+    report = run_pipeline(smart, [k.upper() for k in files], end=pd.Timestamp(a.end) if a.end else None,
+                          execute=a.execute, qty=a.qty,
+                          broker=BrokerClient(smart, RateLimiter(scale=a.broker), backoff=0.01) if a.broker else None)
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
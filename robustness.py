@@ -0,0 +1,176 @@
+# robustness.py — walk-forward validation + Monte Carlo resampling of trade sequences over stored candles
+#
+#   python robustness.py nifty_5m.parquet --train-days 60 --test-days 20
+#   python robustness.py banknifty_5m.csv --random 300 --sims 20000 --workers 8 --out banknifty_wf.csv
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest import backtest, signals_vectorized, summarize
+from candles import load_candles
+from sweep import param_grid, random_params, run_sweep
+
+MC_CHUNK = 1000  # sims per task; fixed so results don't depend on the worker count
+
+
+def _day_starts(times: pd.Series) -> np.ndarray:
+    """Offset of the first bar of every trading day."""
+    day = times.dt.normalize().to_numpy()
+    return np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+
+def walk_forward_splits(times: pd.Series, train_days: int, test_days: int,
+                        step_days: Optional[int] = None, anchored: bool = False) -> List[Tuple[int, int, int]]:
+    """
+    (train_start, test_start, test_end) bar offsets on whole trading days. Test windows
+    follow each other (step_days defaults to test_days); anchored=True grows the train
+    window from the first bar instead of rolling it.
+    """
+    starts = np.r_[_day_starts(times), len(times)]
+    n_days, step = len(starts) - 1, step_days or test_days
+    out = []
+    for d in range(train_days, n_days, step):
+        end = min(d + test_days, n_days)
+        out.append((0 if anchored else int(starts[d - train_days]), int(starts[d]), int(starts[end])))
+    return out
+
+
+# --------------------- Worker side ---------------------
+_CANDLES: Optional[pd.DataFrame] = None
+
+def _init_worker(candles: pd.DataFrame):
+    global _CANDLES
+    _CANDLES = candles.reset_index(drop=True)
+
+def _run_split(split: Tuple[int, int, int], combos: List[dict], qty: int, rank_by: str) -> Tuple[dict, pd.DataFrame]:
+    lo, mid, hi = split
+    # in-sample: the sweep's own search, inline (the pool is already one process per split)
+    ranked = run_sweep(_CANDLES.iloc[lo:mid], combos, workers=1, qty=qty, rank_by=rank_by)
+    best = ranked.iloc[0].to_dict()
+    params = {k: best[k] for k in combos[0]}
+    # out-of-sample: indicators run over the train bars too (as live, with history), entries only in test
+    frame = _CANDLES.iloc[lo:hi].reset_index(drop=True)
+    sig = signals_vectorized(frame, **params)
+    sig.loc[:mid - lo - 1, "side"] = None
+    trades, oos = backtest(frame, qty=qty, signals=sig)
+    t = _CANDLES["time"]
+    row = {"train_from": t.iat[lo], "test_from": t.iat[mid], "test_to": t.iat[hi - 1], **params,
+           "is_pnl_points": best["pnl_points"], "is_trades": best["trades"],
+           **{f"oos_{k}": v for k, v in oos.items()}}
+    return row, trades
+
+
+def walk_forward(candles: pd.DataFrame, combos: Optional[List[dict]] = None, train_days: int = 60,
+                 test_days: int = 20, step_days: Optional[int] = None, anchored: bool = False,
+                 workers: Optional[int] = None, qty: int = 1, rank_by: str = "pnl_points") -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Re-pick the best parameter set on every train window (sweep.run_sweep) and trade it,
+    unchanged, on the test window after it. Splits run across a process pool.
+    Returns (one row per split, every out-of-sample trade in time order).
+    """
+    combos = combos or param_grid()
+    splits = walk_forward_splits(candles["time"], train_days, test_days, step_days, anchored)
+    if not splits: raise ValueError(f"need more than {train_days} trading days of candles")
+    workers = min(workers or os.cpu_count() or 1, len(splits))
+    if workers == 1:
+        _init_worker(candles)
+        parts = [_run_split(s, combos, qty, rank_by) for s in splits]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(candles,)) as ex:
+            parts = list(ex.map(_run_split, splits, itertools.repeat(combos), itertools.repeat(qty), itertools.repeat(rank_by)))
+    rows = pd.DataFrame([r for r, _ in parts])
+    trades = [t for _, t in parts if len(t)]
+    return rows, (pd.concat(trades, ignore_index=True) if trades else parts[0][1])
+
+
+def walk_forward_summary(rows: pd.DataFrame, trades: pd.DataFrame) -> dict:
+    """Out-of-sample totals, plus efficiency: OOS points per test day / IS points per train day."""
+    oos = summarize(trades)
+    test_days = (rows["test_to"].dt.normalize() - rows["test_from"].dt.normalize()).dt.days.clip(lower=0) + 1
+    train_days = (rows["test_from"] - rows["train_from"]).dt.days.clip(lower=1)
+    is_rate = float((rows["is_pnl_points"] / train_days).mean())
+    oos_rate = float((rows["oos_pnl_points"] / test_days).mean())
+    return {"splits": len(rows), **oos, "profitable_splits": round(float((rows["oos_pnl_points"] > 0).mean()), 4),
+            "efficiency": round(oos_rate / is_rate, 4) if is_rate > 0 else 0.0}
+
+
+# --------------------- Monte Carlo ---------------------
+def _max_drawdowns(paths: np.ndarray) -> np.ndarray:
+    equity = np.cumsum(paths, axis=1)
+    peak = np.maximum.accumulate(np.c_[np.zeros(len(paths)), equity], axis=1)[:, 1:]
+    return (peak - equity).max(axis=1, initial=0.0)
+
+def _mc_chunk(pnl: np.ndarray, sims: int, seed: np.random.SeedSequence, method: str) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    if method == "shuffle": paths = rng.permuted(np.broadcast_to(pnl, (sims, len(pnl))), axis=1)
+    else: paths = pnl[rng.integers(0, len(pnl), (sims, len(pnl)))]
+    return paths.sum(axis=1), _max_drawdowns(paths)
+
+def monte_carlo(pnl, sims: int = 10_000, method: str = "bootstrap", seed: int = 0,
+                workers: Optional[int] = None) -> dict:
+    """
+    Resample a trade P&L sequence `sims` times: "bootstrap" draws trades with replacement
+    (other outcomes the same edge could have produced), "shuffle" reorders the same trades
+    (how deep the drawdown gets on a worse ordering; the total never changes). Chunks are
+    seeded from `seed` alone, so any worker count gives the same numbers.
+    """
+    pnl = np.asarray(pnl, dtype=float)
+    if len(pnl) == 0: return {"sims": 0, "trades": 0}
+    seeds = np.random.SeedSequence(seed).spawn(-(-sims // MC_CHUNK))
+    sizes = [min(MC_CHUNK, sims - i * MC_CHUNK) for i in range(len(seeds))]
+    workers = min(workers or os.cpu_count() or 1, len(seeds))
+    if workers == 1:
+        parts = [_mc_chunk(pnl, n, s, method) for n, s in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            parts = list(ex.map(_mc_chunk, itertools.repeat(pnl), sizes, seeds, itertools.repeat(method)))
+    total = np.concatenate([p[0] for p in parts])
+    dd = np.concatenate([p[1] for p in parts])
+    q = lambda a, p: round(float(np.percentile(a, p)), 2)
+    return {"sims": sims, "trades": len(pnl), "method": method,
+            "total": round(float(pnl.sum()), 2), "max_drawdown": round(float(_max_drawdowns(pnl[None])[0]), 2),
+            "total_p5": q(total, 5), "total_p50": q(total, 50), "total_p95": q(total, 95),
+            "p_loss": round(float((total < 0).mean()), 4),
+            "max_drawdown_p50": q(dd, 50), "max_drawdown_p95": q(dd, 95)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Walk-forward + Monte Carlo robustness of the buy-only signal rules")
+    ap.add_argument("candles", help="CSV / Parquet / Arrow file with time,open,high,low,close,volume")
+    ap.add_argument("--train-days", type=int, default=60)
+    ap.add_argument("--test-days", type=int, default=20)
+    ap.add_argument("--step-days", type=int, default=None)
+    ap.add_argument("--anchored", action="store_true", help="grow the train window from the first bar")
+    ap.add_argument("--random", type=int, default=0, help="search N random combos per split instead of the full grid")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--sims", type=int, default=10_000)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--qty", type=int, default=1)
+    ap.add_argument("--rank-by", default="pnl_points")
+    ap.add_argument("--out", default="walk_forward.csv")
+    args = ap.parse_args()
+
+    candles = load_candles(args.candles)
+    combos = random_params(args.random, seed=args.seed) if args.random else param_grid()
+    t0 = time.perf_counter()
+    rows, trades = walk_forward(candles, combos, args.train_days, args.test_days, args.step_days, args.anchored,
+                                workers=args.workers, qty=args.qty, rank_by=args.rank_by)
+    took = time.perf_counter() - t0
+    if args.out.endswith(".parquet"): rows.to_parquet(args.out, index=False)
+    else: rows.to_csv(args.out, index=False)
+    print(f"{len(rows)} splits x {len(combos):,} combos over {len(candles):,} bars in {took:.1f}s -> {args.out}")
+    print(rows.to_string(index=False))
+    print("walk-forward:", walk_forward_summary(rows, trades))
+    for method in ("bootstrap", "shuffle"):
+        print(f"monte carlo ({method}):", monte_carlo(trades["pnl_points"], args.sims, method, args.seed, args.workers))
+
+
+if __name__ == "__main__":
+    main()
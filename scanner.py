@@ -0,0 +1,90 @@
+# scanner.py — evaluate the signal for several indices (and strike offsets) concurrently
+from __future__ import annotations
+
+import datetime as dt
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from candles import CandleStore
+from instruments import InstrumentIndex, atm_step_for_index, strike_for_mode
+from metrics import timed
+from quotes import QuoteCache
+from strategy import generate_signal
+
+SUPPORTED_INDICES = ("NIFTY", "BANKNIFTY", "SENSEX")
+
+SignalFn = Callable[[str, pd.DataFrame], Tuple[Optional[str], dict]]
+CandlesFn = Callable[[str, dt.datetime, dt.datetime], pd.DataFrame]
+
+
+def _fetch_one(smart, instruments: InstrumentIndex, candles_fn: CandlesFn, index: str,
+               start: dt.datetime, now: dt.datetime) -> dict:
+    t0 = time.perf_counter()
+    fut = instruments.nearest_future(index, now.date())
+    if fut is None:
+        return {"index": index, "error": "No FUTIDX found"}
+    token = str(fut.get("token", ""))
+    try:
+        candles = candles_fn(token, start, now)
+    except Exception as e:
+        return {"index": index, "token": token, "error": f"Candles fetch failed: {e}"}
+    return {"index": index, "token": token, "candles": candles, "fetch_ms": round((time.perf_counter() - t0) * 1e3, 1)}
+
+
+@timed("scan.total")
+def scan(smart, instruments: InstrumentIndex, store: CandleStore, quotes: QuoteCache,
+         indices: Sequence[str] = SUPPORTED_INDICES, offsets: Iterable[int] = (0,),
+         signal_fn: Optional[SignalFn] = None, candles_fn: Optional[CandlesFn] = None,
+         now: Optional[dt.datetime] = None,
+         max_workers: Optional[int] = None, **params) -> pd.DataFrame:
+    """
+    One row per (index, strike offset): signal, reason, strike, CE/PE symbols and LTPs.
+    Candle fetches for all indices run in parallel threads; every option quote on the
+    board is then fetched in a single batched QuoteCache call. Total latency ~ the
+    slowest single candle fetch + one quote round-trip. board.attrs["scan_ms"] has it.
+    """
+    t0 = time.perf_counter()
+    now = now or dt.datetime.now()
+    start = (now - dt.timedelta(days=5)).replace(hour=9, minute=15, second=0, microsecond=0)
+    signal_fn = signal_fn or (lambda token, df: generate_signal(df, **params))
+    candles_fn = candles_fn or (lambda token, a, b: store.update(smart, token, a, b))
+    offsets = list(offsets)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(indices) or 1, thread_name_prefix="scan") as ex:
+        fetched = list(ex.map(lambda i: _fetch_one(smart, instruments, candles_fn, i, start, now), indices))
+
+    rows: List[dict] = []
+    legs: List[Tuple[str, str, str]] = []
+    for f in fetched:
+        if "error" in f or f["candles"].empty:
+            rows.append({"index": f["index"], "signal": None, "reason": f.get("error", "No candles")})
+            continue
+        candles = f["candles"]
+        side, ctx = signal_fn(f["token"], candles)
+        last_close = float(candles["close"].iloc[-1])
+        step = atm_step_for_index(f["index"])
+        for off in offsets:
+            strike = strike_for_mode(last_close, step) + off * step
+            row = {"index": f["index"], "offset": off, "strike": strike, "last_close": round(last_close, 2),
+                   "signal": side, "reason": "; ".join(ctx.get("reason", [])),
+                   "bar_time": str(candles["time"].iloc[-1]), "fetch_ms": f["fetch_ms"]}
+            for kind in ("CE", "PE"):
+                r = instruments.option_for_strike(f["index"], strike, kind, now.date())
+                if r is None: continue
+                leg = (r.get("exch_seg", "NFO"), r.get("tradingsymbol", ""), str(r.get("token", "")))
+                legs.append(leg)
+                row[f"{kind.lower()}_symbol"], row[f"_{kind.lower()}_key"] = leg[1], (leg[0], leg[2])
+            rows.append(row)
+
+    ltps, errors = quotes.get_many(smart, legs) if legs else ({}, [])
+    for row in rows:
+        for kind in ("ce", "pe"):
+            key = row.pop(f"_{kind}_key", None)
+            if key is not None: row[f"{kind}_ltp"] = ltps.get(key)
+    board = pd.DataFrame(rows)
+    board.attrs["scan_ms"] = round((time.perf_counter() - t0) * 1e3, 1)
+    board.attrs["errors"] = errors
+    return board
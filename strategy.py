@@ -0,0 +1,324 @@
+# strategy.py — indicators + buy-only signal rules (pandas reference + streaming engine)
+from __future__ import annotations
+
+import datetime as dt
+import threading
+from collections import deque
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from metrics import timed
+from timeframes import resample
+
+
+# --------------------- Strategy engine (buy-only) ---------------------
+def ema(series: pd.Series, length: int) -> pd.Series:
+    return series.ewm(span=length, adjust=False).mean()
+
+def vwap(df: pd.DataFrame) -> pd.Series:
+    # simple intraday VWAP proxy using hlc3 and volume
+    hlc3 = (df["high"] + df["low"] + df["close"]) / 3.0
+    cum_pv = (hlc3 * df["volume"]).cumsum()
+    cum_v  = df["volume"].cumsum().replace(0, pd.NA)
+    return cum_pv / cum_v
+
+def atr(df: pd.DataFrame, length: int = 14) -> pd.Series:
+    high, low, close = df["high"], df["low"], df["close"]
+    prev_close = close.shift(1)
+    tr = pd.concat([
+        (high - low).abs(),
+        (high - prev_close).abs(),
+        (low - prev_close).abs()
+    ], axis=1).max(axis=1)
+    return tr.rolling(length).mean()
+
+def _inside_session(time_last, session_start: str, session_end: str) -> bool:
+    if not isinstance(time_last, pd.Timestamp): return True
+    tm = time_last.time()
+    start_h, start_m = map(int, session_start.split(":"))
+    end_h, end_m = map(int, session_end.split(":"))
+    return (tm >= dt.time(start_h,start_m)) and (tm <= dt.time(end_h,end_m))
+
+def htf_trend(df: pd.DataFrame, ema_fast=5, ema_slow=13) -> int:
+    """+1 / -1 / 0: EMA fast vs slow at the last bar of a (higher-timeframe) frame."""
+    if df is None or df.empty: return 0
+    gap = ema(df["close"], ema_fast).iloc[-1] - ema(df["close"], ema_slow).iloc[-1]
+    return int(np.sign(gap)) if gap == gap else 0
+
+def confirm_with_htf(side: Optional[str], ctx: dict, trend: int) -> Tuple[Optional[str], dict]:
+    """Keep a CE only in a rising higher-timeframe trend and a PE only in a falling one."""
+    if side is None: return side, ctx
+    if trend == (1 if side == "CE" else -1):
+        ctx["reason"].append("Higher timeframe agrees")
+        return side, ctx
+    ctx["reason"].append("Higher timeframe disagrees")
+    ctx["entry_price"] = ctx["stop"] = ctx["target"] = None
+    return None, ctx
+
+@timed("signal.generate")
+def generate_signal(df: pd.DataFrame,
+                    ema_fast=5, ema_slow=13,
+                    breakout_lookback=10,
+                    atr_len=14,
+                    session_start="09:15", session_end="15:25",
+                    timeframe=None, confirm=None) -> Tuple[Optional[str], dict]:
+    """
+    Returns ('CE' or 'PE' or None, context)
+    - Trend filter: close > VWAP and EMA(5) > EMA(13)  => bullish
+                    close < VWAP and EMA(5) < EMA(13)  => bearish
+    - Breakout: bullish close > highest high of last N bars
+                bearish close < lowest low of last N bars
+    - ATR floor: recent ATR >= 0.6% of close to avoid dead markets
+    - Time filter: only inside session window
+    - timeframe ('15m', '60m', ...): evaluate on bars resampled from df (its last bucket may be open)
+    - confirm ('60m', '1d', ...): also require that timeframe's EMA trend to agree (htf_trend)
+    """
+    side, ctx = _signal_rules(resample(df, timeframe) if timeframe else df, ema_fast, ema_slow,
+                              breakout_lookback, atr_len, session_start, session_end)
+    if confirm: side, ctx = confirm_with_htf(side, ctx, htf_trend(resample(df, confirm), ema_fast, ema_slow))
+    return side, ctx
+
+def _signal_rules(df: pd.DataFrame, ema_fast, ema_slow, breakout_lookback, atr_len,
+                  session_start, session_end) -> Tuple[Optional[str], dict]:
+    ctx = {"reason": [], "entry_price": None, "stop": None, "target": None}
+
+    if df.empty or len(df) < max(ema_slow, breakout_lookback, atr_len) + 2:
+        ctx["reason"].append("Not enough candles")
+        return None, ctx
+
+    df = df.copy().reset_index(drop=True)
+    df["ema_fast"] = ema(df["close"], ema_fast)
+    df["ema_slow"] = ema(df["close"], ema_slow)
+    df["vwap"] = vwap(df)
+    df["atr"] = atr(df, atr_len)
+
+    last = df.iloc[-1]
+    if not _inside_session(last["time"], session_start, session_end):
+        ctx["reason"].append("Outside trading window")
+        return None, ctx
+
+    # momentum floor
+    if last["atr"] <= 0.006 * last["close"]:
+        ctx["reason"].append("ATR too small (sideways)")
+        return None, ctx
+
+    hh = df["high"].shift(1).rolling(breakout_lookback).max().iloc[-1]
+    ll = df["low"].shift(1).rolling(breakout_lookback).min().iloc[-1]
+
+    bullish = (last["close"] > last["vwap"]) and (last["ema_fast"] > last["ema_slow"]) and (last["close"] > hh)
+    bearish = (last["close"] < last["vwap"]) and (last["ema_fast"] < last["ema_slow"]) and (last["close"] < ll)
+
+    if bullish:
+        ctx["reason"].append("Trend up + breakout")
+        ctx["entry_price"] = float(last["close"])
+        ctx["stop"] = float(df["low"].tail(3).min())  # last swing area
+        ctx["target"] = float(last["close"] + 1.5 * last["atr"])
+        return "CE", ctx
+
+    if bearish:
+        ctx["reason"].append("Trend down + breakdown")
+        ctx["entry_price"] = float(last["close"])
+        ctx["stop"] = float(df["high"].tail(3).max())
+        ctx["target"] = float(last["close"] - 1.5 * last["atr"])
+        return "PE", ctx
+
+    ctx["reason"].append("No setup")
+    return None, ctx
+
+
+# --------------------- Spot -> option level mapping ---------------------
+def option_level_fracs(spot_entry, spot_target, spot_stop):
+    """
+    Option target uplift / stop distance as fractions of the option entry price.
+    Works elementwise on NumPy arrays (backtests) as well as on floats.
+    """
+    pct_up = spot_target/spot_entry - 1.0
+    pct_dn = 1.0 - spot_stop/spot_entry
+    return np.maximum(0.15, pct_up*1.5), np.maximum(0.05, np.minimum(0.35, pct_dn*1.2))  # conservative uplift
+
+def option_levels(entry_ltp: float, ctx: dict, greeks: Optional[dict] = None) -> Tuple[float, float]:
+    """
+    (target_price, stop_price) for an option bought at entry_ltp on the signal in ctx.
+    With the leg's chain Greeks the spot move is mapped by delta + ½·gamma·move²
+    instead of the fixed uplift fractions.
+    """
+    if greeks and ctx.get("entry_price") and ctx.get("target") and ctx.get("stop"):
+        delta, gamma = float(greeks["delta"]), float(greeks.get("gamma") or 0.0)
+        move = lambda spot: delta * (spot - ctx["entry_price"]) + 0.5 * gamma * (spot - ctx["entry_price"])**2
+        return round(entry_ltp + move(ctx["target"]), 2), round(max(0.05, entry_ltp + move(ctx["stop"])), 2)
+    if ctx.get("entry_price") and ctx.get("target") and ctx.get("stop"):
+        up, dn = option_level_fracs(ctx["entry_price"], ctx["target"], ctx["stop"])
+        return round(entry_ltp * (1.0 + float(up)), 2), round(entry_ltp - float(dn) * entry_ltp, 2)
+    return round(entry_ltp * 1.25, 2), round(entry_ltp * 0.90, 2)
+
+
+# --------------------- Streaming engine (O(1) per bar) ---------------------
+class _MonoWindow:
+    """Rolling max (or min) of the last n values via a monotonic deque."""
+    __slots__ = ("n", "sign", "q", "i")
+
+    def __init__(self, n: int, is_max: bool = True):
+        self.n, self.sign, self.q, self.i = n, (1.0 if is_max else -1.0), deque(), 0
+
+    def push(self, v: float):
+        sv = self.sign * v
+        while self.q and self.q[-1][1] <= sv: self.q.pop()
+        self.q.append((self.i, sv))
+        self.i += 1
+        if self.q[0][0] <= self.i - 1 - self.n: self.q.popleft()
+
+    def value(self) -> float:
+        # NaN until the window is full, like rolling(n).max()
+        return self.sign * self.q[0][1] if self.i >= self.n else float("nan")
+
+
+class IndicatorEngine:
+    """
+    Incremental twin of generate_signal: EMA fast/slow, cumulative VWAP, ATR and the
+    breakout highest-high / lowest-low, each updated in O(1) per bar.
+
+    VWAP is anchored at the first bar fed, exactly as vwap() is anchored at the first
+    row of its frame — not at the session open. An engine kept across days therefore
+    carries earlier sessions' volume, the same as generate_signal() on a multi-day frame;
+    sync() reseeds whenever the frame's first bar changes, so the anchor follows the frame.
+
+    push(bar) appends a bar; replace_last(bar) re-applies the still-forming bar.
+    sync(df) feeds whatever part of a candle frame it has not seen and reseeds when
+    the frame window moved, so signal() always equals generate_signal(df).
+    """
+
+    def __init__(self, ema_fast=5, ema_slow=13, breakout_lookback=10, atr_len=14):
+        self.params = (int(ema_fast), int(ema_slow), int(breakout_lookback), int(atr_len))
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        ema_fast, ema_slow, lookback, atr_len = self.params
+        self._af, self._as = 2.0 / (ema_fast + 1), 2.0 / (ema_slow + 1)
+        self.n = 0
+        self.first_time = self.last_time = None
+        self.last: Optional[dict] = None
+        self.ema_fast = self.ema_slow = float("nan")
+        self.cum_pv = self.cum_v = 0.0
+        self.prev_close = float("nan")
+        self.tr = deque(maxlen=atr_len)
+        self._tr_sum = self._tr_err = 0.0  # compensated running sum of self.tr (as pandas' rolling mean)
+        self.hh, self.ll = _MonoWindow(lookback, True), _MonoWindow(lookback, False)
+        self.recent = deque(maxlen=3)  # (high, low) for the swing stop
+        self._undo = None  # scalars from before the last bar, for replace_last
+
+    # ---- state ----
+    @staticmethod
+    def _ewm(prev: float, x: float, a: float) -> float:
+        # same arithmetic as pandas' adjust=False ewm kernel
+        if prev != prev: return x
+        return ((1.0 - a) * prev + a * x) / ((1.0 - a) + a)
+
+    @staticmethod
+    def _fields(bar) -> tuple:
+        return (bar["time"], float(bar["open"]), float(bar["high"]), float(bar["low"]),
+                float(bar["close"]), float(bar["volume"]))
+
+    def _add_tr(self, x: float):
+        y = x - self._tr_err
+        t = self._tr_sum + y
+        self._tr_err, self._tr_sum = (t - self._tr_sum) - y, t
+
+    def _true_range(self, h: float, l: float) -> float:
+        pc = self.prev_close
+        return abs(h - l) if pc != pc else max(abs(h - l), abs(h - pc), abs(l - pc))
+
+    def _apply(self, t, o, h, l, c, v):
+        self.ema_fast = self._ewm(self.ema_fast, c, self._af)
+        self.ema_slow = self._ewm(self.ema_slow, c, self._as)
+        self.cum_pv += ((h + l + c) / 3.0) * v
+        self.cum_v += v
+        self.prev_close = c
+        self.last_time = t
+        self.last = {"time": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+
+    def push(self, bar):
+        t, o, h, l, c, v = self._fields(bar)
+        # breakout window is over *previous* bars (shift(1)), so feed the old last bar first
+        if self.last is not None:
+            self.hh.push(self.last["high"]); self.ll.push(self.last["low"])
+        self._undo = (self.ema_fast, self.ema_slow, self.cum_pv, self.cum_v, self.prev_close)
+        tr = self._true_range(h, l)
+        if len(self.tr) == self.tr.maxlen: self._add_tr(-self.tr[0])
+        self.tr.append(tr); self._add_tr(tr)
+        self.recent.append((h, l))
+        if self.first_time is None: self.first_time = t
+        self.n += 1
+        self._apply(t, o, h, l, c, v)
+
+    def replace_last(self, bar):
+        """Re-apply the last bar with new values; the breakout windows don't hold it yet."""
+        if self._undo is None: raise ValueError("no bar to replace")
+        t, o, h, l, c, v = self._fields(bar)
+        self.ema_fast, self.ema_slow, self.cum_pv, self.cum_v, self.prev_close = self._undo
+        tr = self._true_range(h, l)
+        self._add_tr(tr - self.tr[-1]); self.tr[-1] = tr
+        self.recent[-1] = (h, l)
+        self._apply(t, o, h, l, c, v)
+
+    def sync(self, df: pd.DataFrame) -> "IndicatorEngine":
+        if df.empty:
+            self.reset(); return self
+        times = df["time"]
+        if self.first_time is None or times.iloc[0] != self.first_time or times.iloc[-1] < self.last_time:
+            self.reset(); start = 0
+        else:
+            start = int(times.searchsorted(self.last_time, side="left"))
+            if start >= len(df) or times.iloc[start] != self.last_time:
+                self.reset(); start = 0
+        cols = {c: df[c].to_numpy() for c in ("open", "high", "low", "close", "volume")}
+        for i in range(start, len(df)):
+            bar = {"time": times.iloc[i], **{c: cols[c][i] for c in cols}}
+            if self.last_time is not None and bar["time"] == self.last_time: self.replace_last(bar)
+            else: self.push(bar)
+        return self
+
+    # ---- readings ----
+    @property
+    def vwap(self) -> float:
+        # anchored at the first bar fed (frame-anchored, like vwap()), not at today's open
+        return self.cum_pv / self.cum_v if self.cum_v != 0 else float("nan")
+
+    @property
+    def atr(self) -> float:
+        return self._tr_sum / len(self.tr) if len(self.tr) == self.tr.maxlen else float("nan")
+
+    @timed("signal.engine")
+    def signal(self, session_start="09:15", session_end="15:25") -> Tuple[Optional[str], dict]:
+        ema_fast, ema_slow, lookback, atr_len = self.params
+        ctx = {"reason": [], "entry_price": None, "stop": None, "target": None}
+        if self.n == 0 or self.n < max(ema_slow, lookback, atr_len) + 2:
+            ctx["reason"].append("Not enough candles")
+            return None, ctx
+        last = self.last
+        if not _inside_session(last["time"], session_start, session_end):
+            ctx["reason"].append("Outside trading window")
+            return None, ctx
+        atr_v = self.atr
+        if atr_v <= 0.006 * last["close"]:
+            ctx["reason"].append("ATR too small (sideways)")
+            return None, ctx
+        close, vw = last["close"], self.vwap
+        bullish = (close > vw) and (self.ema_fast > self.ema_slow) and (close > self.hh.value())
+        bearish = (close < vw) and (self.ema_fast < self.ema_slow) and (close < self.ll.value())
+        if bullish:
+            ctx["reason"].append("Trend up + breakout")
+            ctx["entry_price"] = float(close)
+            ctx["stop"] = float(min(l for _, l in self.recent))
+            ctx["target"] = float(close + 1.5 * atr_v)
+            return "CE", ctx
+        if bearish:
+            ctx["reason"].append("Trend down + breakdown")
+            ctx["entry_price"] = float(close)
+            ctx["stop"] = float(max(h for h, _ in self.recent))
+            ctx["target"] = float(close - 1.5 * atr_v)
+            return "PE", ctx
+        ctx["reason"].append("No setup")
+        return None, ctx
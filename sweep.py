@@ -0,0 +1,117 @@
+# sweep.py — grid / random parameter search for the signal settings over stored candles
+#
+#   python sweep.py nifty_5m.parquet --out nifty_sweep.csv
+#   python sweep.py banknifty_5m.csv --random 5000 --workers 16 --rank-by option_ret_total
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from backtest import backtest
+from candles import load_candles
+
+# defaults span the "Signal Settings" number_input ranges in app.py
+DEFAULT_AXES: Dict[str, Sequence] = {
+    "ema_fast": [3, 5, 8, 10, 13],
+    "ema_slow": [13, 21, 34, 50],
+    "breakout_lookback": [5, 10, 15, 20, 30],
+    "atr_len": [7, 10, 14, 21],
+    "session_start": ["09:15", "09:30", "10:00"],
+    "session_end": ["14:30", "15:00", "15:25"],
+}
+
+
+def _valid(p: dict) -> bool:
+    return p["ema_fast"] < p["ema_slow"] and p["session_start"] < p["session_end"]
+
+def param_grid(axes: Optional[Dict[str, Sequence]] = None) -> List[dict]:
+    axes = axes or DEFAULT_AXES
+    keys = list(axes)
+    combos = [dict(zip(keys, vals)) for vals in itertools.product(*(axes[k] for k in keys))]
+    return [p for p in combos if _valid(p)]
+
+def random_params(n: int, axes: Optional[Dict[str, Sequence]] = None, seed: int = 0) -> List[dict]:
+    axes = axes or DEFAULT_AXES
+    rng = random.Random(seed)
+    seen, out = set(), []
+    space = 1
+    for v in axes.values(): space *= len(v)
+    for _ in range(n * 20):
+        if len(out) >= min(n, space): break
+        p = {k: rng.choice(list(v)) for k, v in axes.items()}
+        key = tuple(p.values())
+        if key in seen or not _valid(p): continue
+        seen.add(key); out.append(p)
+    # keep combos sharing indicator columns next to each other so chunks hit the cache
+    return sorted(out, key=lambda p: tuple(p.values()))
+
+
+# --------------------- Worker side ---------------------
+_CANDLES: Optional[pd.DataFrame] = None
+_CACHE: dict = {}
+
+def _init_worker(candles: pd.DataFrame):
+    global _CANDLES, _CACHE
+    _CANDLES, _CACHE = candles.reset_index(drop=True), {}
+
+def _run_chunk(chunk: List[dict], qty: int) -> List[dict]:
+    rows = []
+    for p in chunk:
+        _, summary = backtest(_CANDLES, qty=qty, cache=_CACHE, **p)
+        rows.append({**p, **summary})
+    return rows
+
+
+def run_sweep(candles: pd.DataFrame, combos: List[dict], workers: Optional[int] = None,
+              qty: int = 1, rank_by: str = "pnl_points", chunk_size: int = 64) -> pd.DataFrame:
+    """
+    Backtest every parameter set across a process pool (one candle copy per worker,
+    indicator columns cached per worker) and return the results ranked by `rank_by`.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = [combos[i:i + chunk_size] for i in range(0, len(combos), chunk_size)]
+    rows: List[dict] = []
+    if workers == 1:
+        _init_worker(candles)
+        for c in chunks: rows.extend(_run_chunk(c, qty))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(candles,)) as ex:
+            for part in ex.map(_run_chunk, chunks, itertools.repeat(qty)):
+                rows.extend(part)
+    res = pd.DataFrame(rows)
+    if res.empty: return res
+    return res.sort_values([rank_by, "max_drawdown_points"], ascending=[False, True], kind="mergesort").reset_index(drop=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parameter sweep for the buy-only signal rules")
+    ap.add_argument("candles", help="CSV / Parquet / Arrow file with time,open,high,low,close,volume")
+    ap.add_argument("--random", type=int, default=0, help="sample N random combos instead of the full grid")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--qty", type=int, default=1)
+    ap.add_argument("--rank-by", default="pnl_points")
+    ap.add_argument("--out", default="sweep_results.csv")
+    ap.add_argument("--top", type=int, default=20)
+    args = ap.parse_args()
+
+    candles = load_candles(args.candles)
+    combos = random_params(args.random, seed=args.seed) if args.random else param_grid()
+    t0 = time.perf_counter()
+    res = run_sweep(candles, combos, workers=args.workers, qty=args.qty, rank_by=args.rank_by)
+    took = time.perf_counter() - t0
+    if args.out.endswith(".parquet"): res.to_parquet(args.out, index=False)
+    else: res.to_csv(args.out, index=False)
+    print(f"{len(combos):,} combos x {len(candles):,} bars in {took:.1f}s -> {args.out}")
+    print(res.head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
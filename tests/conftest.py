@@ -0,0 +1,25 @@
+# tests/conftest.py — shared candle fixtures
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_candles(bars: int, seed: int, vol: float = 0.006) -> pd.DataFrame:
+    """5m bars, 09:15-15:25 IST (75 a day), random walk with regime drift so both CE and PE setups fire."""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range("2024-01-01", periods=bars // 75 + 2, tz="Asia/Kolkata")
+    times = pd.DatetimeIndex([d + pd.Timedelta(minutes=9 * 60 + 15 + 5 * i) for d in days for i in range(75)][:bars])
+    drift = np.repeat(rng.choice([-1.0, 1.0], bars // 50 + 1), 50)[:bars] * vol * 0.4
+    close = 22000 * np.exp(np.cumsum(drift + rng.normal(0, vol, bars)))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, vol, bars)) * close
+    return pd.DataFrame({"time": times, "open": open_, "high": np.maximum(open_, close) + spread,
+                         "low": np.minimum(open_, close) - spread, "close": close,
+                         "volume": rng.integers(1_000, 50_000, bars).astype(float)})
+
+
+@pytest.fixture(scope="session")
+def candles() -> pd.DataFrame:
+    return make_candles(600, seed=7)
@@ -0,0 +1,23 @@
+# tests/test_backtest.py — backtest VWAP is anchored where the live candle window starts
+from __future__ import annotations
+
+import numpy as np
+
+from backtest import live_window_starts, signals_vectorized, vwap_windowed
+from strategy import vwap
+
+
+def test_vwap_matches_live_window(candles):
+    lo = live_window_starts(candles["time"], 5)
+    got = vwap_windowed(candles, 5)
+    for i in range(0, len(candles), 23):
+        day = candles["time"].iat[i].normalize()
+        assert candles["time"].iat[lo[i]] >= day - np.timedelta64(5, "D")
+        assert abs(got[i] - float(vwap(candles.iloc[lo[i]:i + 1]).iat[-1])) <= 1e-9 * got[i]
+    assert lo[-1] > 0  # 600 bars = 8 sessions: the window has moved off the first bar
+
+
+def test_window_longer_than_the_frame_is_frame_anchored(candles):
+    assert np.allclose(vwap_windowed(candles, 10_000), vwap(candles).astype(float).to_numpy())
+    wide, frame = signals_vectorized(candles, vwap_days=10_000), signals_vectorized(candles, vwap_days=None)
+    assert (wide["side"].fillna("") == frame["side"].fillna("")).all()
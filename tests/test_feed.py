@@ -0,0 +1,26 @@
+# tests/test_feed.py — tick bars use the same session-anchored buckets as timeframes.resample
+from __future__ import annotations
+
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feed import IST, BarBuilder
+from timeframes import resample
+
+
+@pytest.mark.parametrize("minutes", [5, 15, 30, 60])
+def test_tick_bars_match_resample(minutes):
+    b, rng, rows = BarBuilder(minutes), np.random.default_rng(1), []
+    t0 = dt.datetime(2024, 1, 2, 9, 15, tzinfo=IST)
+    for k in range(0, 375 * 60, 7):
+        ts, p = t0 + dt.timedelta(seconds=k), 100 + float(rng.normal())
+        b.on_tick(ts, p); rows.append((ts, p))
+    ticks = pd.DataFrame(rows, columns=["time", "close"])
+    ticks = ticks.assign(time=pd.to_datetime(ticks["time"]), open=ticks["close"], high=ticks["close"],
+                         low=ticks["close"], volume=0.0)[["time", "open", "high", "low", "close", "volume"]]
+    got, want = b.frame(), resample(ticks, f"{minutes}m")
+    assert list(got["time"].dt.strftime("%H:%M")) == list(want["time"].dt.strftime("%H:%M"))
+    assert np.allclose(got[["open", "high", "low", "close"]].to_numpy(float), want[["open", "high", "low", "close"]].to_numpy(float))
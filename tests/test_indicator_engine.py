@@ -0,0 +1,74 @@
+# tests/test_indicator_engine.py — IndicatorEngine == generate_signal / pandas indicators, bar by bar
+from __future__ import annotations
+
+import math
+
+import pytest
+
+from conftest import make_candles
+from strategy import IndicatorEngine, atr, ema, generate_signal, vwap
+
+PARAMS = [(5, 13, 10, 14), (3, 21, 5, 7), (8, 21, 20, 30)]
+
+
+def _close(a, b, rel=1e-9) -> bool:
+    if a is None or b is None: return a is b
+    if isinstance(a, float) and math.isnan(a): return isinstance(b, float) and math.isnan(b)
+    return a == b or math.isclose(a, b, rel_tol=rel)
+
+
+@pytest.mark.parametrize("params", PARAMS)
+def test_signal_matches_every_bar(candles, params):
+    eng, sides = IndicatorEngine(*params), []
+    for i in range(len(candles)):
+        eng.push(candles.iloc[i])
+        want, got = generate_signal(candles.iloc[:i + 1], *params), eng.signal()
+        assert want[0] == got[0], f"side @ {i}"
+        assert want[1]["reason"] == got[1]["reason"], f"reason @ {i}"
+        for k in ("entry_price", "stop", "target"):
+            assert _close(want[1][k], got[1][k]), f"{k} @ {i}"
+        sides.append(got[0])
+    # the fixture has to exercise both setups, or the comparison proves little
+    assert sides.count("CE") > 10 and sides.count("PE") > 10
+
+
+@pytest.mark.parametrize("params", PARAMS)
+def test_replace_last_matches_fresh_push(candles, params):
+    eng, ref = IndicatorEngine(*params), IndicatorEngine(*params)
+    for i in range(len(candles)):
+        row = candles.iloc[i]
+        # a forming bar revised twice before it closes
+        eng.push({**row.to_dict(), "close": row["close"] * 1.01, "high": row["high"] * 1.02})
+        eng.replace_last({**row.to_dict(), "low": row["low"] * 0.97})
+        eng.replace_last(row)
+        ref.push(row)
+        assert eng.signal() == ref.signal(), f"@ {i}"
+        assert _close(eng.atr, ref.atr) and _close(eng.vwap, ref.vwap) and eng.ema_fast == ref.ema_fast
+
+
+def test_indicators_match_pandas_on_long_series():
+    df = make_candles(20_000, seed=3)
+    eng = IndicatorEngine(5, 13, 10, 14)
+    ref_atr = atr(df, 14).to_numpy()
+    ref_vwap = vwap(df).astype(float).to_numpy()
+    ref_ema = ema(df["close"], 13).to_numpy()
+    for i in range(len(df)):
+        eng.push(df.iloc[i])
+        if i % 997 == 0 or i == len(df) - 1:
+            assert _close(eng.atr, float(ref_atr[i])), f"atr drifted @ {i}"
+            assert _close(eng.vwap, float(ref_vwap[i])) and eng.ema_slow == ref_ema[i]
+
+
+def test_sync_follows_the_frame(candles):
+    eng = IndicatorEngine().sync(candles.iloc[:300]).sync(candles)
+    assert eng.signal() == generate_signal(candles)
+    # window moved: VWAP re-anchors at the new first bar, as vwap() does on that frame
+    moved = candles.iloc[75:]
+    assert eng.sync(moved).signal() == generate_signal(moved)
+    assert _close(eng.vwap, float(vwap(moved).astype(float).iloc[-1]))
+    assert eng.n == len(moved)
+
+
+def test_replace_without_bar_raises():
+    with pytest.raises(ValueError):
+        IndicatorEngine().replace_last({"time": 0, "open": 1, "high": 1, "low": 1, "close": 1, "volume": 1})
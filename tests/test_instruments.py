@@ -0,0 +1,36 @@
+# tests/test_instruments.py — a stale scrip master is refreshed by one thread at a time, with a retry interval
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+import instruments
+
+
+def test_failing_refresh_is_not_retried_on_every_rerun(tmp_path, monkeypatch):
+    path = str(tmp_path / "scrip.arrow")
+    open(path, "wb").close()
+    os.utime(path, (time.time() - 7200, time.time() - 7200))
+    calls, release = [], threading.Event()
+
+    def fetch(url):
+        calls.append(url); release.wait(5)
+        raise ConnectionError("down")
+
+    monkeypatch.setattr(instruments, "fetch_scrip_master", fetch)
+    monkeypatch.setattr(instruments, "SCRIP_RETRY_SECONDS", 60.0)
+    for _ in range(20): instruments.scrip_master_version(path, ttl=3600)  # reruns while the download hangs
+    release.set()
+    for _ in range(100):
+        if instruments._refresh_after.get(path) != float("inf"): break
+        time.sleep(0.01)
+    for _ in range(20): instruments.scrip_master_version(path, ttl=3600)  # failed: inside the retry interval
+    assert len(calls) == 1 and not os.path.exists(path + ".lock")
+
+    instruments._refresh_after[path] = 0.0  # interval over
+    instruments.scrip_master_version(path, ttl=3600)
+    for _ in range(100):
+        if len(calls) == 2: break
+        time.sleep(0.01)
+    assert len(calls) == 2
@@ -0,0 +1,34 @@
+# tests/test_journal.py — a failed batch rolls back cleanly; the WAL is checkpointed on schedule
+from __future__ import annotations
+
+import os
+import sqlite3
+
+import pytest
+
+from journal import TradeJournal
+
+
+def _entry(symbol: str) -> dict:
+    return {"ts": "2024-01-02T09:20:00", "symbol": symbol, "index": "NIFTY", "event": "ENTER"}
+
+
+def test_failed_batch_rolls_back(tmp_path):
+    j = TradeJournal(str(tmp_path / "t.sqlite"))
+    j._db.execute("CREATE TRIGGER reject BEFORE INSERT ON events WHEN NEW.symbol = 'BAD' "
+                  "BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+    with pytest.raises(sqlite3.IntegrityError):
+        j.append_many([_entry("OK1"), _entry("BAD")])
+    assert j.count() == 0
+    j.append_many([_entry("OK2"), _entry("OK3")])  # journal still usable: no transaction left open
+    assert j.symbols() == ["OK2", "OK3"]
+
+
+def test_append_checkpoints_the_wal(tmp_path):
+    path = str(tmp_path / "t.sqlite")
+    j = TradeJournal(path, checkpoint_every=3600)
+    j.append(_entry("A"))
+    assert os.path.getsize(path + "-wal") > 0
+    j.checkpoint_every = 0
+    j.append(_entry("B"))
+    assert os.path.getsize(path + "-wal") == 0 and j.count() == 2
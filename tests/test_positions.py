@@ -0,0 +1,71 @@
+# tests/test_positions.py — failed live SELLs stay open and are retried; auto-exit is opt-in
+from __future__ import annotations
+
+from positions import PositionBook, PositionManager
+
+
+class _Quotes:
+    def get_many(self, smart, instruments):
+        return {}, []
+
+
+class _Broker:
+    """placeOrder fails the first `fail` SELLs, then fills."""
+
+    def __init__(self, fail: int):
+        self.fail, self.sells = fail, 0
+
+    def placeOrder(self, params):
+        if params["transactiontype"] != "SELL": return {"status": True}
+        self.sells += 1
+        if self.sells <= self.fail: return {"status": False, "message": "RMS reject"}
+        return {"status": True, "data": {"orderid": str(self.sells)}}
+
+
+def _pos(status: str = "LIVE-PLACED", token: str = "101") -> dict:
+    return {"index": "NIFTY", "signal": "CE", "exchange": "NFO", "symbol": f"OPT{token}", "token": token, "qty": 25,
+            "entry_ltp": 100.0, "target_price": 125.0, "stop_price": 90.0, "status": status}
+
+
+def test_auto_exit_is_opt_in():
+    pm = PositionManager(_Quotes())
+    pm.enter(_pos("PAPER"))
+    pm.apply({("NFO", "101"): 130.0})
+    assert pm.flush() and not pm.exits and len(pm.book) == 1
+
+
+def test_failed_sell_stays_open_and_is_retried():
+    broker = _Broker(fail=2)
+    pm = PositionManager(_Quotes(), broker, auto=True)
+    pm.enter(_pos())
+    pm.apply({("NFO", "101"): 130.0})
+    assert pm.flush()
+    assert len(pm.book) == 1 and not pm.exits and pm.positions()[0]["exit_pending"]
+    pm.apply({("NFO", "101"): 131.0})  # a pending exit doesn't trigger again: the poll retries it
+    assert pm.flush() and broker.sells == 1
+    pm.refresh(); pm.flush()
+    assert len(pm.book) == 1 and broker.sells == 2
+    pm.refresh(); pm.flush()
+    assert len(pm.book) == 0 and broker.sells == 3
+    (rec,) = pm.exits
+    assert rec["exit_status"] == "LIVE-SOLD" and rec["exit_reason"] == "TARGET"
+
+
+def test_exit_all_keeps_failed_sells():
+    pm = PositionManager(_Quotes(), _Broker(fail=1))
+    for tok in ("101", "102"): pm.enter(_pos(token=tok))
+    done = pm.exit_all()
+    assert len(done) == 1 and len(pm.book) == 1
+    pm.refresh(); pm.flush()
+    assert len(pm.book) == 0 and [r["exit_reason"] for r in pm.exits] == ["MANUAL", "MANUAL"]
+
+
+def test_reopen_after_compaction():
+    book = PositionBook()
+    rows = [book.add(_pos("PAPER", str(i))) for i in range(40)]
+    claimed = book.close([r["pos_id"] for r in rows[:30]])
+    book.add(_pos("PAPER", "999"))  # compacts the 30 closed rows away
+    book.reopen(claimed[0][0])
+    assert len(book) == 12
+    (pos, _), = book.retries()
+    assert pos["pos_id"] == rows[0]["pos_id"] and len(book) == 11
@@ -0,0 +1,29 @@
+# tests/test_regress.py — perf regressions are judged calibration-normalized, whatever host the baseline is from
+from __future__ import annotations
+
+from benchmarks.regress import compare
+
+BASE = {"host": {"cpus": 1}, "calibration": 0.030, "perf": {"backtest@5y": 0.300, "ema@1000": 0.0001},
+        "quality": {"synthetic_2y": {"hit_rate": 0.50}}}
+
+
+def _run(host: dict, calibration, perf: dict) -> dict:
+    return {"host": host, "calibration": calibration, "perf": perf, "quality": {"synthetic_2y": {"hit_rate": 0.50}}}
+
+
+def test_slower_host_is_not_a_regression():
+    cur = _run({"cpus": 8}, 0.090, {"backtest@5y": 0.850, "ema@1000": 0.0003})
+    assert compare(cur, BASE) == []
+
+
+def test_regression_on_another_host_is_caught():
+    cur = _run({"cpus": 8}, 0.015, {"backtest@5y": 0.400, "ema@1000": 0.0001})
+    (line,) = compare(cur, BASE)
+    assert line.startswith("perf backtest@5y") and "150.00 ms expected" in line
+
+
+def test_old_baseline_without_calibration_needs_the_same_host():
+    old = {k: v for k, v in BASE.items() if k != "calibration"}
+    slow = {"backtest@5y": 0.900, "ema@1000": 0.0001}
+    assert compare(_run({"cpus": 8}, 0.030, slow), old) == []
+    assert len(compare(_run({"cpus": 1}, 0.030, slow), old)) == 1
@@ -0,0 +1,32 @@
+# tests/test_timeframes.py — Resampler.update == resample() as the base series grows
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from timeframes import Resampler, resample
+
+
+@pytest.mark.parametrize("tf", ["15m", "60m", "1d"])
+def test_resampler_matches_full_resample(candles, tf):
+    rs = Resampler(tf)
+    for i in range(1, len(candles) + 1, 7):
+        pd.testing.assert_frame_equal(rs.update(candles.iloc[:i]), resample(candles.iloc[:i], tf))
+    pd.testing.assert_frame_equal(rs.update(candles.iloc[100:]), resample(candles.iloc[100:], tf))
+
+
+def test_earlier_frames_are_not_modified(candles):
+    rs = Resampler("60m")
+    first = rs.update(candles.iloc[:40])
+    kept = first.copy()
+    for i in range(41, 120): rs.update(candles.iloc[:i])
+    pd.testing.assert_frame_equal(first, kept)
+
+
+def test_forming_bar_replaced_and_int_volume(candles):
+    df = candles.assign(volume=candles["volume"].astype("int64"))
+    rs = Resampler("15m")
+    rs.update(df.iloc[:50])
+    moved = df.iloc[:50].copy()
+    moved.loc[moved.index[-1], ["high", "close", "volume"]] = (moved["high"].iat[-1] + 5, moved["high"].iat[-1] + 5, 1)
+    pd.testing.assert_frame_equal(rs.update(moved), resample(moved, "15m"))
@@ -0,0 +1,137 @@
+# timeframes.py — higher-timeframe bars derived from one base candle series (1m/5m -> 15m / 60m / daily)
+from __future__ import annotations
+
+import threading
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from candles import CANDLE_COLS, empty_candles
+
+TIMEFRAMES = {"1m": 1, "3m": 3, "5m": 5, "10m": 10, "15m": 15, "30m": 30, "60m": 60, "1d": 1440}
+INTERVAL_MINUTES = {"ONE_MINUTE": 1, "THREE_MINUTE": 3, "FIVE_MINUTE": 5, "TEN_MINUTE": 10,
+                    "FIFTEEN_MINUTE": 15, "THIRTY_MINUTE": 30, "ONE_HOUR": 60, "ONE_DAY": 1440}
+SESSION_OPEN = "09:15"  # NSE buckets are anchored here: 60m bars start 09:15, 10:15, ...
+DAY = 1440
+_NS_MIN = 60 * 10**9
+
+
+def minutes_of(tf: Union[str, int]) -> int:
+    """'15m' / 'FIFTEEN_MINUTE' / 15 -> 15; '1d' / 'ONE_DAY' -> 1440."""
+    if isinstance(tf, (int, np.integer)): return int(tf)
+    m = TIMEFRAMES.get(tf) or INTERVAL_MINUTES.get(str(tf).upper())
+    if m is None: raise ValueError(f"unknown timeframe {tf!r}")
+    return m
+
+_UNIT_NS = {"s": 10**9, "ms": 10**6, "us": 10**3, "ns": 1}
+
+def _stamps(times: pd.Series) -> Tuple[np.ndarray, int, Optional[int], object]:
+    """
+    (raw int64 stamps in the column's own unit, ns per unit, wall-clock offset in ns, tz)
+    without converting the column. offset is None when it changes inside the frame (DST).
+    """
+    idx = pd.DatetimeIndex(times)
+    if idx.tz is None: return idx.asi8, _UNIT_NS[idx.unit], 0, None
+    o0, o1 = idx[0].utcoffset(), idx[-1].utcoffset()
+    return idx.asi8, _UNIT_NS[idx.unit], (int(o0.total_seconds()) * 10**9 if o0 == o1 else None), idx.tz
+
+def _wall_ns(times: pd.Series) -> np.ndarray:
+    """Exchange wall-clock stamps as int64 ns, tz-aware or naive input alike."""
+    raw, unit, off, _ = _stamps(times)
+    if off is None: return pd.DatetimeIndex(times).tz_localize(None).as_unit("ns").asi8
+    return raw * unit + off
+
+def _bucket_keys(v: np.ndarray, minutes: int, session_open: str) -> np.ndarray:
+    h, m = map(int, session_open.split(":"))
+    day_open = v - v % (DAY * _NS_MIN) + (h * 60 + m) * _NS_MIN
+    if minutes >= DAY: return day_open
+    step = minutes * _NS_MIN
+    return day_open + (v - day_open) // step * step
+
+def bucket_starts(times: pd.Series, minutes: int, session_open: str = SESSION_OPEN) -> np.ndarray:
+    """Start of the `minutes` bucket each stamp falls in, as int64 wall-clock ns. Daily buckets start at the open."""
+    return _bucket_keys(_wall_ns(times), minutes, session_open)
+
+def _columns(df: pd.DataFrame, start: int = 0) -> Tuple[np.ndarray, ...]:
+    """OHLCV columns from row `start` on, as float arrays (only that tail is converted)."""
+    return tuple(df[c].to_numpy()[start:].astype(float, copy=False) for c in CANDLE_COLS[1:])
+
+def _aggregate(key: np.ndarray, o, h, l, c, v) -> Tuple[np.ndarray, ...]:
+    """Time-sorted rows -> one (start, open, high, low, close, volume) per run of equal keys."""
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    ends = np.r_[starts[1:], len(key)] - 1
+    return (key[starts], o[starts], np.maximum.reduceat(h, starts), np.minimum.reduceat(l, starts),
+            c[ends], np.add.reduceat(v, starts))
+
+def _frame(cols: Tuple[np.ndarray, ...], tz, off: Optional[int]) -> pd.DataFrame:
+    """Candle frame over `cols` without copying them: pass arrays nobody else writes to."""
+    if tz is None: t = pd.DatetimeIndex(cols[0].view("M8[ns]"))
+    elif off is not None: t = pd.DatetimeIndex((cols[0] - off).view("M8[ns]"), tz="UTC").tz_convert(tz)
+    else: t = pd.DatetimeIndex(cols[0].view("M8[ns]")).tz_localize(tz)
+    return pd.DataFrame(dict(zip(CANDLE_COLS, (t, *cols[1:]))), copy=False)
+
+def resample(df: pd.DataFrame, tf: Union[str, int], session_open: str = SESSION_OPEN) -> pd.DataFrame:
+    """
+    OHLCV bars of `tf` from a time-sorted candle frame, stamped with the bucket start
+    (in the frame's timezone). The last bucket holds whatever the frame has so far.
+    """
+    if df.empty: return empty_candles()
+    _, _, off, tz = _stamps(df["time"])
+    key = bucket_starts(df["time"], minutes_of(tf), session_open)
+    return _frame(_aggregate(key, *_columns(df)), tz, off)
+
+
+class Resampler:
+    """
+    Incremental resample() of one growing base series. update(base) keeps every
+    finished bucket in capacity-doubling column buffers and reads only the base rows
+    from the open bucket's start on (located by binary search), so the aggregation
+    work per update is O(base bars in the open bucket + new ones), whatever the
+    history. The returned frame is built over a fresh copy of the buffers — O(buckets),
+    a plain memcpy — so earlier frames never change under their holders. A base frame that
+    no longer starts where it did, went backwards, changed timezone/unit or crossed a
+    UTC-offset change is resampled from scratch. Returned frames are shared — treat
+    them as read-only.
+    """
+
+    def __init__(self, tf: Union[str, int], session_open: str = SESSION_OPEN):
+        self.minutes, self.session_open = minutes_of(tf), session_open
+        self.lock = threading.Lock()
+        self.frame = empty_candles()
+        self._buf: Optional[Tuple[np.ndarray, ...]] = None  # (start ns, o, h, l, c, v) per bucket; [:_n] in use
+        self._n = 0
+        self._dtype = self._off = self._first = self._last = None
+
+    def _store(self, at: int, cols: Tuple[np.ndarray, ...]):
+        """Write buckets from row `at` on (the open one is overwritten), growing the buffers by doubling."""
+        n = at + len(cols[0])
+        if self._buf is None or n > len(self._buf[0]):
+            cap = max(64, 2 * n)
+            self._buf = tuple(np.concatenate([b[:at], np.empty(cap - at, b.dtype)]) if self._buf is not None
+                              else np.empty(cap, a.dtype) for b, a in zip(self._buf or cols, cols))
+        for b, a in zip(self._buf, cols): b[at:n] = a
+        self._n = n
+
+    def update(self, base: pd.DataFrame) -> pd.DataFrame:
+        if base.empty:
+            self.frame, self._buf, self._n = empty_candles(), None, 0
+            self._dtype = self._off = self._first = self._last = None
+            return self.frame
+        t = base["time"]
+        raw, unit = t.array.asi8, _UNIT_NS[t.dtype.unit]
+        first, last = raw[0] * unit, raw[-1] * unit  # compared raw (UTC for tz-aware): offsets cancel out
+        tz = getattr(t.dtype, "tz", None)
+        off = 0 if tz is None else int(t.iat[-1].utcoffset().total_seconds()) * 10**9
+        if (self._buf is None or t.dtype != self._dtype or self._off is None or off != self._off
+                or first != self._first or last < self._last):
+            _, _, self._off, _ = _stamps(t)
+            self._store(0, _aggregate(_bucket_keys(_wall_ns(t), self.minutes, self.session_open), *_columns(base)))
+        else:
+            # every base row of the open bucket sits at or after its start stamp
+            i = int(np.searchsorted(raw, -(-(self._buf[0][self._n - 1] - off) // unit), side="left"))
+            keys = _bucket_keys(raw[i:] * unit + off, self.minutes, self.session_open)
+            self._store(self._n - 1, _aggregate(keys, *_columns(base, i)))
+        self._dtype, self._first, self._last = t.dtype, first, last
+        self.frame = _frame(tuple(b[:self._n].copy() for b in self._buf), tz, self._off)
+        return self.frame